@@ -2,167 +2,47 @@
 import streamlit as st
 import pandas as pd
 import altair as alt
-import random
 import time
-import inspect
+import os
+import calendar
+from datetime import timedelta
+import numpy as np
+from power_engine import DC_DC_LIMIT_W, ECOFLOW_INVERTER_W, device_arrays, power_budget, solar_efficiency_map
+from soc_simulation import HOURS_PER_DAY
+from cross_charge import simulate_coupled
+from monte_carlo import monte_carlo_endurance, weather_pool
+from optimizer import optimise_setup
+from device_catalog import load_catalog
+from device_list import Device, DeviceList
+from peak_load import SCHEDULE_PATTERN, clock, peak_load
+from irradiance import IRRADIANCE_PATH, MONTH_START_DAY, PERFORMANCE_RATIO, IrradianceDataset, solar_shape
+from trip_planner import TRIP_DAY_DEFAULTS, device_label, simulate_trip
+from result_cache import CACHE_PATH, ResultCache, content_key
+from charts import cached_spec, downsample
+from reports import REPORT_FORMATS, ReportQueue, build_report
+from profiling import METRICS_PATH, WINDOW, finish_run, metrics_json, section, start_run, summary
 
 st.set_page_config(page_title="Alfred v8.1 – Campervan Power Calculator", layout="wide")
+start_run()
+try:
+    # --- Device Catalog & Presets ---
+    @st.cache_resource
+    def device_catalog():
+        # Loaded once per server process and shared by every session; sessions only ever
+        # hold the devices they picked from it
+        return load_catalog()
 
-# --- Device Presets ---
-renogy_presets = [
-    {"name": "LED Puck Lights", "watts": 12, "hours": 6, "enabled": True},
-    {"name": "Laptop (DC)", "watts": 65, "hours": 8, "enabled": True},
-    {"name": "Fridge", "watts": 50, "hours": 10, "enabled": True},
-    {"name": "MaxxFan", "watts": 30, "hours": 4, "enabled": True},
-    {"name": "Diesel Heater", "watts": 20, "hours": 2, "enabled": True},
-    {"name": "Phone Charging", "watts": 10, "hours": 2, "enabled": True},
-    {"name": "Starlink", "watts": 45, "hours": 10, "enabled": True},
-    {"name": "GL.iNet Router", "watts": 5, "hours": 24, "enabled": True},
-    {"name": "Renogy One Core", "watts": 2, "hours": 24, "enabled": True}
-]
-
-ecoflow_presets = [
-    {"name": "Air Fryer", "watts": 800, "hours": 0.5, "enabled": True},
-    {"name": "Nespresso", "watts": 1200, "hours": 0.3, "enabled": True},
-    {"name": "Induction Hob", "watts": 1800, "hours": 1.0, "enabled": True},
-    {"name": "Hairdryer", "watts": 1000, "hours": 0.2, "enabled": False},
-    {"name": "Electric Kettle", "watts": 1200, "hours": 0.3, "enabled": True},
-    {"name": "Microwave", "watts": 1000, "hours": 0.5, "enabled": False},
-    {"name": "Laptop Charger (AC)", "watts": 90, "hours": 4.0, "enabled": True}
-]
-
-solar_efficiency_map = {"Low": 1.5, "Medium": 3.5, "High": 5.5}
-
-# --- Sidebar Config ---
-st.sidebar.header("System Configuration")
-
-solar_eff_level = st.sidebar.selectbox("UK Solar Efficiency", options=list(solar_efficiency_map.keys()), index=1)
-solar_hours = solar_efficiency_map[solar_eff_level]
-
-show_renogy = st.sidebar.checkbox("Enable Renogy 12V System", value=True)
-if show_renogy:
-    renogy_batteries = st.sidebar.slider("Renogy 200Ah Batteries", 1, 4, 3)
-    renogy_wh = renogy_batteries * 200 * 12
-    renogy_solar = st.sidebar.number_input("Renogy Solar (W)", value=360, step=10)
-    drive_hours = st.sidebar.slider("Drive Time (hrs/day)", 0.0, 5.0, 0.5, step=0.1)
-    alternator_input = 480 * drive_hours  # 40A * 12V
-    renogy_input = (renogy_solar * solar_hours) + alternator_input
-else:
-    renogy_wh, renogy_input = 0, 0
-
-show_ecoflow = st.sidebar.checkbox("Enable EcoFlow 240V System", value=True)
-if show_ecoflow:
-    ecoflow_wh = 3600
-    ecoflow_solar = st.sidebar.number_input("EcoFlow Solar (W)", value=400, step=10)
-    ecoflow_input = ecoflow_solar * solar_hours
-else:
-    ecoflow_wh, ecoflow_input = 0, 0
-    
-    # --- Device Tabs ---
-tab1, tab2, tab3 = st.tabs(["Renogy Devices", "EcoFlow Devices", "System Components"])
-
-# --- Renogy Devices Tab ---
-with tab1:
-    st.subheader("Renogy 12V Devices")
-    if st.button("Quick Add Renogy Presets"):
-        st.session_state.renogy_devices = renogy_presets.copy()
-    renogy_devices = st.session_state.get("renogy_devices", renogy_presets.copy())
-    enabled_renogy = []
-    with st.form("renogy_form"):
-        for i, d in enumerate(renogy_devices):
-            cols = st.columns([3, 1, 1, 1])
-            d["name"] = cols[0].text_input("Name", d["name"], key=f"rname_{i}")
-            d["watts"] = cols[1].number_input("W", 1, 5000, d["watts"], key=f"rwatts_{i}")
-            d["hours"] = cols[2].number_input("Hrs", 0.0, 24.0, float(d["hours"]), step=0.5, key=f"rhrs_{i}")
-            d["enabled"] = cols[3].checkbox("On?", d["enabled"], key=f"renabled_{i}")
-            if d["enabled"]:
-                enabled_renogy.append(d)
-        st.session_state.renogy_devices = renogy_devices
-        st.form_submit_button("Update Renogy Devices")
-
-# --- EcoFlow Devices Tab ---
-with tab2:
-    st.subheader("EcoFlow 240V Devices")
-    if st.button("Quick Add EcoFlow Presets"):
-        st.session_state.ecoflow_devices = ecoflow_presets.copy()
-    ecoflow_devices = st.session_state.get("ecoflow_devices", ecoflow_presets.copy())
-    enabled_ecoflow = []
-    with st.form("ecoflow_form"):
-        for i, d in enumerate(ecoflow_devices):
-            cols = st.columns([3, 1, 1, 1])
-            d["name"] = cols[0].text_input("Name", d["name"], key=f"ename_{i}")
-            d["watts"] = cols[1].number_input("W", 1, 5000, d["watts"], key=f"ewatts_{i}")
-            d["hours"] = cols[2].number_input("Hrs", 0.0, 24.0, float(d["hours"]), step=0.5, key=f"ehrs_{i}")
-            d["enabled"] = cols[3].checkbox("On?", d["enabled"], key=f"eenabled_{i}")
-            if d["enabled"]:
-                enabled_ecoflow.append(d)
-        st.session_state.ecoflow_devices = ecoflow_devices
-        st.form_submit_button("Update EcoFlow Devices")
-
-# --- Power Calculations ---
-df_r = pd.DataFrame(enabled_renogy)
-df_r["Wh"] = df_r["watts"] * df_r["hours"]
-renogy_usage = df_r["Wh"].sum() if not df_r.empty else 0
-
-df_e = pd.DataFrame(enabled_ecoflow)
-df_e["Wh"] = df_e["watts"] * df_e["hours"]
-ecoflow_usage = df_e["Wh"].sum() if not df_e.empty else 0
-
-total_capacity = renogy_wh + ecoflow_wh
-total_input = renogy_input + ecoflow_input
-total_usage = renogy_usage + ecoflow_usage
-net_balance = total_input - total_usage
-
-# --- Summary Display ---
-st.header("Alfred System Summary")
-
-st.write(f"**Total System Capacity:** {total_capacity:.0f} Wh ({total_capacity / 12:.1f} Ah)")
-st.write(f"**Total Daily Usage:** {total_usage:.0f} Wh ({total_usage / 12:.1f} Ah)")
-st.write(f"**Total Daily Input:** {total_input:.0f} Wh ({total_input / 12:.1f} Ah)")
-st.write(f"**Net Power Balance:** {net_balance:.0f} Wh ({net_balance / 12:.1f} Ah)")
-
-# --- Battery Endurance ---
-st.subheader("Battery Endurance")
-if total_usage <= total_input:
-    fill = 100
-    status = "Sustainable – Infinite Runtime"
-    emoji = "🔋"
-else:
-    days = total_capacity / (total_usage - total_input)
-    fill = min((days / 5) * 100, 100)
-    status = f"{round(days * 2) / 2} days of power remaining"
-    emoji = "🪫" if fill < 20 else "🟨" if fill < 66 else "🟩"
-st.markdown(f"**{emoji} {status}**")
-st.progress(int(fill))
-
-# --- EV Recharge Estimate ---
-if show_ecoflow:
-    st.subheader("EcoFlow EV Recharge Estimate")
-    missing_wh = max(0, ecoflow_wh - ecoflow_input)
-    ev_recharge_time = missing_wh / 7000  # 7kW EV charger
-    st.write(f"To recharge your EcoFlow using a 7kW EV charger would take approx **{ev_recharge_time:.2f} hours**.")
-
-# --- Daily Power Chart ---
-st.subheader("Daily Power Distribution")
-df_chart = pd.DataFrame({
-    "Source": ["Renogy Input", "EcoFlow Input", "Renogy Usage", "EcoFlow Usage"],
-    "Wh": [renogy_input, ecoflow_input, -renogy_usage, -ecoflow_usage]
-})
-df_chart["% of Capacity"] = (df_chart["Wh"] / total_capacity) * 100
-
-bar = alt.Chart(df_chart).mark_bar().encode(
-    x=alt.X('Source:N'),
-    y=alt.Y('% of Capacity:Q'),
-    color=alt.Color('Source:N', scale=alt.Scale(scheme='category20b')),
-    tooltip=["Source", "Wh", "% of Capacity"]
-).properties(width=600, height=400)
-
-st.altair_chart(bar, use_container_width=True)
-
-# --- System Components Tab ---
-with tab3:
-    st.subheader("System Components")
-    components = [
+    @st.cache_resource
+    def device_presets(tag):
+        # One read-only list per preset shared by every session; a session only stores
+        # the rows it edits on top of it (see device_list.DeviceList)
+        return DeviceList.from_devices(device_catalog().presets(tag))
+
+    renogy_presets = device_presets("renogy")
+    ecoflow_presets = device_presets("ecoflow")
+
+    # --- System Components ---
+    system_components = [
         {
             "name": "Renogy 200Ah Core Battery (x3)",
             "desc": "Primary 12V lithium storage bank",
@@ -228,17 +108,556 @@ with tab3:
         }
     ]
 
-    for comp in components:
-        with st.expander(comp["name"]):
-            st.markdown(f"**Description:** {comp['desc']}")
-            st.markdown(f"**Recommended Fuse:** {comp['fuse']}")
-            st.markdown(f"**Wire Gauge:** {comp['wire']}")
-            st.markdown(f"**Placement Notes:** {comp['placement']}")
-
-# --- Version Timeline Footer ---
-st.markdown("---")
-st.markdown("### Alfred Version Timeline")
-st.markdown("""
+    # --- Cached Computation ---
+    # Every section below is either cached or a fragment, so a widget change only reruns the
+    # part of the page it affects. Editing one device tab reruns that tab, its usage and the
+    # summary; the other tab, System Components and the footer are left as they are.
+    @st.cache_resource
+    def monte_carlo_pool():
+        # One worker pool per process, shared by every session and rerun
+        return weather_pool()
+
+    @st.cache_data(show_spinner="Simulating UK weather...")
+    def weather_endurance(budget, drive_hours, start_day, policy):
+        # Keyed only on the power budget and the Orion policy the summary settled on, so
+        # renaming a device or other cosmetic edits reuse the result
+        return monte_carlo_endurance(budget, drive_hours, start_day=start_day, policy=policy, pool=monte_carlo_pool())
+
+    @st.cache_resource
+    def irradiance_dataset():
+        # Memory-mapped once per process; None when no irradiance file has been ingested
+        return IrradianceDataset() if os.path.exists(IRRADIANCE_PATH) else None
+
+    @st.cache_data
+    def coupled_endurance(budget, drive_hours, start_day, solar_point=None, sun_hours=None):
+        # Both banks joined by the Orion under every cross-charge policy, keeping the best.
+        # With a location chosen, solar input follows that grid point's measured hourly irradiance
+        shape = None
+        if solar_point is not None:
+            shape = solar_shape(irradiance_dataset().hourly(solar_point), sun_hours, start_day)
+        year = simulate_coupled(budget, drive_hours, start_day=start_day, solar_shape=shape)
+        best = int(year["best"][0])
+        return {
+            "policy": year["policies"][best],
+            "first_empty": year["first_empty_hour"][0, best],
+            "moved_wh_per_day": float(year["moved_wh_per_day"][0, best]),
+            "days": dict(zip(year["policies"], year["days"][0].tolist())),
+        }
+
+    @st.cache_resource
+    def result_cache():
+        # One handle per process onto the cache file every process shares; None when disabled
+        return ResultCache() if CACHE_PATH else None
+
+    @st.cache_resource
+    def report_queue():
+        # One bounded pool of report workers per process, shared by every session
+        return ReportQueue(cache=result_cache())
+
+    def compute_summary(config, devices):
+        renogy_watts, renogy_hours = device_arrays(devices["Renogy"])
+        ecoflow_watts, ecoflow_hours = device_arrays(devices["EcoFlow"])
+        budget = power_budget(
+            config["renogy_batteries"], config["renogy_solar"], config["ecoflow_solar"],
+            config["solar_hours"], config["drive_hours"],
+            renogy_watts, renogy_hours, ecoflow_watts, ecoflow_hours,
+            renogy_enabled=config["show_renogy"], ecoflow_enabled=config["show_ecoflow"],
+        )
+        endurance = coupled_endurance(budget, config["drive_hours"], config["start_day"],
+                                      config["solar_point"], config["solar_hours"])
+        weather = None
+        if config["monte_carlo"]:
+            weather = weather_endurance(budget, config["drive_hours"], config["start_day"], endurance["policy"])
+        peaks = {}
+        for system, shown, limit in [("Renogy", config["show_renogy"], config["dc_dc_limit"]),
+                                     ("EcoFlow", config["show_ecoflow"], config["inverter_limit"])]:
+            if shown:
+                try:
+                    peaks[system] = peak_load(devices[system], limit)
+                except ValueError as e:
+                    peaks[system] = str(e)
+        return {"budget": budget, "endurance": endurance, "weather": weather, "peaks": peaks}
+
+    def summary_results(config, renogy_devices, ecoflow_devices):
+        # Figures, endurance and chart data for the summary, looked up by the content of the
+        # configuration in the shared disk cache first, so the default presets and other
+        # popular setups are computed once per host rather than once per session and process
+        devices = {"Renogy": [Device.from_dict(d) for d in renogy_devices],
+                   "EcoFlow": [Device.from_dict(d) for d in ecoflow_devices]}
+        cache = result_cache()
+        if cache is None:
+            return compute_summary(config, devices)
+        return cache.get_or_compute(content_key("summary", config, devices), lambda: compute_summary(config, devices))
+
+    # Chart builders run through cached_spec(), so each only runs for data not charted before
+    def power_chart(renogy_input, ecoflow_input, renogy_usage, ecoflow_usage, total_capacity):
+        df_chart = pd.DataFrame({
+            "Source": ["Renogy Input", "EcoFlow Input", "Renogy Usage", "EcoFlow Usage"],
+            "Wh": [renogy_input, ecoflow_input, -renogy_usage, -ecoflow_usage]
+        })
+        df_chart["% of Capacity"] = (df_chart["Wh"] / total_capacity) * 100
+
+        return alt.Chart(df_chart).mark_bar().encode(
+            x=alt.X('Source:N'),
+            y=alt.Y('% of Capacity:Q'),
+            color=alt.Color('Source:N', scale=alt.Scale(scheme='category20b')),
+            tooltip=["Source", "Wh", "% of Capacity"]
+        ).properties(width=600, height=400)
+
+    def load_chart(profiles):
+        # Profiles are flat between schedule changes, so only the change points are plotted
+        # and drawn as steps – a few dozen points instead of 1440 per system
+        frames = []
+        for system, profile in profiles.items():
+            minutes = np.unique(np.concatenate([[0], np.flatnonzero(np.diff(profile)) + 1, [len(profile) - 1]]))
+            frames.append(pd.DataFrame({"Minute": minutes, "W": profile[minutes], "System": system}))
+        df = pd.concat(frames)
+        df["Time"] = pd.Timestamp("2000-01-01") + pd.to_timedelta(df["Minute"], unit="min")
+        df = downsample(df, "Time", "W", by="System")
+        return alt.Chart(df).mark_line(interpolate="step-after").encode(
+            x=alt.X("Time:T", axis=alt.Axis(format="%H:%M")),
+            y=alt.Y("W:Q"),
+            color=alt.Color("System:N"),
+            tooltip=[alt.Tooltip("Time:T", format="%H:%M"), "System", "W"],
+        )
+
+    def charge_chart(start, hourly_pct):
+        # Hourly state of charge of both banks; long trips are thinned to the chart's width
+        charge = pd.DataFrame({
+            "Time": pd.date_range(start, periods=len(hourly_pct), freq="h"),
+            "Renogy": hourly_pct[:, 0],
+            "EcoFlow": hourly_pct[:, 1],
+        }).melt("Time", var_name="Bank", value_name="Charge %")
+        charge = downsample(charge, "Time", "Charge %", by="Bank")
+        return alt.Chart(charge).mark_line().encode(
+            x="Time:T", y=alt.Y("Charge %:Q", scale=alt.Scale(domain=[0, 100])), color="Bank:N",
+        )
+
+    # --- Summary, Endurance & Chart ---
+    def render_summary(config):
+        with section("calculations"):
+            results = summary_results(config, st.session_state.get("renogy_devices", renogy_presets),
+                                      st.session_state.get("ecoflow_devices", ecoflow_presets))
+        budget, endurance, weather, peaks = (results[k] for k in ("budget", "endurance", "weather", "peaks"))
+
+        renogy_wh, ecoflow_wh = float(budget["renogy_wh"]), float(budget["ecoflow_wh"])
+        renogy_input, ecoflow_input = float(budget["renogy_input"]), float(budget["ecoflow_input"])
+        renogy_usage, ecoflow_usage = float(budget["renogy_usage"]), float(budget["ecoflow_usage"])
+        total_capacity = float(budget["total_capacity"])
+        total_input = float(budget["total_input"])
+        total_usage = float(budget["total_usage"])
+        net_balance = float(budget["net_balance"])
+
+        with section("summary"):
+            st.header("Alfred System Summary")
+
+            st.write(f"**Total System Capacity:** {total_capacity:.0f} Wh ({total_capacity / 12:.1f} Ah)")
+            st.write(f"**Total Daily Usage:** {total_usage:.0f} Wh ({total_usage / 12:.1f} Ah)")
+            st.write(f"**Total Daily Input:** {total_input:.0f} Wh ({total_input / 12:.1f} Ah)")
+            st.write(f"**Net Power Balance:** {net_balance:.0f} Wh ({net_balance / 12:.1f} Ah)")
+
+            # --- Battery Endurance ---
+            st.subheader("Battery Endurance")
+            bank_days = {
+                name: hour / HOURS_PER_DAY
+                for name, capacity, hour in zip(["Renogy", "EcoFlow"], [renogy_wh, ecoflow_wh], endurance["first_empty"])
+                if capacity > 0 and hour >= 0
+            }
+            days = min(bank_days.values(), default=float("inf"))
+            if days == float("inf"):
+                fill = 100
+                status = "Sustainable – Infinite Runtime"
+                emoji = "🔋"
+            else:
+                fill = min((days / 5) * 100, 100)
+                status = f"{round(days * 2) / 2} days of power remaining"
+                emoji = "🪫" if fill < 20 else "🟨" if fill < 66 else "🟩"
+            st.markdown(f"**{emoji} {status}**")
+            st.progress(int(fill))
+            if bank_days:
+                st.caption(" · ".join(f"{name} runs flat after {d:.1f} days" for name, d in bank_days.items()))
+            if renogy_wh > 0 and ecoflow_wh > 0:
+                policy_days = " · ".join(f"{name} {'∞' if d == float('inf') else f'{d:.1f}'} days"
+                                         for name, d in endurance["days"].items())
+                if endurance["policy"] == "off":
+                    st.caption(f"Orion cross-charging doesn't extend this setup ({policy_days}).")
+                else:
+                    st.caption(f"Best with the Orion on its **{endurance['policy']}** policy, moving about "
+                               f"{endurance['moved_wh_per_day']:.0f} Wh/day to the EcoFlow ({policy_days}).")
+
+            if weather is not None:
+                st.markdown("**Weather-adjusted autonomy**")
+                p10_col, p50_col, p90_col = st.columns(3)
+                p10_col.metric("P10 (dull spell)", f"{weather['p10']:.1f} days")
+                p50_col.metric("P50 (typical)", f"{weather['p50']:.1f} days")
+                p90_col.metric("P90 (bright spell)", f"{weather['p90']:.1f} days")
+                if weather["censored"] > 0:
+                    st.caption(f"{weather['censored']:.0%} of simulated runs lasted the full {weather['horizon_days']} days.")
+
+            # --- EV Recharge Estimate ---
+            if config["show_ecoflow"]:
+                st.subheader("EcoFlow EV Recharge Estimate")
+                ev_recharge_time = float(budget["ev_recharge_hours"])  # 7kW EV charger
+                st.write(f"To recharge your EcoFlow using a 7kW EV charger would take approx **{ev_recharge_time:.2f} hours**.")
+
+            # --- Peak Load ---
+            st.subheader("Peak Load")
+            peak_cols = st.columns(2)
+            profiles = {}
+            systems = [("Renogy", config["dc_dc_limit"], "DC-DC"), ("EcoFlow", config["inverter_limit"], "inverter")]
+            for col, (system, limit, limit_name) in zip(peak_cols, systems):
+                if system not in peaks:
+                    continue
+                peak = peaks[system]
+                if isinstance(peak, str):
+                    col.warning(f"{system}: {peak}")
+                    continue
+                profiles[system] = peak["profile"]
+                col.metric(f"{system} Peak Draw", f"{peak['peak_w']:.0f} W",
+                           f"{peak['peak_w'] - limit:+.0f} W vs {limit_name} limit", delta_color="inverse")
+                if peak["minutes_over_limit"]:
+                    windows = ", ".join(f"{clock(a)}–{clock(b)}" for a, b in peak["over_limit"])
+                    col.error(f"Over the {limit:.0f} W {limit_name} limit {windows} "
+                              f"(peak at {clock(peak['peak_minute'])}: {', '.join(peak['at_peak'])}).")
+
+        # --- Daily Power Chart ---
+        with section("chart"):
+            if profiles:
+                with st.expander("Load profile by minute"):
+                    st.vega_lite_chart(spec=cached_spec(load_chart, profiles), width="stretch")
+            st.subheader("Daily Power Distribution")
+            bar = cached_spec(power_chart, renogy_input, ecoflow_input, renogy_usage, ecoflow_usage, total_capacity)
+            st.vega_lite_chart(spec=bar, width="stretch")
+
+    # --- Device Tabs ---
+    DEVICE_PAGE_SIZE = 50
+    DEVICE_COLUMNS = {
+        "name": st.column_config.TextColumn("Name", default="New Device", required=True),
+        "watts": st.column_config.NumberColumn("W", min_value=1, max_value=5000, step=1, default=10, required=True),
+        "hours": st.column_config.NumberColumn("Hrs", min_value=0.0, max_value=24.0, step=0.5, default=1.0, required=True),
+        "enabled": st.column_config.CheckboxColumn("On?", default=True),
+        "schedule": st.column_config.TextColumn("Schedule", default="", validate=SCHEDULE_PATTERN,
+                                                help="When it runs, e.g. 07:30-07:40, 18:00-18:30"),
+    }
+
+    def apply_grid_edits(state_key, editor_key, offset, page_rows, columns):
+        # The grid only sends back the rows that changed on its page, so those are
+        # patched into the stored list; untouched rows are never rebuilt.
+        edits = st.session_state.get(editor_key)
+        if not edits:
+            return
+        rows = st.session_state[state_key]
+        changes = {offset + row: change for row, change in edits["edited_rows"].items()}
+        defaults = {name: column.get("default") for name, column in columns.items() if not column.get("disabled")}
+        added = [{**defaults, **{k: v for k, v in row.items() if v is not None}} for row in edits["added_rows"]]
+        deleted = [offset + row for row in edits["deleted_rows"]]
+        if isinstance(rows, DeviceList):
+            rows = rows.edit(changes, offset + page_rows, added, deleted)
+        else:
+            rows = list(rows)
+            for row, change in changes.items():
+                rows[row] = {**rows[row], **change}
+            rows[offset + page_rows:offset + page_rows] = added
+            for row in sorted(deleted, reverse=True):
+                del rows[row]
+        st.session_state[state_key] = rows
+        # A new editor key starts the grid fresh from the updated list
+        st.session_state[f"{state_key}_version"] = st.session_state.get(f"{state_key}_version", 0) + 1
+
+    @st.fragment
+    def device_tab(system, title, presets, prefix, config, summary_slot):
+        # Runs as its own fragment: submitting this form reruns only this tab and then
+        # redraws the summary in place, leaving the other system's tab untouched.
+        key = system.lower()
+        with section(f"{key}_tab"):
+            st.subheader(title)
+            changed = st.button(f"Quick Add {system} Presets")
+            if changed:
+                st.session_state[f"{key}_devices"] = presets
+            devices = st.session_state.setdefault(f"{key}_devices", presets)
+
+            catalog = device_catalog()
+            query = st.text_input("Search device catalog", key=f"{prefix}catalog_search",
+                                  placeholder="e.g. kettle, fridge, starlink")
+            if query:
+                picks = st.multiselect("Matches", catalog.search(query).tolist(), format_func=catalog.label,
+                                       key=f"{prefix}catalog_picks")
+                if st.button(f"Add to {system}", key=f"{prefix}catalog_add", disabled=not picks):
+                    devices = devices.extend(catalog.devices(picks, enabled=True))
+                    st.session_state[f"{key}_devices"] = devices
+                    changed = True
+
+            # One grid per page of devices, so the page costs the same to draw at 10 or 1000
+            pages = max(1, -(-len(devices) // DEVICE_PAGE_SIZE))
+            page = 1
+            if pages > 1:
+                page = st.number_input(f"Page (of {pages})", 1, pages, key=f"{prefix}page")
+            offset = (page - 1) * DEVICE_PAGE_SIZE
+            page_devices = devices[offset:offset + DEVICE_PAGE_SIZE]
+            editor_key = f"{prefix}editor_{st.session_state.get(f'{key}_devices_version', 0)}_{page}"
+            with st.form(f"{key}_form"):
+                st.data_editor(
+                    pd.DataFrame(page_devices, columns=list(DEVICE_COLUMNS)), column_config=DEVICE_COLUMNS,
+                    num_rows="dynamic", hide_index=True, width="stretch", key=editor_key,
+                )
+                st.caption(f"{len(devices)} devices · showing {offset + 1}–{offset + len(page_devices)}"
+                           if page_devices else "No devices yet – add rows to the grid or search the catalog.")
+                changed |= st.form_submit_button(f"Update {system} Devices", on_click=apply_grid_edits,
+                                                 args=(f"{key}_devices", editor_key, offset, len(page_devices), DEVICE_COLUMNS))
+
+        # Only a click in this tab reruns the fragment on its own; on a full run the
+        # script draws the summary once both tabs are done, so just claim the slot.
+        if changed:
+            with summary_slot.container():
+                render_summary(config)
+        else:
+            summary_slot.empty()
+
+    # --- Setup Optimizer Tab ---
+    @st.fragment
+    @section("optimizer")
+    def optimizer_tab(config):
+        st.subheader("Setup Optimizer")
+        st.write("Find the smallest battery and solar combinations that keep you powered for a target number of days.")
+        with st.form("optimizer_form"):
+            cols = st.columns(4)
+            target_days = cols[0].number_input("Target Days", 1.0, 60.0, 5.0, step=0.5)
+            battery_cost = cols[1].number_input("£ per Battery", 0, 5000, 900, step=50)
+            solar_cost = cols[2].number_input("£ per Solar Watt", 0.0, 10.0, 1.2, step=0.1)
+            ecoflow_cost = cols[3].number_input("£ for EcoFlow", 0, 10000, 3000, step=100)
+            submitted = st.form_submit_button("Find Setups")
+        if submitted:
+            setups = optimise_setup(
+                st.session_state.get("renogy_devices", renogy_presets),
+                st.session_state.get("ecoflow_devices", ecoflow_presets),
+                target_days, solar_hours=config["solar_hours"], drive_hours=config["drive_hours"],
+                battery_cost=battery_cost, solar_watt_cost=solar_cost, ecoflow_cost=ecoflow_cost,
+                start_day=time.localtime().tm_yday - 1,
+            )
+            if setups:
+                st.dataframe(pd.DataFrame(setups), hide_index=True)
+            else:
+                st.warning("No setup within range reaches that target – try fewer days or trim your devices.")
+
+    # --- Trip Planner Tab ---
+    @st.fragment
+    @section("trip")
+    def trip_tab(config):
+        st.subheader("Trip Planner")
+        st.write("Plan each day of a trip – battery charge carries over from one day to the next.")
+        start = st.date_input("Trip Start", key="trip_start")
+        days = st.session_state.setdefault("trip_days", [dict(TRIP_DAY_DEFAULTS) for _ in range(7)])
+        renogy_devices = st.session_state.get("renogy_devices", renogy_presets)
+        ecoflow_devices = st.session_state.get("ecoflow_devices", ecoflow_presets)
+        device_options = ([device_label("Renogy", d) for d in renogy_devices] +
+                          [device_label("EcoFlow", d) for d in ecoflow_devices])
+        columns = {
+            "date": st.column_config.DateColumn("Date", disabled=True),
+            "location": st.column_config.TextColumn("Location", default=""),
+            "drive_hours": st.column_config.NumberColumn("Drive Hrs", min_value=0.0, max_value=12.0, step=0.5,
+                                                         default=TRIP_DAY_DEFAULTS["drive_hours"]),
+            "solar_level": st.column_config.SelectboxColumn("Solar", options=list(solar_efficiency_map),
+                                                            default=TRIP_DAY_DEFAULTS["solar_level"], required=True),
+            "devices_off": st.column_config.MultiselectColumn("Devices Off", options=device_options, default=[]),
+        }
+
+        editor_key = f"trip_editor_{st.session_state.get('trip_days_version', 0)}"
+        trip = pd.DataFrame(days, columns=list(TRIP_DAY_DEFAULTS))
+        trip.insert(0, "date", [start + timedelta(days=i) for i in range(len(trip))])
+        with st.form("trip_form"):
+            st.data_editor(trip, column_config=columns, num_rows="dynamic", hide_index=True, width="stretch",
+                           key=editor_key)
+            st.form_submit_button("Update Trip", on_click=apply_grid_edits,
+                                  args=("trip_days", editor_key, 0, len(days), columns))
+        if not days:
+            st.info("Add a day to the trip to see how your batteries hold up.")
+            return
+
+        # Days whose inputs and starting charge are unchanged come straight from the last run
+        # The Orion runs the same cross-charge policy as in the summary, and with irradiance
+        # data loaded a day's location sets its solar in place of its solar level
+        previous = st.session_state.get("trip_results", [])
+        policy = summary_results(config, renogy_devices, ecoflow_devices)["endurance"]["policy"]
+        results = simulate_trip(days, config, renogy_devices, ecoflow_devices,
+                                start_day=start.timetuple().tm_yday - 1, previous=previous, policy=policy,
+                                irradiance=irradiance_dataset())
+        st.session_state["trip_results"] = results
+        recomputed = sum(1 for i, r in enumerate(results) if i >= len(previous) or r is not previous[i])
+
+        capacity = np.array([[r["budget"]["renogy_wh"], r["budget"]["ecoflow_wh"]] for r in results])
+        final = np.array([r["final_soc"] for r in results])
+        end_pct = np.divide(final, capacity, out=np.full_like(final, np.nan), where=capacity > 0) * 100
+        flat = [
+            ", ".join(f"{name} flat at {hour:02d}:00" for name, cap, hour in
+                      zip(["Renogy", "EcoFlow"], day_capacity, r["first_empty_hour"]) if cap > 0 and hour >= 0)
+            for day_capacity, r in zip(capacity, results)
+        ]
+        for date, r in zip(trip["date"], results):
+            if r["location_error"]:
+                st.warning(f"{date:%d %b}: {r['location_error']} – using its solar level.")
+        st.dataframe(pd.DataFrame({
+            "Date": trip["date"],
+            "Location": trip["location"],
+            "Renogy End": end_pct[:, 0],
+            "EcoFlow End": end_pct[:, 1],
+            "Net Wh": [r["budget"]["net_balance"] for r in results],
+            "Runs Flat": flat,
+        }), hide_index=True, column_config={
+            "Renogy End": st.column_config.ProgressColumn(min_value=0, max_value=100, format="%.0f%%"),
+            "EcoFlow End": st.column_config.ProgressColumn(min_value=0, max_value=100, format="%.0f%%"),
+            "Net Wh": st.column_config.NumberColumn(format="%.0f"),
+        })
+
+        hourly = np.concatenate([r["soc"] for r in results])
+        hourly_capacity = np.repeat(capacity, HOURS_PER_DAY, axis=0)
+        hourly_pct = np.divide(hourly, hourly_capacity, out=np.full_like(hourly, np.nan), where=hourly_capacity > 0) * 100
+        st.vega_lite_chart(spec=cached_spec(charge_chart, start, hourly_pct), width="stretch")
+        st.caption(f"Orion on its {policy} policy. Re-simulated {recomputed} of {len(results)} days.")
+
+    # --- Build Sheet ---
+    REPORT_POLL_SECONDS = 1.0
+
+    def session_devices():
+        return {"Renogy": [Device.from_dict(d) for d in st.session_state.get("renogy_devices", renogy_presets)],
+                "EcoFlow": [Device.from_dict(d) for d in st.session_state.get("ecoflow_devices", ecoflow_presets)]}
+
+    def report_jobs(config, devices):
+        queue = report_queue()
+        return {fmt: (key, queue.job(key)) for fmt, key in
+                ((fmt, content_key("report", fmt, config, devices)) for fmt in REPORT_FORMATS)}
+
+    # Reports are generated on the worker pool, never in this script run. A running
+    # report's progress is a fragment rerun on its own timer, rendered only while the job
+    # is pending; once it finishes a full rerun swaps it for the download button and the
+    # polling stops
+    @st.fragment(run_every=REPORT_POLL_SECONDS)
+    def report_progress(fmt, job):
+        if job.done():
+            st.rerun()
+        st.progress(job.progress, text=f"{fmt.upper()}: {job.stage}…")
+
+    @st.fragment
+    @section("report")
+    def build_sheet(config):
+        st.subheader("Build Sheet")
+        st.caption("Devices, summary, endurance, power chart and the components above, ready to print or share.")
+        devices = session_devices()
+        for col, (fmt, (key, job)) in zip(st.columns(len(REPORT_FORMATS)), report_jobs(config, devices).items()):
+            mime, ext = REPORT_FORMATS[fmt]
+            if job is not None and job.error:
+                col.error(f"The {fmt.upper()} build sheet failed: {job.error}")
+            if (job is None or job.error) and col.button(f"Generate {fmt.upper()}", key=f"report_{fmt}"):
+                results = summary_results(config, st.session_state.get("renogy_devices", renogy_presets),
+                                          st.session_state.get("ecoflow_devices", ecoflow_presets))
+                try:
+                    job = report_queue().submit(key, build_report, fmt, config, devices, results, system_components)
+                except RuntimeError as e:
+                    col.warning(str(e))
+                    continue
+            if job is None or job.error:
+                continue
+            if job.done():
+                # The sheet itself carries no date, so one cached copy serves every download
+                col.download_button(f"Download {fmt.upper()}", job.data,
+                                    f"alfred_build_sheet_{time.strftime('%Y-%m-%d')}.{ext}", mime,
+                                    key=f"report_download_{fmt}")
+            else:
+                with col:
+                    report_progress(fmt, job)
+
+    # --- Sidebar Config ---
+    with section("sidebar"):
+        st.sidebar.header("System Configuration")
+
+        solar_point, start_day = None, time.localtime().tm_yday - 1
+        irradiance = irradiance_dataset()
+        location = ""
+        if irradiance is not None:
+            location = st.sidebar.text_input("Location (postcode or lat, lon)", placeholder="e.g. EH1 or 55.95, -3.19")
+        if location:
+            month = st.sidebar.selectbox("Month", range(1, 13), index=time.localtime().tm_mon - 1,
+                                         format_func=lambda m: calendar.month_name[m])
+            try:
+                solar_point, distance_km, _, _ = irradiance.locate(location)
+            except (KeyError, ValueError) as e:
+                st.sidebar.warning(str(e).strip("'\""))
+        if solar_point is not None:
+            solar_hours = irradiance.month_sun_hours(solar_point, month) * PERFORMANCE_RATIO
+            start_day = int(MONTH_START_DAY[month - 1])
+            st.sidebar.caption(f"Grid point {irradiance.lat[solar_point]:.2f}, {irradiance.lon[solar_point]:.2f} "
+                               f"({distance_km:.0f} km away) · {solar_hours:.1f} sun hours/day in {calendar.month_name[month]}")
+        else:
+            solar_eff_level = st.sidebar.selectbox("UK Solar Efficiency", options=list(solar_efficiency_map.keys()), index=1)
+            solar_hours = solar_efficiency_map[solar_eff_level]
+        monte_carlo = st.sidebar.checkbox("Monte Carlo Weather (P10/P50/P90)", value=False)
+
+        show_renogy = st.sidebar.checkbox("Enable Renogy 12V System", value=True)
+        if show_renogy:
+            renogy_batteries = st.sidebar.slider("Renogy 200Ah Batteries", 1, 4, 3)
+            renogy_solar = st.sidebar.number_input("Renogy Solar (W)", value=360, step=10)
+            drive_hours = st.sidebar.slider("Drive Time (hrs/day)", 0.0, 5.0, 0.5, step=0.1)
+            dc_dc_limit = st.sidebar.number_input("Renogy DC-DC Limit (W)", value=DC_DC_LIMIT_W, step=10)
+        else:
+            renogy_batteries, renogy_solar, drive_hours, dc_dc_limit = 0, 0, 0.0, DC_DC_LIMIT_W
+
+        show_ecoflow = st.sidebar.checkbox("Enable EcoFlow 240V System", value=True)
+        if show_ecoflow:
+            ecoflow_solar = st.sidebar.number_input("EcoFlow Solar (W)", value=400, step=10)
+            inverter_limit = st.sidebar.number_input("EcoFlow Inverter Limit (W)", value=ECOFLOW_INVERTER_W, step=100)
+        else:
+            ecoflow_solar, inverter_limit = 0, ECOFLOW_INVERTER_W
+
+    config = {
+        "solar_hours": solar_hours,
+        "solar_point": solar_point,
+        "start_day": start_day,
+        "monte_carlo": monte_carlo,
+        "show_renogy": show_renogy,
+        "renogy_batteries": renogy_batteries,
+        "renogy_solar": renogy_solar,
+        "drive_hours": drive_hours,
+        "dc_dc_limit": dc_dc_limit,
+        "show_ecoflow": show_ecoflow,
+        "ecoflow_solar": ecoflow_solar,
+        "inverter_limit": inverter_limit,
+    }
+
+    tab1, tab2, tab3, tab4, tab5 = st.tabs(["Renogy Devices", "EcoFlow Devices", "System Components", "Setup Optimizer",
+                                            "Trip Planner"])
+    summary_slot = st.empty()
+
+    with tab1:
+        device_tab("Renogy", "Renogy 12V Devices", renogy_presets, "r", config, summary_slot)
+
+    with tab2:
+        device_tab("EcoFlow", "EcoFlow 240V Devices", ecoflow_presets, "e", config, summary_slot)
+
+    with summary_slot.container():
+        render_summary(config)
+
+    # --- System Components Tab ---
+    with tab3, section("components"):
+        st.subheader("System Components")
+        for comp in system_components:
+            with st.expander(comp["name"]):
+                st.markdown(f"**Description:** {comp['desc']}")
+                st.markdown(f"**Recommended Fuse:** {comp['fuse']}")
+                st.markdown(f"**Wire Gauge:** {comp['wire']}")
+                st.markdown(f"**Placement Notes:** {comp['placement']}")
+
+    with tab3:
+        build_sheet(config)
+
+    with tab4:
+        optimizer_tab(config)
+
+    with tab5:
+        trip_tab(config)
+
+    # --- Version Timeline Footer ---
+    st.markdown("---")
+    st.markdown("### Alfred Version Timeline")
+    st.markdown("""
 **v8.1** – *“The Wiring Whisperer”* – Apr 2025  
 > System Components tab added with install notes, fuse ratings, and wire sizes.  
 > Footer redesigned as a readable timeline.  
@@ -253,11 +672,20 @@ st.markdown("""
 **v7.0** – *“Alfred Awakens”* – Mar 2025  
 > First public version of the Renogy 12V calculator with editable device logic.
 """)
+finally:
+    # Everything above is recorded as this run, including a run stopped part way
+    finish_run()
 
-# --- Dev Mode Toggle (Safe Version) ---
-with st.expander("**Dev Mode: View App Code**"):
-    try:
-        with open(__file__, "r") as f:
-            st.code(f.read())
-    except:
-        st.warning("Dev Mode unavailable in this environment. Try running locally.")
\ No newline at end of file
+# --- Dev Mode: Performance ---
+# The panel shows the rolling figures per section across all sessions in this process.
+with st.expander("**Dev Mode: Performance**"):
+    metrics = summary()
+    st.dataframe(pd.DataFrame(metrics).set_index("section").round(1), width="stretch")
+    st.caption(f"Times in ms over each section's last {WINDOW} runs; widgets and DataFrames are from its latest run."
+               + (f" Exporting to {METRICS_PATH}." if METRICS_PATH else " Set ALFRED_METRICS_FILE to export."))
+    cache = result_cache()
+    if cache is not None:
+        stats = cache.stats()
+        st.caption(f"Result cache: {stats['hits']} hits · {stats['misses']} misses · {stats['evictions']} evicted · "
+                   f"{stats['entries']} entries ({stats['bytes'] / 2 ** 20:.1f} MB) in {CACHE_PATH}")
+    st.download_button("Download metrics (JSON)", metrics_json(metrics), "alfred_metrics.json", "application/json")
@@ -2,6 +2,8 @@
 import streamlit as st
 import pandas as pd
 import math
+import numpy as np
+from power_engine import endurance_days, power_budget
 
 # -- Alfred Status Theme --
 st.set_page_config(page_title="Alfred Power Dashboard", layout="wide")
@@ -37,10 +39,8 @@ battery_option = st.sidebar.select_slider(
     value="3 Batteries (7.2kWh)"
 )
 battery_count = int(battery_option[0])
-battery_wh = battery_count * 200 * 12
 
 eco_flow_toggle = st.sidebar.checkbox("Include EcoFlow Delta Pro (3.6kWh)")
-total_capacity_wh = battery_wh + (3600 if eco_flow_toggle else 0)
 
 # -- SOLAR INPUTS --
 st.sidebar.header("Solar Input")
@@ -49,7 +49,6 @@ watts_per_panel = st.sidebar.number_input("Watts per Panel", min_value=50, max_v
 total_solar_watts = num_panels * watts_per_panel
 
 solar_hours = st.sidebar.slider("Estimated Sunlight Hours per Day (UK realistic range)", 0, 10, 4)
-solar_input_wh = total_solar_watts * solar_hours
 
 # -- ALTERNATOR INPUT (DC-DC CHARGING) --
 st.sidebar.header("Alternator Charging")
@@ -61,8 +60,6 @@ elif drive_time_option == "1 hour":
 else:
     drive_hours = st.sidebar.slider("Custom Drive Time (hours)", 0.0, 5.0, 0.5, step=0.1)
 
-alternator_input_wh = 480 * drive_hours  # 40A × 12V = 480W
-
 # -- DEVICE INPUT --
 st.header("Device Usage")
 device_count = st.number_input("Number of devices", min_value=1, max_value=10, value=3)
@@ -95,9 +92,15 @@ for i in range(device_count):
     devices.append((name, watts, hours))
 
 # -- CALCULATIONS --
-daily_consumption = sum(w * h for _, w, h in devices)
-daily_input = solar_input_wh + alternator_input_wh
-net_daily = daily_consumption - daily_input
+budget = power_budget(
+    battery_count, total_solar_watts, 0, solar_hours, drive_hours,
+    np.array([w for _, w, _ in devices], dtype=float), np.array([h for _, _, h in devices], dtype=float),
+    ecoflow_enabled=eco_flow_toggle,
+)
+total_capacity_wh = int(budget["total_capacity"])
+daily_consumption = float(budget["total_usage"])
+daily_input = float(budget["total_input"])
+net_daily = -float(budget["net_balance"])
 
 # -- RESULTS DISPLAY --
 st.header("Results Overview")
@@ -111,7 +114,7 @@ col3.metric("Total Daily Input", f"{daily_input} Wh")
 st.subheader("Alfred System Status")
 
 percent_used = min((daily_consumption / total_capacity_wh) * 100, 100)
-runtime_days = total_capacity_wh / max(daily_consumption - daily_input, 1)
+runtime_days = float(endurance_days(total_capacity_wh, daily_consumption, daily_input, min_deficit=1))
 runtime_hours = runtime_days * 24
 
 st.progress(min(percent_used / 100, 1.0))
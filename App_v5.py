@@ -1,38 +1,33 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
+import altair as alt
+import numpy as np
+import time
+from power_engine import device_arrays, power_budget
+from cross_charge import simulate_coupled
+from soc_simulation import HOURS_PER_DAY, solar_profile
+from device_catalog import load_catalog
+from charts import cached_spec, downsample
 
 st.set_page_config(page_title="Alfred v5 – Power Calculator", layout="wide")
 
 # --- Preset 12V Devices ---
-preset_devices = [
-    {"name": "LED Puck Lights", "watts": 12, "hours": 6, "enabled": True},
-    {"name": "LED Strip Light", "watts": 6, "hours": 4, "enabled": True},
-    {"name": "Reading Light", "watts": 3, "hours": 2, "enabled": False},
-    {"name": "Compressor Fridge", "watts": 50, "hours": 8, "enabled": True},
-    {"name": "MaxxFan", "watts": 30, "hours": 4, "enabled": True},
-    {"name": "Diesel Heater", "watts": 20, "hours": 2, "enabled": True},
-    {"name": "Water Pump", "watts": 50, "hours": 0.2, "enabled": False},
-    {"name": "Phone Charging", "watts": 10, "hours": 2, "enabled": True},
-    {"name": "Tablet Charging", "watts": 15, "hours": 1, "enabled": False},
-    {"name": "Router (GL.iNet)", "watts": 5, "hours": 24, "enabled": True},
-    {"name": "Renogy One Core", "watts": 2, "hours": 24, "enabled": True}
-]
+@st.cache_resource
+def device_catalog():
+    return load_catalog()
+
+preset_devices = device_catalog().presets("v5")
 
 # --- Sidebar Config ---
 st.sidebar.header("Battery & Input Settings")
 battery_count = st.sidebar.slider("Renogy 200Ah Batteries", 1, 4, 3)
-battery_wh = battery_count * 200 * 12
 
 eco_flow_toggle = st.sidebar.checkbox("Add EcoFlow Delta Pro (3.6kWh)")
-total_capacity = battery_wh + (3600 if eco_flow_toggle else 0)
 
 solar_watts = st.sidebar.number_input("Solar Panel Total (W)", value=400, step=10)
 solar_hours = st.sidebar.slider("Solar Hours per Day", 0, 10, 4)
-solar_input_daily = solar_watts * solar_hours
 
 drive_hours = st.sidebar.slider("Drive Time per Day (hrs)", 0.0, 5.0, 0.5, step=0.1)
-alternator_input_daily = 480 * drive_hours  # 40A * 12V
 
 # --- Main Interface ---
 st.title("Alfred v5 – Campervan Power Calculator")
@@ -51,7 +46,7 @@ with st.form("device_form"):
             with cols[1]:
                 watts = st.number_input("Watts", min_value=1, value=device["watts"], key=f"watts_{i}")
             with cols[2]:
-                hours = st.number_input("Hours/day", min_value=0.0, max_value=24.0, step=0.5, value=device["hours"], key=f"hours_{i}")
+                hours = st.number_input("Hours/day", min_value=0.0, max_value=24.0, step=0.5, value=float(device["hours"]), key=f"hours_{i}")
             with cols[3]:
                 enabled = st.checkbox("On?", value=device["enabled"], key=f"enabled_{i}")
             if enabled:
@@ -70,11 +65,17 @@ with st.form("custom_device"):
         st.success(f"Added {c_name} to your setup!")
 
 # --- Power Calculations ---
-df = pd.DataFrame(enabled_devices)
-df["Daily_Wh"] = df["watts"] * df["hours"]
-daily_usage = df["Daily_Wh"].sum()
-daily_input = solar_input_daily + alternator_input_daily
-net_daily = daily_input - daily_usage
+device_watts, device_hours = device_arrays(enabled_devices)
+budget = power_budget(
+    battery_count, solar_watts, 0, solar_hours, drive_hours, device_watts, device_hours,
+    ecoflow_enabled=eco_flow_toggle,
+)
+total_capacity = int(budget["total_capacity"])
+alternator_input_daily = float(budget["alternator_input"])  # 40A * 12V
+solar_input_daily = float(budget["renogy_input"]) - alternator_input_daily
+daily_usage = float(budget["total_usage"])
+daily_input = float(budget["total_input"])
+net_daily = float(budget["net_balance"])
 
 # --- Summary ---
 st.subheader("System Summary")
@@ -84,9 +85,16 @@ st.write(f"**Daily Input (Solar + Alternator):** {daily_input:.0f} Wh")
 st.write(f"**Net Daily Power Balance:** {net_daily:.0f} Wh")
 
 # --- Chart over 7 Days ---
+# Simulated hour by hour from today with both banks joined by the Orion under their best
+# cross-charge policy, so solar follows the season and each bank is clamped on its own.
+start_day = time.localtime().tm_yday - 1
+week = simulate_coupled(budget, drive_hours, days=7, start_day=start_day, keep_trajectory=True)
+soc_percent = week["soc"][:, 0, week["best"][0]].sum(axis=-1) / max(total_capacity, 1) * 100
+solar_share = solar_profile(7, start_day).reshape(7, HOURS_PER_DAY).sum(axis=1)
+
 days = list(range(1, 8))
 usage = [daily_usage] * 7
-solar_input = [solar_input_daily] * 7
+solar_input = list(solar_input_daily * solar_share)
 alt_input = [alternator_input_daily] * 7
 total_input = [s + a for s, a in zip(solar_input, alt_input)]
 net_balance = [inp - out for inp, out in zip(total_input, usage)]
@@ -99,13 +107,29 @@ df_chart = pd.DataFrame({
 })
 
 st.subheader("7-Day Power Profile")
-import matplotlib.pyplot as plt
-fig, ax = plt.subplots()
-ax.bar(df_chart["Day"], df_chart["Usage"], label="Usage", color="red")
-ax.bar(df_chart["Day"], df_chart["Solar"], label="Solar", bottom=df_chart["Alternator"], color="gold")
-ax.bar(df_chart["Day"], df_chart["Alternator"], label="Alternator", bottom=0, color="blue")
-ax.set_ylabel("Watt-Hours")
-ax.set_xlabel("Day")
-ax.set_title("Daily Usage vs Input")
-ax.legend()
-st.pyplot(fig)
+def week_chart(df_chart, soc_percent):
+    # Usage beside the stacked inputs for each day, with the hourly state of charge on
+    # its own axis; drawn in the browser from a spec cached by its data
+    bars = pd.concat([
+        pd.DataFrame({"Day": df_chart["Day"], "Source": "Usage", "Wh": df_chart["Usage"],
+                      "x": df_chart["Day"] - 0.4, "x2": df_chart["Day"], "y": 0.0, "y2": df_chart["Usage"]}),
+        pd.DataFrame({"Day": df_chart["Day"], "Source": "Alternator", "Wh": df_chart["Alternator"],
+                      "x": df_chart["Day"], "x2": df_chart["Day"] + 0.4, "y": 0.0, "y2": df_chart["Alternator"]}),
+        pd.DataFrame({"Day": df_chart["Day"], "Source": "Solar", "Wh": df_chart["Solar"],
+                      "x": df_chart["Day"], "x2": df_chart["Day"] + 0.4, "y": df_chart["Alternator"],
+                      "y2": df_chart["Alternator"] + df_chart["Solar"]}),
+    ])
+    soc = downsample(pd.DataFrame({"Day": 0.5 + np.arange(len(soc_percent)) / HOURS_PER_DAY,
+                                   "State of Charge (%)": soc_percent}), "Day", "State of Charge (%)")
+    colors = alt.Scale(domain=["Usage", "Solar", "Alternator"], range=["red", "gold", "blue"])
+    daily = alt.Chart(bars).mark_bar().encode(
+        x=alt.X("x:Q", title="Day", scale=alt.Scale(domain=[0.5, len(df_chart) + 0.5])), x2="x2",
+        y=alt.Y("y:Q", title="Watt-Hours"), y2="y2",
+        color=alt.Color("Source:N", scale=colors), tooltip=["Day", "Source", alt.Tooltip("Wh:Q", format=".0f")],
+    )
+    charge = alt.Chart(soc).mark_line(color="green").encode(
+        x="Day:Q", y=alt.Y("State of Charge (%):Q", scale=alt.Scale(domain=[0, 105])),
+    )
+    return alt.layer(daily, charge).resolve_scale(y="independent").properties(title="Daily Usage vs Input")
+
+st.vega_lite_chart(spec=cached_spec(week_chart, df_chart, soc_percent), width="stretch")
@@ -0,0 +1,312 @@
+# ALFRED API – asyncio JSON service exposing the calculator to booking and fleet tools
+#
+#   python api_server.py --port 8750 --workers 4
+#
+# Endpoints:
+#   GET  /health       {"status": "ok", "workers": n}
+#   POST /calculate    one configuration -> power budget and days until a bank runs flat
+#   POST /batch        {"configs": [...], "start_day": d} -> one result per line (NDJSON),
+#                      streamed chunk by chunk as the worker pool finishes them
+#   POST /endurance    one configuration, optionally with runs, days and seed -> Monte Carlo
+#                      P10/P50/P90 days of autonomy
+#
+# A configuration takes the batch_cli.py columns (batteries, renogy_solar, ecoflow_solar,
+# solar_level, drive_hours, show_renogy, show_ecoflow), any missing one taking the App.py
+# sidebar default, plus optional renogy_devices / ecoflow_devices lists of
+# {name, watts, hours, enabled} which default to the App.py presets, an optional start_day
+# and an optional id echoed back in the result. days is null for a system that never runs
+# flat; cross_charge names the Orion policy it was simulated with.
+#
+# The event loop only parses and writes; every calculation runs in a process pool, so
+# many requests are served at once while the simulations use every core. SIGINT or
+# SIGTERM stops serving and shuts the pool down, so no worker outlives the server.
+import argparse
+import asyncio
+import json
+import math
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from batch_cli import CONFIG_DEFAULTS, OUTPUT_COLUMNS, Lookahead, evaluate_chunk
+from device_catalog import load_catalog
+from monte_carlo import monte_carlo_endurance
+from power_engine import parse_solar_level, power_budget
+
+RESULT_FIELDS = OUTPUT_COLUMNS[1:]
+BATCH_CHUNK = 100           # configurations per worker task
+MAX_BATCH = 100_000         # configurations per /batch request
+MAX_BODY_BYTES = 32 * 2 ** 20
+MAX_RUNS = 20_000           # Monte Carlo runs per /endurance request
+MAX_DAYS = 365
+REQUEST_FIELDS = set(CONFIG_DEFAULTS) | {"id", "start_day", "renogy_devices", "ecoflow_devices"}
+STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+          413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+# --- Configurations ---
+def _usage_wh(devices):
+    return sum(float(d["watts"]) * float(d["hours"]) for d in devices if d.get("enabled", True))
+
+
+def config_row(config, presets):
+    """Validated flat row for one request configuration, with its daily device usage in Wh."""
+    if not isinstance(config, dict):
+        raise ValueError("a configuration must be a JSON object")
+    unknown = set(config) - REQUEST_FIELDS
+    if unknown:
+        raise ValueError(f"unknown field(s) {', '.join(sorted(unknown))}")
+    row = {**CONFIG_DEFAULTS, **{k: v for k, v in config.items() if k in CONFIG_DEFAULTS}}
+    row["batteries"] = int(row["batteries"])
+    row["renogy_solar"] = float(row["renogy_solar"])
+    row["ecoflow_solar"] = float(row["ecoflow_solar"])
+    row["drive_hours"] = float(row["drive_hours"])
+    row["show_renogy"] = bool(row["show_renogy"])
+    row["show_ecoflow"] = bool(row["show_ecoflow"])
+    row["solar_level"] = parse_solar_level(row["solar_level"])
+    for system in ("renogy", "ecoflow"):
+        devices = config.get(f"{system}_devices", presets[system])
+        if not isinstance(devices, list) or not all(isinstance(d, dict) for d in devices):
+            raise ValueError(f"{system}_devices must be a list of device objects")
+        row[f"{system}_usage_wh"] = _usage_wh(devices)
+    return row
+
+
+def _json_value(value):
+    if isinstance(value, str):
+        return value
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+
+# --- Worker tasks (run in the process pool) ---
+def evaluate_rows(rows, start_day):
+    """Budget and hourly-simulated days for a list of config_row() rows, as result dicts."""
+    chunk = pd.DataFrame(rows)
+    usage = Lookahead(zip(range(len(rows)), chunk.pop("renogy_usage_wh"), chunk.pop("ecoflow_usage_wh")))
+    chunk["van_id"] = np.arange(len(rows))
+    budget = evaluate_chunk(chunk, usage, start_day=start_day)
+    return [{field: _json_value(budget[field][i]) for field in RESULT_FIELDS} for i in range(len(rows))]
+
+
+def endurance(row, start_day, runs, days, seed):
+    budget = power_budget(
+        row["batteries"], row["renogy_solar"], row["ecoflow_solar"], row["solar_level"], row["drive_hours"],
+        [row["renogy_usage_wh"]], [1.0], [row["ecoflow_usage_wh"]], [1.0],
+        renogy_enabled=row["show_renogy"], ecoflow_enabled=row["show_ecoflow"],
+    )
+    # The weather runs use the cross-charge policy the deterministic days were found under
+    result = evaluate_rows([row], start_day)[0]
+    weather = monte_carlo_endurance(budget, row["drive_hours"], runs=runs, days=days, start_day=start_day,
+                                    seed=seed, workers=1, policy=result["cross_charge"])
+    return {**result, **{k: weather[k] for k in ("p10", "p50", "p90", "censored", "horizon_days")}}
+
+
+# --- HTTP ---
+async def read_request(reader):
+    """(method, path, headers, body) of the next request on a connection, or None once it closes."""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HTTPError(400, "Content-Length must be a whole number of bytes")
+    if length < 0:
+        raise HTTPError(400, "Content-Length must be a whole number of bytes")
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, f"request body over {MAX_BODY_BYTES} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?", 1)[0], headers, body
+
+
+def _head(status, content_type, keep_alive, length=None):
+    lines = [f"HTTP/1.1 {status} {STATUS.get(status, '')}", f"Content-Type: {content_type}",
+             "Connection: " + ("keep-alive" if keep_alive else "close")]
+    lines.append(f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode()
+
+
+async def send_json(writer, status, payload, keep_alive=True):
+    body = json.dumps(payload).encode()
+    writer.write(_head(status, "application/json", keep_alive, len(body)) + body)
+    await writer.drain()
+
+
+async def send_chunk(writer, data):
+    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+    await writer.drain()
+
+
+class CalculatorAPI:
+    """The HTTP routes, holding the worker pool and the App.py presets."""
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        catalog = load_catalog()
+        self.presets = {system: catalog.presets(system) for system in ("renogy", "ecoflow")}
+        self.routes = {"/health": ("GET", self.health), "/calculate": ("POST", self.calculate),
+                       "/batch": ("POST", self.batch), "/endurance": ("POST", self.endurance)}
+
+    def run_in_pool(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    def _parse(self, body):
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError as e:
+            raise HTTPError(400, f"invalid JSON: {e}")
+        if not isinstance(payload, dict):
+            raise HTTPError(400, "request body must be a JSON object")
+        return payload
+
+    def _row(self, config, where="configuration"):
+        try:
+            return config_row(config, self.presets)
+        except (ValueError, TypeError, KeyError) as e:
+            raise HTTPError(400, f"{where}: {e}")
+
+    @staticmethod
+    def _start_day(payload):
+        try:
+            return int(payload.get("start_day", time.localtime().tm_yday - 1)) % 365
+        except (TypeError, ValueError):
+            raise HTTPError(400, "start_day must be a whole day of the year")
+
+    async def health(self, payload, writer, keep_alive):
+        await send_json(writer, 200, {"status": "ok", "workers": self.workers}, keep_alive)
+
+    async def calculate(self, payload, writer, keep_alive):
+        row = self._row(payload)
+        [result] = await self.run_in_pool(evaluate_rows, [row], self._start_day(payload))
+        await send_json(writer, 200, {"id": payload.get("id"), **result}, keep_alive)
+
+    async def endurance(self, payload, writer, keep_alive):
+        options = {k: payload.pop(k) for k in ("runs", "days", "seed") if k in payload}
+        row = self._row(payload)
+        try:
+            runs, days, seed = int(options.get("runs", 2000)), int(options.get("days", 90)), int(options.get("seed", 0))
+        except (TypeError, ValueError):
+            raise HTTPError(400, "runs, days and seed must be whole numbers")
+        if not (1 <= runs <= MAX_RUNS and 1 <= days <= MAX_DAYS):
+            raise HTTPError(400, f"runs must be 1–{MAX_RUNS} and days 1–{MAX_DAYS}")
+        result = await self.run_in_pool(endurance, row, self._start_day(payload), runs, days, seed)
+        await send_json(writer, 200, {"id": payload.get("id"), **result}, keep_alive)
+
+    async def batch(self, payload, writer, keep_alive):
+        configs = payload.get("configs")
+        if not isinstance(configs, list) or not configs:
+            raise HTTPError(400, "configs must be a non-empty list of configurations")
+        if len(configs) > MAX_BATCH:
+            raise HTTPError(400, f"at most {MAX_BATCH} configurations per batch")
+        start_day = self._start_day(payload)
+        rows = [self._row(config, f"configs[{i}]") for i, config in enumerate(configs)]
+        ids = [config.get("id", i) for i, config in enumerate(configs)]
+
+        # Chunks are handed to the pool a few at a time and written back in request
+        # order as they finish, so the first results leave before the last are computed
+        writer.write(_head(200, "application/x-ndjson", keep_alive))
+        pending = deque()
+        try:
+            for start in range(0, len(rows), BATCH_CHUNK):
+                pending.append((start, self.run_in_pool(evaluate_rows, rows[start:start + BATCH_CHUNK], start_day)))
+                if len(pending) >= 2 * self.workers:
+                    await self._send_results(writer, ids, *pending.popleft())
+            while pending:
+                await self._send_results(writer, ids, *pending.popleft())
+        except Exception as e:
+            for _, future in pending:
+                future.cancel()
+            if isinstance(e, ConnectionError):
+                raise
+            # Headers are already sent, so the failure goes out as the last line
+            await send_chunk(writer, json.dumps({"error": str(e)}).encode() + b"\n")
+        await send_chunk(writer, b"")
+
+    @staticmethod
+    async def _send_results(writer, ids, start, future):
+        results = await future
+        lines = (json.dumps({"id": ids[start + i], **result}) for i, result in enumerate(results))
+        await send_chunk(writer, ("\n".join(lines) + "\n").encode())
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, path, headers, body = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    if path not in self.routes:
+                        raise HTTPError(404, f"no endpoint {path}")
+                    allowed, handler = self.routes[path]
+                    if method != allowed:
+                        raise HTTPError(405, f"{path} takes {allowed}")
+                    await handler(self._parse(body) if method == "POST" else {}, writer, keep_alive)
+                except HTTPError as e:
+                    await send_json(writer, e.status, {"error": str(e)}, keep_alive)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    break
+                except Exception as e:
+                    await send_json(writer, 500, {"error": f"{type(e).__name__}: {e}"}, keep_alive=False)
+                    break
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        """Serve until SIGINT or SIGTERM."""
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        server = await asyncio.start_server(self.handle, host, port, limit=2 ** 16)
+        print(f"Alfred API on http://{host}:{port} with {self.workers} workers", flush=True)
+        async with server:
+            await stop.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Alfred power calculator as a local JSON API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8750)
+    parser.add_argument("--workers", type=int, default=None, help="calculation processes (default: one per CPU)")
+    args = parser.parse_args(argv)
+
+    api = CalculatorAPI(args.workers)
+    try:
+        asyncio.run(api.serve(args.host, args.port))
+    finally:
+        api.pool.shutdown(cancel_futures=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+# ALFRED Batch – stream fleet configuration files through the power calculator
+#
+#   python batch_cli.py vans.csv --devices devices.parquet -o results.csv
+#
+# Configuration file: one row per van. Only van_id is required; any other missing
+# column takes the App.py sidebar default.
+#   van_id, batteries, renogy_solar, ecoflow_solar, solar_level (Low/Medium/High or
+#   peak-sun hours), drive_hours, show_renogy, show_ecoflow
+#
+# Device file: one row per device, grouped by van in the same order as the
+# configuration file (vans with no devices may be left out). A van's rows must be
+# contiguous; rows split by another van's are rejected rather than summed.
+#   van_id, system (renogy/ecoflow), watts, hours, enabled
+#
+# Both files are read in chunks and results are written as each chunk is evaluated,
+# so memory stays flat whatever the size of the input. With -o the results go to
+# <output>.partial, renamed over <output> only once every van has been evaluated;
+# without it they are spooled to a temporary file and printed once every van has been
+# evaluated, so a device file that fails to match prints nothing.
+import argparse
+import contextlib
+import csv
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from power_engine import power_budget
+from cross_charge import best_policy_days
+
+CONFIG_DEFAULTS = {
+    "batteries": 3,
+    "renogy_solar": 360,
+    "ecoflow_solar": 400,
+    "solar_level": "Medium",
+    "drive_hours": 0.5,
+    "show_renogy": True,
+    "show_ecoflow": True,
+}
+
+OUTPUT_COLUMNS = [
+    "van_id", "total_capacity", "renogy_usage", "ecoflow_usage", "renogy_input", "ecoflow_input",
+    "total_usage", "total_input", "net_balance", "days", "cross_charge", "ev_recharge_hours",
+]
+
+
+def read_chunks(path, chunksize):
+    """Yield DataFrames of at most chunksize rows from a CSV or Parquet file."""
+    if str(path).lower().endswith((".parquet", ".pq")):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunksize)
+
+
+def van_usage(path, chunksize):
+    """Yield (van_id, renogy_wh, ecoflow_wh) per van from a device file, in file order.
+
+    Rows are summed per chunk with a groupby; a van split across a chunk boundary is
+    carried into the next chunk, so only one partial van is ever held in memory. A van
+    whose rows are split by another van's within a chunk, or straight after one, raises
+    SystemExit; one that reappears further on is yielded twice and left unmatched in run().
+    """
+    pending = None
+    for chunk in read_chunks(path, chunksize):
+        _check_grouped(chunk["van_id"] if pending is None else
+                       pd.concat([pd.Series([pending[0]]), chunk["van_id"]], ignore_index=True))
+        enabled = chunk["enabled"].astype(bool) if "enabled" in chunk else True
+        wh = chunk["watts"] * chunk["hours"] * enabled
+        system = chunk["system"].str.lower()
+        totals = pd.DataFrame({
+            "van_id": chunk["van_id"],
+            "renogy": wh.where(system == "renogy", 0),
+            "ecoflow": wh.where(system == "ecoflow", 0),
+        }).groupby("van_id", sort=False).sum()
+
+        rows = list(totals.itertuples(name=None))
+        if pending is not None:
+            if rows and rows[0][0] == pending[0]:
+                rows[0] = (pending[0], pending[1] + rows[0][1], pending[2] + rows[0][2])
+            else:
+                rows.insert(0, pending)
+        pending = rows.pop() if rows else pending
+        yield from rows
+    if pending is not None:
+        yield pending
+
+
+def _check_grouped(van_ids):
+    starts = van_ids[van_ids.ne(van_ids.shift())]
+    repeated = starts[starts.duplicated()]
+    if len(repeated):
+        raise SystemExit(f"Device rows for van {repeated.iloc[0]!r} are split by another van's rows – "
+                         "the device file must list each van's rows together.")
+
+
+def with_defaults(chunk):
+    for column, default in CONFIG_DEFAULTS.items():
+        if column not in chunk:
+            chunk[column] = default
+    return chunk
+
+
+def evaluate_chunk(chunk, devices, simulate=True, start_day=0):
+    """Evaluate one chunk of van configurations, consuming their device totals from devices."""
+    chunk = with_defaults(chunk)
+    renogy_usage = np.zeros(len(chunk))
+    ecoflow_usage = np.zeros(len(chunk))
+    for i, van_id in enumerate(chunk["van_id"]):
+        if devices.peek is not None and devices.peek[0] == van_id:
+            _, renogy_usage[i], ecoflow_usage[i] = devices.take()
+
+    ones = np.ones((len(chunk), 1))
+    budget = power_budget(
+        chunk["batteries"].to_numpy(), chunk["renogy_solar"].to_numpy(), chunk["ecoflow_solar"].to_numpy(),
+        chunk["solar_level"].to_numpy(), chunk["drive_hours"].to_numpy(),
+        renogy_usage[:, None], ones, ecoflow_usage[:, None], ones,
+        renogy_enabled=chunk["show_renogy"].astype(bool).to_numpy(),
+        ecoflow_enabled=chunk["show_ecoflow"].astype(bool).to_numpy(),
+    )
+
+    if simulate:
+        # Same rule as App.py: days until the first enabled bank runs flat, hour by hour,
+        # with both banks joined by the Orion under whichever cross-charge policy lasts longest
+        budget["days"], budget["cross_charge"] = best_policy_days(budget, chunk["drive_hours"].to_numpy(),
+                                                                  start_day=start_day)
+    else:
+        budget["cross_charge"] = np.full(len(chunk), "")
+
+    budget["van_id"] = chunk["van_id"].to_numpy()
+    return budget
+
+
+class Lookahead:
+    """Iterator wrapper exposing the next item without consuming it."""
+
+    def __init__(self, iterable):
+        self._it = iter(iterable)
+        self.peek = next(self._it, None)
+
+    def take(self):
+        item, self.peek = self.peek, next(self._it, None)
+        return item
+
+
+def run(config_path, device_path, out, chunksize=50_000, simulate=True, start_day=0, progress=sys.stderr):
+    devices = Lookahead(van_usage(device_path, chunksize) if device_path else ())
+    writer = csv.writer(out)
+    writer.writerow(OUTPUT_COLUMNS)
+
+    rows, started = 0, time.perf_counter()
+    for chunk in read_chunks(config_path, chunksize):
+        result = evaluate_chunk(chunk, devices, simulate, start_day)
+        if devices.peek is not None and (chunk["van_id"] == devices.peek[0]).any():
+            _out_of_order(devices.peek[0])
+        for row in zip(*(result[column] for column in OUTPUT_COLUMNS)):
+            writer.writerow(row)
+        out.flush()
+
+        rows += len(chunk)
+        elapsed = time.perf_counter() - started
+        print(f"{rows:,} vans evaluated in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} vans/s)",
+              file=progress, flush=True)
+
+    if devices.peek is not None:
+        _out_of_order(devices.peek[0])
+    return rows
+
+
+def _out_of_order(van_id):
+    raise SystemExit(f"Device rows for van {van_id!r} did not match any configuration – "
+                     "the device file must list vans in the same order as the configuration file.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate fleet van configurations with the Alfred power calculator.")
+    parser.add_argument("configs", help="CSV or Parquet file of van configurations")
+    parser.add_argument("--devices", help="CSV or Parquet file of device lists, grouped by van")
+    parser.add_argument("-o", "--output", help="results CSV (default: stdout)")
+    parser.add_argument("--chunksize", type=int, default=50_000, help="rows read per chunk")
+    parser.add_argument("--quick", action="store_true",
+                        help="use the daily capacity / deficit formula instead of the hourly simulation")
+    parser.add_argument("--start-day", type=int, default=time.localtime().tm_yday - 1,
+                        help="day of year the simulation starts on (default: today)")
+    args = parser.parse_args(argv)
+
+    if args.output:
+        partial = args.output + ".partial"
+        try:
+            with open(partial, "w", newline="") as out:
+                run(args.configs, args.devices, out, args.chunksize, not args.quick, args.start_day)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(partial)
+            raise
+        os.replace(partial, args.output)
+    else:
+        with tempfile.TemporaryFile("w+", newline="") as out:
+            run(args.configs, args.devices, out, args.chunksize, not args.quick, args.start_day)
+            out.seek(0)
+            shutil.copyfileobj(out, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# ALFRED API load test – requests/sec and latency percentiles for api_server.py
+#
+#   python benchmarks/load_test.py                                  # starts its own server
+#   python benchmarks/load_test.py --url http://127.0.0.1:8750 --endpoint batch --batch-size 1000
+#
+# Each of --concurrency clients holds one keep-alive connection and sends requests
+# back to back for --duration seconds; latency is measured from sending a request to
+# reading the last byte of its response.
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STOP_TIMEOUT = 10           # seconds a started server gets to shut down before it is killed
+
+
+def _payload(endpoint, batch_size):
+    config = {"batteries": 2, "renogy_solar": 400, "solar_level": "Low", "drive_hours": 1.0}
+    if endpoint == "batch":
+        return {"configs": [{**config, "id": i, "batteries": 1 + i % 4} for i in range(batch_size)]}
+    if endpoint == "endurance":
+        return {**config, "runs": 500, "days": 60}
+    return config
+
+
+async def _read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        body = b""
+        while size := int((await reader.readline()).strip(), 16):
+            body += await reader.readexactly(size + 2)
+        await reader.readline()
+    return status, body
+
+
+async def _client(host, port, request, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, _ = await _read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def load_test(url, endpoint, concurrency, duration, batch_size):
+    parts = urlsplit(url)
+    body = json.dumps(_payload(endpoint, batch_size)).encode()
+    request = (f"POST /{endpoint} HTTP/1.1\r\nHost: {parts.netloc}\r\nContent-Type: application/json\r\n"
+               f"Content-Length: {len(body)}\r\n\r\n").encode() + body
+    latencies, errors = [], []
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(parts.hostname, parts.port, request, started + duration, latencies, errors)
+                           for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    ms = np.array(latencies) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99]) if len(ms) else (np.nan,) * 3
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_s": len(latencies) / elapsed,
+        "configs_per_s": len(latencies) * (batch_size if endpoint == "batch" else 1) / elapsed,
+        "p50_ms": float(p50),
+        "p90_ms": float(p90),
+        "p99_ms": float(p99),
+    }
+
+
+def _start_server(workers):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    args = [sys.executable, os.path.join(ROOT, "api_server.py"), "--port", str(port)]
+    if workers:
+        args += ["--workers", str(workers)]
+    # In its own process group, so the server and its worker pool can be stopped together
+    server = subprocess.Popen(args, cwd=ROOT, stdout=subprocess.PIPE, text=True, start_new_session=True)
+    server.stdout.readline()    # the server prints one line once it is listening
+    return server, f"http://127.0.0.1:{port}"
+
+
+def _stop_server(server):
+    # SIGINT lets the server shut its worker pool down; whatever is left after
+    # STOP_TIMEOUT seconds is killed, workers included
+    server.send_signal(signal.SIGINT)
+    try:
+        server.wait(STOP_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        os.killpg(server.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    server.wait()
+    server.stdout.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the Alfred JSON API.")
+    parser.add_argument("--url", help="running server to test (default: start one on a free port)")
+    parser.add_argument("--workers", type=int, help="worker processes for a server started by this script")
+    parser.add_argument("--endpoint", choices=["calculate", "batch", "endurance"], default="calculate")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to keep sending requests")
+    parser.add_argument("--batch-size", type=int, default=500, help="configurations per /batch request")
+    args = parser.parse_args(argv)
+
+    server, url = (None, args.url) if args.url else _start_server(args.workers)
+    try:
+        result = asyncio.run(load_test(url, args.endpoint, args.concurrency, args.duration, args.batch_size))
+    finally:
+        if server is not None:
+            _stop_server(server)
+    print(json.dumps(result))
+    print(f"{result['requests']} requests to /{args.endpoint} ({result['errors']} errors): "
+          f"{result['requests_per_s']:,.1f} req/s, {result['configs_per_s']:,.0f} configs/s, "
+          f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
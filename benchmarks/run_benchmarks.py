@@ -0,0 +1,379 @@
+# ALFRED Benchmarks – app rerun latency, memory and calculation throughput
+#
+#   python benchmarks/run_benchmarks.py                 # everything, appended to benchmarks/history.jsonl
+#   python benchmarks/run_benchmarks.py --apps App.py --sizes 10 100
+#   python benchmarks/run_benchmarks.py --compare       # print change against the previous run
+#
+# Apps are driven headlessly through streamlit.testing (AppTest). Each record in the
+# history file is one run: git commit, versions and a flat list of measurements, so
+# regressions between commits and between app versions show up as numbers. A benchmark
+# that breaks is recorded as failed, with its error, and the script exits non-zero.
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+import traceback
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Time the calculations themselves, not whatever an earlier run left in the shared result cache
+os.environ.setdefault("ALFRED_RESULT_CACHE", "")
+
+import numpy as np  # noqa: E402
+
+APPS = ["App.py", "App_v3.py", "App_v5.py"]
+SIZES = [10, 100, 1000]
+HISTORY = os.path.join(ROOT, "benchmarks", "history.jsonl")
+RERUN_TARGET_MS = 250       # interaction latency budget for a fragment rerun of App.py
+TIMEOUT = 300
+
+
+def _quiet_streamlit():
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+
+def _devices(count, watts):
+    return [{"name": f"Device {i}", "watts": watts, "hours": 1.0, "enabled": i % 3 != 0} for i in range(count)]
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def _best_of(fn, repeat):
+    return min(_timed(fn) for _ in range(repeat))
+
+
+# --- App Setup & Interactions ---
+# Each app builds its device list differently, so each gets a setup (size the list,
+# return the device count actually shown) and an interaction (one widget change).
+def _setup_app(at, size):
+    from device_list import DeviceList
+
+    at.session_state["renogy_devices"] = DeviceList.from_devices(_devices(size, 10))
+    at.session_state["ecoflow_devices"] = DeviceList.from_devices(_devices(size, 100))
+    return size
+
+
+def _ecoflow_grid(at):
+    grids = [e for e in at.get("dataframe") if e.key and e.key.startswith("eeditor_")]
+    if not grids:
+        raise RuntimeError("App.py drew no EcoFlow device grid")
+    return grids[0]
+
+
+def _interact_app(at):
+    # AppTest has no data_editor API, so the edit delta the browser would send for
+    # the EcoFlow grid is added to the widget states of the next run. Returns the
+    # watts written to the first device.
+    from streamlit.testing.v1.element_tree import ElementTree
+
+    if not hasattr(ElementTree, "get_widget_states"):
+        raise RuntimeError("streamlit.testing's ElementTree.get_widget_states is gone; grid edits can't be replayed")
+    grid = _ecoflow_grid(at)
+    watts = int(grid.value["watts"][0]) % 5000 + 1
+    delta = json.dumps({"edited_rows": {"0": {"watts": watts}}, "added_rows": [], "deleted_rows": []})
+    get_widget_states = ElementTree.get_widget_states
+
+    def with_grid_edit(tree):
+        ElementTree.get_widget_states = get_widget_states
+        states = get_widget_states(tree)
+        states.widgets.add(id=grid.proto.id, string_value=delta)
+        return states
+
+    update = [b for b in at.button if b.label == "Update EcoFlow Devices"]
+    if not update:
+        raise RuntimeError("App.py drew no Update EcoFlow Devices button")
+    ElementTree.get_widget_states = with_grid_edit
+    update[0].click()
+    return watts
+
+
+def _setup_v3(at, size):
+    # App_v3 caps its "Number of devices" input at 10
+    return min(size, 10)
+
+
+def _after_first_run_v3(at, size):
+    [n for n in at.number_input if n.label == "Number of devices"][0].set_value(size)
+    at.run(timeout=TIMEOUT)
+
+
+def _interact_v3(at):
+    at.number_input(key="watts_0").set_value(at.number_input(key="watts_0").value + 10)
+
+
+def _setup_v5(at, size):
+    # App_v5 only edits its fixed preset list
+    return 11
+
+
+def _interact_v5(at):
+    slider = at.sidebar.slider[0]
+    slider.set_value(2 if slider.value != 2 else 3)
+
+
+APP_DRIVERS = {
+    "App.py": (_setup_app, None, _interact_app),
+    "App_v3.py": (_setup_v3, _after_first_run_v3, _interact_v3),
+    "App_v5.py": (_setup_v5, None, _interact_v5),
+}
+
+
+def _ecoflow_fragment(at):
+    # Id of the fragment App.py's EcoFlow tab registered, found by the arguments it was called with
+    for fragment_id, fragment in getattr(getattr(at, "_fragment_storage", None), "_fragments", {}).items():
+        cells = dict(zip(fragment.__code__.co_freevars, (c.cell_contents for c in fragment.__closure__ or ())))
+        if tuple(cells.get("args", ()))[:1] == ("EcoFlow",):
+            return fragment_id
+    raise RuntimeError("no EcoFlow tab fragment in AppTest's fragment storage; streamlit internals have changed")
+
+
+def _section_runs():
+    from profiling import summary
+
+    return {row["section"]: row["samples"] for row in summary()}
+
+
+def _fragment_rerun_ms(at):
+    """Milliseconds for the EcoFlow form submit replayed the way a browser sends it: as a
+    rerun of that tab's fragment only.
+
+    AppTest can't rerun a single fragment, so this reaches into streamlit internals. It
+    raises RuntimeError if they have changed, if the whole script ran instead of the
+    fragment, or if the edit didn't reach the grid.
+    """
+    import functools
+    import streamlit.testing.v1.local_script_runner as local_runner
+    from streamlit.runtime.scriptrunner_utils.script_requests import RerunData
+
+    if getattr(local_runner, "RerunData", None) is not RerunData:
+        raise RuntimeError("streamlit.testing no longer builds its reruns from RerunData")
+    ecoflow_fragment = _ecoflow_fragment(at)
+    watts = _interact_app(at)
+    before = _section_runs()
+    local_runner.RerunData = functools.partial(RerunData, fragment_id_queue=[ecoflow_fragment])
+    try:
+        ms = _timed(lambda: at.run(timeout=TIMEOUT))
+    finally:
+        local_runner.RerunData = RerunData
+    after = _section_runs()
+    if at.exception:
+        raise RuntimeError(f"App.py raised during the fragment rerun: {at.exception[0].value}")
+    if after.get("run") != before.get("run") or after.get("ecoflow_tab") != before.get("ecoflow_tab", 0) + 1:
+        raise RuntimeError("the fragment rerun didn't run just the EcoFlow tab")
+    if int(_ecoflow_grid(at).value["watts"][0]) != watts:
+        raise RuntimeError("the replayed grid edit didn't reach the EcoFlow devices")
+    return ms
+
+
+def _failed(app, devices, metric, error):
+    return {"group": "app", "app": app, "devices": devices, "metric": metric, "value": None, "unit": None,
+            "error": f"{type(error).__name__}: {error}"}
+
+
+def cold_start_ms(app):
+    """First run of an app in a fresh interpreter, including imports."""
+    code = (
+        "import time, logging; t = time.perf_counter();"
+        "from streamlit.testing.v1 import AppTest;"
+        f"AppTest.from_file({os.path.join(ROOT, app)!r}, default_timeout={TIMEOUT}).run();"
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=ROOT)
+    if out.returncode:
+        raise RuntimeError(f"{app} failed to start: {out.stderr.strip().splitlines()[-1:]}")
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def bench_app(app, size, interactions):
+    from streamlit.testing.v1 import AppTest
+
+    setup, after_first_run, interact = APP_DRIVERS[app]
+    at = AppTest.from_file(os.path.join(ROOT, app), default_timeout=TIMEOUT)
+    devices = setup(at, size)
+
+    first_ms = _timed(lambda: at.run(timeout=TIMEOUT))
+    if after_first_run:
+        after_first_run(at, size)
+
+    rerun_ms = []
+    for _ in range(interactions):
+        interact(at)
+        rerun_ms.append(_timed(lambda: at.run(timeout=TIMEOUT)))
+
+    # Memory is traced on one extra interaction so tracing overhead stays out of the timings
+    tracemalloc.start()
+    interact(at)
+    at.run(timeout=TIMEOUT)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if at.exception:
+        raise RuntimeError(f"{app} raised during benchmark: {at.exception[0].value}")
+
+    results = [
+        ("first_run_ms", first_ms, "ms"),
+        ("rerun_p50_ms", float(np.percentile(rerun_ms, 50)), "ms"),
+        ("rerun_max_ms", max(rerun_ms), "ms"),
+        ("rerun_peak_mem_mb", peak / 2 ** 20, "MB"),
+    ]
+    results = [{"group": "app", "app": app, "devices": devices, "metric": m, "value": v, "unit": u}
+               for m, v, u in results]
+    if app == "App.py":
+        try:
+            results.append({"group": "app", "app": app, "devices": devices, "metric": "fragment_rerun_ms",
+                            "value": _fragment_rerun_ms(at), "unit": "ms"})
+        except Exception as e:
+            results.append(_failed(app, devices, "fragment_rerun_ms", e))
+    return results
+
+
+# --- Calculation Micro-benchmarks ---
+def bench_calculations(repeat):
+    from batch_cli import Lookahead, evaluate_chunk
+    from monte_carlo import monte_carlo_endurance
+    from optimizer import optimise_setup
+    from power_engine import power_budget
+    import pandas as pd
+    from soc_simulation import simulate_year
+
+    rng = np.random.default_rng(0)
+    results = []
+
+    def record(name, configs, ms):
+        results.append({"group": "calc", "app": None, "devices": None, "metric": name,
+                        "value": ms, "unit": "ms", "configs": configs})
+        results.append({"group": "calc", "app": None, "devices": None, "metric": f"{name}_per_s",
+                        "value": configs / (ms / 1000), "unit": "configs/s", "configs": configs})
+
+    single = power_budget(3, 360, 400, "Medium", 0.5, rng.uniform(1, 100, 9), rng.uniform(0, 10, 9),
+                          rng.uniform(100, 1800, 7), rng.uniform(0, 1, 7))
+    record("power_budget_single", 1, _best_of(lambda: power_budget(
+        3, 360, 400, "Medium", 0.5, rng.uniform(1, 100, 9), rng.uniform(0, 10, 9),
+        rng.uniform(100, 1800, 7), rng.uniform(0, 1, 7)), repeat))
+
+    n = 10_000
+    fleet_args = (rng.integers(1, 5, n), 360, 400, rng.choice(["Low", "Medium", "High"], n), 0.5,
+                  rng.uniform(1, 100, (n, 20)), rng.uniform(0, 10, (n, 20)),
+                  rng.uniform(100, 1800, (n, 10)), rng.uniform(0, 1, (n, 10)))
+    fleet = power_budget(*fleet_args)
+    record("power_budget_fleet", n, _best_of(lambda: power_budget(*fleet_args), repeat))
+
+    record("simulate_year_single", 1, _best_of(lambda: simulate_year(single, 0.5), repeat))
+    subset = {key: np.atleast_1d(value)[:1000] if np.ndim(value) else value for key, value in fleet.items()}
+    record("simulate_year_batch", 1000, _best_of(lambda: simulate_year(subset, 0.5, keep_trajectory=False), 1))
+
+    record("monte_carlo_2000", 2000, _best_of(lambda: monte_carlo_endurance(single, 0.5, workers=1), 1))
+
+    presets = _devices(9, 40), _devices(7, 900)
+    record("optimise_setup", 1, _best_of(lambda: optimise_setup(*presets, 5, max_batteries=12), repeat))
+
+    chunk = pd.DataFrame({"van_id": np.arange(5000), "batteries": rng.integers(1, 5, 5000)})
+    record("batch_chunk_quick", 5000, _best_of(
+        lambda: evaluate_chunk(chunk.copy(), Lookahead(()), simulate=False), repeat))
+    return results
+
+
+# --- History ---
+def _git_commit():
+    out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=ROOT)
+    return out.stdout.strip() or None
+
+
+def _key(result):
+    return result["group"], result["app"], result["devices"], result["metric"]
+
+
+def compare(previous, current):
+    before = {_key(r): r["value"] for r in previous["results"]}
+    for result in current["results"]:
+        label = " ".join(str(part) for part in _key(result)[1:] if part is not None)
+        if result["value"] is None:
+            print(f"{label:<45} {'FAILED':>12} {result['error']}")
+            continue
+        old = before.get(_key(result))
+        change = "" if not old else f"{(result['value'] - old) / old:+.1%}"
+        print(f"{label:<45} {result['value']:>12.2f} {result['unit']:<10} {change}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Alfred apps and calculation paths.")
+    parser.add_argument("--apps", nargs="*", default=APPS)
+    parser.add_argument("--sizes", nargs="*", type=int, default=SIZES)
+    parser.add_argument("--interactions", type=int, default=5, help="widget interactions timed per app and size")
+    parser.add_argument("--repeat", type=int, default=5, help="repeats per micro-benchmark (best is kept)")
+    parser.add_argument("--skip-calc", action="store_true", help="skip the calculation micro-benchmarks")
+    parser.add_argument("--history", default=HISTORY, help="JSON-lines file results are appended to")
+    parser.add_argument("--compare", action="store_true", help="print change against the previous record")
+    args = parser.parse_args(argv)
+
+    _quiet_streamlit()
+    results = []
+    for app in args.apps:
+        try:
+            results.append({"group": "app", "app": app, "devices": None, "metric": "cold_start_ms",
+                            "value": cold_start_ms(app), "unit": "ms"})
+        except Exception as e:
+            results.append(_failed(app, None, "cold_start_ms", e))
+        measured = set()
+        for size in args.sizes:
+            try:
+                app_results = bench_app(app, size, args.interactions)
+            except Exception as e:
+                traceback.print_exc()
+                results.append(_failed(app, size, "rerun_ms", e))
+                continue
+            if app_results[0]["devices"] in measured:
+                continue    # this app caps its device list, so the size was already covered
+            measured.add(app_results[0]["devices"])
+            results.extend(app_results)
+            print(f"{app} @ {app_results[0]['devices']} devices done", file=sys.stderr)
+    if not args.skip_calc:
+        results.extend(bench_calculations(args.repeat))
+
+    for result in results:
+        if result["value"] is None:
+            print(f"FAILED: {result['app']} {result['metric']}: {result['error']}", file=sys.stderr)
+        elif result["metric"] == "fragment_rerun_ms" and result["value"] > RERUN_TARGET_MS:
+            print(f"WARNING: {result['app']} fragment rerun at {result['devices']} devices took "
+                  f"{result['value']:.0f} ms (target {RERUN_TARGET_MS} ms)", file=sys.stderr)
+
+    import streamlit
+
+    record = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "streamlit": streamlit.__version__,
+        "numpy": np.__version__,
+        "results": results,
+    }
+
+    previous = None
+    if os.path.exists(args.history):
+        with open(args.history) as f:
+            lines = [line for line in f if line.strip()]
+        previous = json.loads(lines[-1]) if lines else None
+    with open(args.history, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+    if args.compare and previous:
+        compare(previous, record)
+    else:
+        compare({"results": []}, record)
+    if any(result["value"] is None for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# ALFRED Charts – downsampled Vega-Lite specs, cached by the data they show
+#
+#   spec = cached_spec(build, *args)      # build(*args) returns an Altair chart
+#   st.vega_lite_chart(spec=spec, width="stretch")
+#
+# build only runs for data this process hasn't charted yet; otherwise the finished spec
+# comes from an in-memory cache keyed by a hash of args, so reruns skip both the
+# DataFrames and Altair's validation. Specs are drawn by Vega-Lite in the browser.
+# Long series go through downsample(), which keeps about one point per horizontal pixel
+# of CHART_WIDTH_PX with Largest-Triangle-Three-Buckets – peaks and troughs survive,
+# unlike taking every n-th point. No chart sends more than MAX_POINTS rows of data,
+# however long the series behind it.
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+CHART_WIDTH_PX = 1200       # plot width of a full-width chart in the wide layout
+MAX_POINTS = 4000           # rows of data in one chart spec, across all its series
+SPEC_CACHE_SIZE = 128       # specs kept per process, least recently used dropped first
+
+_specs = OrderedDict()
+_lock = threading.Lock()
+
+
+# --- Downsampling ---
+def lttb(x, y, points):
+    """Indices of the points Largest-Triangle-Three-Buckets keeps to draw y against x.
+
+    The first and last points are always kept. Each bucket in between keeps the point
+    making the largest triangle with the point kept before it and the average of the
+    next bucket. Series of at most points (or points < 3) are returned whole.
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    n = len(x)
+    if points >= n or points < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    keep = np.empty(points, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        after = slice(hi, edges[i + 2] if i + 2 < len(edges) else n)
+        next_x, next_y = x[after].mean(), y[after].mean()
+        area = np.abs((x[a] - next_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (next_y - y[a]))
+        a = lo + int(area.argmax())
+        keep[i + 1] = a
+    return keep
+
+
+def _numeric(values):
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+    return values.to_numpy(dtype=float)
+
+
+def downsample(frame, x, y, by=None, width_px=CHART_WIDTH_PX):
+    """Rows of frame to draw y against x at width_px, at most MAX_POINTS in all.
+
+    Each series (one per value of the by column) gets an equal share of the points and
+    is thinned with lttb(). Rows with a missing y are dropped first.
+    """
+    frame = frame.dropna(subset=[y])
+    groups = [frame] if by is None else [g for _, g in frame.groupby(by, sort=False)]
+    points = min(width_px, MAX_POINTS // max(len(groups), 1))
+    if sum(len(g) for g in groups) <= MAX_POINTS and all(len(g) <= points for g in groups):
+        return frame
+    return pd.concat([g.iloc[lttb(_numeric(g[x]), g[y].to_numpy(dtype=float), points)] for g in groups])
+
+
+# --- Spec Cache ---
+def _digest(h, value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        labels = list(value.columns) if isinstance(value, pd.DataFrame) else value.name
+        h.update(repr((type(value).__name__, labels, value.dtypes)).encode())
+        h.update(pd.util.hash_pandas_object(value).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        h.update(repr((value.dtype.str, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        h.update(b"{")
+        for k in sorted(value, key=repr):
+            _digest(h, k)
+            _digest(h, value[k])
+        h.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        h.update(b"[")
+        for v in value:
+            _digest(h, v)
+        h.update(b"]")
+    else:
+        h.update(repr(value).encode())
+    h.update(b";")
+
+
+def data_key(*parts):
+    """Hex SHA-1 of parts – frames, arrays, containers and plain values – by content."""
+    h = hashlib.sha1()
+    _digest(h, parts)
+    return h.hexdigest()
+
+
+def _rows(spec):
+    rows = sum(len(d) for d in spec.get("datasets", {}).values())
+    return rows + len(spec.get("data", {}).get("values", []))
+
+
+def cached_spec(build, *args):
+    """Vega-Lite spec dict of the Altair chart build(*args), cached by the content of args.
+
+    Raises ValueError if the chart carries more than MAX_POINTS rows of data, so a long
+    series that skipped downsample() fails here rather than in the browser.
+    """
+    key = data_key(build.__module__, build.__qualname__, args)
+    with _lock:
+        if key in _specs:
+            _specs.move_to_end(key)
+            return _specs[key]
+    spec = build(*args).to_dict()
+    if _rows(spec) > MAX_POINTS:
+        raise ValueError(f"{build.__qualname__} charts {_rows(spec)} rows of data; the limit is {MAX_POINTS}")
+    with _lock:
+        _specs[key] = spec
+        while len(_specs) > SPEC_CACHE_SIZE:
+            _specs.popitem(last=False)
+    return spec
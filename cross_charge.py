@@ -0,0 +1,216 @@
+# ALFRED Cross-Charge – coupled Renogy / EcoFlow simulation through the Orion-Tr charger
+#
+# The Orion-Tr 12V→24V takes energy from the Renogy bank into the EcoFlow's XT60i input.
+# Each policy decides when it runs:
+#   off        the banks stay independent
+#   threshold  starts drawing on the Renogy bank when the EcoFlow falls below 25% and
+#              stops once it is back to 60%
+#   priority   the EcoFlow comes first: the Orion runs whenever it isn't full
+# Both active policies also pass on any Renogy input its full bank can't store, and
+# never draw the Renogy bank below ORION_RESERVE. Every hour the Orion
+# delivers at most its rated output, and the Renogy bank pays that energy plus the
+# conversion loss.
+import numpy as np
+
+from power_engine import ORION_EFFICIENCY, ORION_OUTPUT_W
+from soc_simulation import CHUNK_ELEMENTS, DAYS_PER_YEAR, HOURS_PER_DAY, days_until_flat, hourly_net
+
+SCALAR_MAX_COLUMNS = 96     # up to this many (configuration, policy) pairs, step plain floats
+ORION_RESERVE = 0.2         # share of the Renogy bank an active policy leaves for the 12V loads
+POLICIES = {                # name: (runs at all, EcoFlow share that starts it, share that stops it)
+    "off": (False, 0.0, 0.0),
+    "threshold": (True, 0.25, 0.6),
+    "priority": (True, 1.0, 1.0),
+}
+
+
+def _coupled_kernel(capacity, net, soc0, active, start, stop, orion_wh, efficiency, soc=None):
+    # capacity and soc0 are (configs, 2), net is (hours, configs, 2) and the policy
+    # settings are (policies,). Feedback between the banks rules out the prefix scan, so
+    # this steps through time with every (configuration, policy) pair advancing together
+    # and stops early once every enabled bank under every policy has run flat – unless
+    # soc, (hours, configs, policies, 2), is given to be filled with the hourly charge. A
+    # pair whose banks have all run flat stops counting moved energy from the next hour,
+    # as the scalar kernel stops stepping it; a pair with no enabled bank never counts any.
+    renogy_cap, ecoflow_cap = capacity[:, :1], capacity[:, 1:]
+    shape = (len(capacity), len(active))
+    renogy = np.broadcast_to(soc0[:, :1], shape).copy()
+    ecoflow = np.broadcast_to(soc0[:, 1:], shape).copy()
+    floor = ORION_RESERVE * renogy_cap
+    first_empty = np.full(shape + (2,), -1)
+    pending = np.broadcast_to(capacity[:, None, :] > 0, first_empty.shape).copy()
+    moved = np.zeros(shape)
+    hours_run = np.full(shape, len(net))
+    live = pending.any(axis=-1)
+    charging = np.zeros(shape, dtype=bool)
+    for hours, (renogy_net, ecoflow_net) in enumerate(zip(net[..., :1], net[..., 1:]), 1):
+        renogy += renogy_net
+        ecoflow += ecoflow_net
+
+        # Renogy input the bank can't hold goes across first, then the policy's own draw
+        room = np.clip(ecoflow_cap - ecoflow, 0, None)
+        free = np.where(active, np.minimum(np.minimum(np.clip(renogy - renogy_cap, 0, None) * efficiency, room),
+                                           orion_wh), 0)
+        np.minimum(renogy, renogy_cap, out=renogy)
+        ecoflow += free
+        charging = (charging | (ecoflow < start * ecoflow_cap)) & (ecoflow < stop * ecoflow_cap) & active
+        draw = np.minimum(np.minimum(room, orion_wh) - free, (renogy - floor) * efficiency)
+        draw = np.where(charging, np.clip(draw, 0, None), 0)
+        ecoflow += draw
+        renogy -= draw / efficiency
+        moved += np.where(live, free + draw, 0)
+
+        newly = (np.stack([renogy, ecoflow], axis=-1) < -1e-9) & pending
+        if newly.any():
+            first_empty[newly] = hours - 1
+            pending &= ~newly
+            finished = live & newly.any(axis=-1) & ~pending.any(axis=-1)
+            hours_run[finished] = hours
+            live &= ~finished
+            if not pending.any() and soc is None:
+                break
+        np.clip(renogy, 0, None, out=renogy)
+        np.clip(ecoflow, 0, ecoflow_cap, out=ecoflow)
+        if soc is not None:
+            soc[hours - 1, ..., 0], soc[hours - 1, ..., 1] = renogy, ecoflow
+    return first_empty, moved, hours_run
+
+
+def _scalar_kernel(capacity, net, soc0, active, start, stop, orion_wh, efficiency, soc=None):
+    # The same rules on plain floats, one (configuration, policy) pair at a time. Each
+    # pair stops as soon as its own banks have run flat (or keeps stepping without
+    # counting moved energy when soc is to be filled); for a few pairs this is many
+    # times faster than stepping arrays of a handful of elements.
+    configs, policies = len(capacity), len(active)
+    first_empty = np.full((configs, policies, 2), -1)
+    moved = np.zeros((configs, policies))
+    hours_run = np.full((configs, policies), len(net))
+    for c in range(configs):
+        renogy_cap, ecoflow_cap = capacity[c].tolist()
+        floor = ORION_RESERVE * renogy_cap
+        flows = net[:, c].tolist()
+        for p in range(policies):
+            renogy, ecoflow = soc0[c].tolist()
+            on, low, high = bool(active[p]), start[p] * ecoflow_cap, stop[p] * ecoflow_cap
+            pending = [renogy_cap > 0, ecoflow_cap > 0]
+            charging, live, total = False, any(pending), 0.0
+            if not live and soc is None:
+                continue    # no enabled bank: nothing to run flat and nothing moved
+            levels = []
+            for t, (renogy_net, ecoflow_net) in enumerate(flows):
+                renogy += renogy_net
+                ecoflow += ecoflow_net
+                if on:
+                    room = max(ecoflow_cap - ecoflow, 0.0)
+                    free = 0.0
+                    if renogy > renogy_cap:
+                        free = min((renogy - renogy_cap) * efficiency, room, orion_wh)
+                        renogy = renogy_cap
+                    ecoflow += free
+                    charging = (charging or ecoflow < low) and ecoflow < high
+                    draw = min(min(room, orion_wh) - free, (renogy - floor) * efficiency) if charging else 0.0
+                    if draw > 0:
+                        ecoflow += draw
+                        renogy -= draw / efficiency
+                        free += draw
+                    if live:
+                        total += free
+                elif renogy > renogy_cap:
+                    renogy = renogy_cap
+
+                flat = False
+                for bank, level in enumerate((renogy, ecoflow)):
+                    if level < -1e-9 and pending[bank]:
+                        first_empty[c, p, bank] = t
+                        pending[bank] = False
+                        flat = True
+                if flat and live and not any(pending):
+                    hours_run[c, p] = t + 1
+                    live = False
+                    if soc is None:
+                        break
+                renogy = max(renogy, 0.0)
+                ecoflow = min(max(ecoflow, 0.0), ecoflow_cap)
+                if soc is not None:
+                    levels.append((renogy, ecoflow))
+            moved[c, p] = total
+            if soc is not None:
+                soc[:, c, p] = levels
+    return first_empty, moved, hours_run
+
+
+def simulate_coupled(budget, drive_hours, days=DAYS_PER_YEAR, start_day=0, soc0=None, policies=tuple(POLICIES),
+                     orion_w=ORION_OUTPUT_W, efficiency=ORION_EFFICIENCY, seasonal=True, renogy_solar_wh=None,
+                     ecoflow_solar_wh=None, keep_trajectory=False, solar_shape=None):
+    """Hourly simulation of both banks joined by the Orion, for every configuration and policy.
+
+    Takes the same inputs as simulate_year(), including per-day solar sequences. Returns
+    arrays with a (configs, policies) leading shape: first_empty_hour (..., 2) per bank,
+    days until the first enabled bank runs flat and moved_wh_per_day delivered to the
+    EcoFlow. With keep_trajectory, soc holds the hourly charge as (hours, configs,
+    policies, 2) and final_soc its last hour; otherwise both are None and the simulation
+    stops once everything has run flat. Also returns best, each configuration's index into
+    policies with the most days (earlier policies win ties), and policies itself.
+    Configurations are simulated in chunks, as in simulate_year().
+    """
+    capacity = np.stack(np.broadcast_arrays(
+        np.atleast_1d(budget["renogy_wh"]), np.atleast_1d(budget["ecoflow_wh"])), axis=-1).astype(float)
+    configs = len(capacity)
+
+    def per_config(values):
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        return np.broadcast_to(values, (configs,) + values.shape[1:])
+
+    if renogy_solar_wh is None:
+        renogy_solar_wh = np.asarray(budget["renogy_input"]) - np.asarray(budget["alternator_input"])
+    if ecoflow_solar_wh is None:
+        ecoflow_solar_wh = budget["ecoflow_input"]
+    renogy_solar, ecoflow_solar = per_config(renogy_solar_wh), per_config(ecoflow_solar_wh)
+    alternator, drive_hours = per_config(budget["alternator_input"]), per_config(drive_hours)
+    renogy_usage, ecoflow_usage = per_config(budget["renogy_usage"]), per_config(budget["ecoflow_usage"])
+    soc0 = capacity if soc0 is None else np.broadcast_to(np.asarray(soc0, dtype=float), capacity.shape)
+    active, start, stop = (np.array(values, dtype=dtype) for values, dtype in
+                           zip(zip(*(POLICIES[p] for p in policies)), (bool, float, float)))
+
+    hours = days * HOURS_PER_DAY
+    chunk = max(1, CHUNK_ELEMENTS // (hours * 2 * (len(policies) if keep_trajectory else 1)))
+    first_empty, moved_per_day, trajectories = [], [], []
+    for lo in range(0, configs, chunk):
+        part = slice(lo, lo + chunk)
+        net = np.stack([
+            hourly_net(renogy_solar[part], alternator[part], renogy_usage[part], drive_hours[part],
+                       days, start_day, seasonal, solar_shape),
+            hourly_net(ecoflow_solar[part], 0, ecoflow_usage[part], 0, days, start_day, seasonal, solar_shape),
+        ], axis=-1)
+        soc = np.empty((hours, net.shape[1], len(policies), 2)) if keep_trajectory else None
+        kernel = _scalar_kernel if net.shape[1] * len(policies) <= SCALAR_MAX_COLUMNS else _coupled_kernel
+        empty, moved, hours_run = kernel(capacity[part], net, soc0[part], active, start, stop,
+                                         float(orion_w), float(efficiency), soc)
+        first_empty.append(empty)
+        moved_per_day.append(moved / (hours_run / HOURS_PER_DAY))
+        trajectories.append(soc)
+
+    first_empty = np.concatenate(first_empty)
+    days_flat = days_until_flat(capacity[:, None, :], first_empty)
+    soc = np.concatenate(trajectories, axis=1) if keep_trajectory else None
+    return {
+        "first_empty_hour": first_empty,
+        "days": days_flat,
+        "moved_wh_per_day": np.concatenate(moved_per_day),
+        "soc": soc,
+        "final_soc": soc[-1] if keep_trajectory else None,
+        "best": days_flat.argmax(axis=1),
+        "policies": list(policies),
+    }
+
+
+def best_policy_days(budget, drive_hours, **kwargs):
+    """(days, policy names) per configuration under its best cross-charge policy."""
+    result = simulate_coupled(budget, drive_hours, **kwargs)
+    rows = np.arange(len(result["best"]))
+    return result["days"][rows, result["best"]], np.array(result["policies"])[result["best"]]
+
+
+def best_policy(budget, drive_hours, **kwargs):
+    """Name of the policy that keeps a single configuration going longest."""
+    return str(best_policy_days(budget, drive_hours, **kwargs)[1][0])
@@ -0,0 +1,132 @@
+# ALFRED Device Catalog – columnar appliance store with prefix and fuzzy name search
+#
+# Catalog file: one row per appliance.
+#   name, watts, hours (typical duty hours per day), enabled (default when used as a
+#   preset), presets (space-separated preset lists the row belongs to, e.g. "renogy v5"),
+#   schedule (optional time-of-use windows, see peak_load.py)
+#
+# The bundled device_catalog.csv seeds the presets; point ALFRED_DEVICE_CATALOG at a
+# larger file to search a full appliance list.
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+CATALOG_PATH = os.environ.get(
+    "ALFRED_DEVICE_CATALOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "device_catalog.csv")
+)
+SEARCH_LIMIT = 10
+FUZZY_MIN_SCORE = 0.4       # share of the query's trigrams a fuzzy match must contain
+
+
+def _words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def _trigrams(text):
+    padded = f"  {' '.join(_words(text))} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DeviceCatalog:
+    """Appliances held as parallel arrays, searchable by word prefix and by trigram similarity.
+
+    Built once and shared read-only; search() returns row numbers and devices() turns
+    just those rows into the device dicts the calculators use.
+    """
+
+    def __init__(self, names, watts, hours, enabled, presets, schedules=None):
+        self.names = np.asarray(names, dtype=str)
+        self.watts = np.asarray(watts, dtype=np.int32)
+        self.hours = np.asarray(hours, dtype=float)
+        self.enabled = np.asarray(enabled, dtype=bool)
+        self.schedules = np.asarray([""] * len(self.names) if schedules is None else schedules, dtype=str)
+        self._lower = np.char.lower(self.names)
+        self._lengths = np.char.str_len(self.names)
+
+        # Prefix index: every word of every name, sorted, with the row it came from
+        tokens, token_rows, tags = [], [], {}
+        grams = {}
+        for row, (name, row_tags) in enumerate(zip(self.names, presets)):
+            words = _words(name)
+            tokens.extend(words)
+            token_rows.extend([row] * len(words))
+            for tag in str(row_tags).split():
+                tags.setdefault(tag, []).append(row)
+            for gram in _trigrams(name):
+                grams.setdefault(gram, []).append(row)
+        order = np.argsort(tokens, kind="stable")
+        self._tokens = np.asarray(tokens, dtype=str)[order]
+        self._token_rows = np.asarray(token_rows, dtype=np.int32)[order]
+
+        # Fuzzy index: trigram -> rows containing it, for typo-tolerant matching
+        self._grams = {gram: np.asarray(rows, dtype=np.int32) for gram, rows in grams.items()}
+        self._presets = {tag: np.asarray(rows, dtype=np.int32) for tag, rows in tags.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """Row numbers of the best matches for query, best first.
+
+        Names where every query word starts a word of the name come first (names that
+        start with the query, then shorter names, ranked highest); remaining places are
+        filled by trigram similarity so typos like "kettel" still find "Electric Kettle".
+        """
+        words = set(_words(query))
+        if not words:
+            return np.empty(0, dtype=np.int32)
+
+        hits = np.zeros(len(self), dtype=np.int32)
+        for word in words:
+            lo = np.searchsorted(self._tokens, word, "left")
+            hi = np.searchsorted(self._tokens, word + "\uffff", "left")
+            hits[np.unique(self._token_rows[lo:hi])] += 1
+        prefix = np.flatnonzero(hits == len(words))
+        starts = np.char.startswith(self._lower[prefix], " ".join(_words(query)))
+        prefix = prefix[np.lexsort((prefix, self._lengths[prefix], ~starts))][:limit]
+        if len(prefix) == limit:
+            return prefix
+
+        query_grams = _trigrams(query)
+        matched = [self._grams[gram] for gram in query_grams if gram in self._grams]
+        if not matched:
+            return prefix
+        shared = np.bincount(np.concatenate(matched), minlength=len(self))
+        score = shared / len(query_grams) - self._lengths * 1e-4   # shorter names win ties
+        score[prefix] = -1
+        fuzzy = np.argsort(-score, kind="stable")[:limit - len(prefix)]
+        return np.concatenate([prefix, fuzzy[score[fuzzy] >= FUZZY_MIN_SCORE]]).astype(np.int32)
+
+    def label(self, row):
+        return f"{self.names[row]} – {self.watts[row]} W × {self.hours[row]:g} h"
+
+    def devices(self, rows, enabled=None):
+        """Device dicts for the given rows; enabled defaults to each row's catalog value."""
+        return [
+            {
+                "name": str(self.names[row]),
+                "watts": int(self.watts[row]),
+                "hours": float(self.hours[row]),
+                "enabled": bool(self.enabled[row]) if enabled is None else enabled,
+                "schedule": str(self.schedules[row]),
+            }
+            for row in rows
+        ]
+
+    def presets(self, tag):
+        """Fresh device dicts for a preset list, in catalog order."""
+        return self.devices(self._presets.get(tag, ()))
+
+
+def load_catalog(path=CATALOG_PATH):
+    df = pd.read_csv(path)
+    for column, default in {"hours": 1.0, "enabled": True, "presets": "", "schedule": ""}.items():
+        if column not in df:
+            df[column] = default
+    return DeviceCatalog(
+        df["name"].astype(str).to_numpy(), df["watts"].to_numpy(), df["hours"].to_numpy(),
+        df["enabled"].astype(bool).to_numpy(), df["presets"].fillna("").to_numpy(),
+        df["schedule"].fillna("").to_numpy(),
+    )
@@ -0,0 +1,109 @@
+# ALFRED Device Lists – compact copy-on-write device lists for per-session state
+#
+# Presets are built once per process as a read-only tuple of Device records. A session
+# starts with a DeviceList pointing at that tuple and only stores what it changes: an
+# array of row references and the handful of rows it edited or added. Every edit
+# returns a new DeviceList, so nothing shared is ever written to.
+from array import array
+from collections import namedtuple
+
+
+class Device(namedtuple("Device", ["name", "watts", "hours", "enabled", "schedule"], defaults=[True, ""])):
+    """Immutable device record that also reads like the device dicts (d["watts"], d.get(...))."""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            if key not in self._fields:
+                raise KeyError(key)
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self._fields else default
+
+    @classmethod
+    def from_dict(cls, device):
+        return cls(str(device["name"]), int(device["watts"]), float(device["hours"]),
+                   bool(device.get("enabled", True)), str(device.get("schedule") or ""))
+
+    def edited(self, changes):
+        return Device.from_dict({**self._asdict(), **{k: v for k, v in changes.items() if k in self._fields}})
+
+
+class DeviceList:
+    """Read-only sequence of Device records: a shared base plus this list's own changes.
+
+    _order is None while the list is the base unchanged; otherwise it holds one
+    reference per row, a base index (>= 0) or an entry in _local (-1, -2, ...).
+    """
+
+    __slots__ = ("_base", "_order", "_local")
+
+    def __init__(self, base, order=None, local=()):
+        self._base = base
+        self._order = order
+        self._local = local
+
+    @classmethod
+    def from_devices(cls, devices):
+        return cls(tuple(d if isinstance(d, Device) else Device.from_dict(d) for d in devices))
+
+    def _row(self, ref):
+        return self._base[ref] if ref >= 0 else self._local[-ref - 1]
+
+    def _refs(self):
+        return self._order if self._order is not None else range(len(self._base))
+
+    def __len__(self):
+        return len(self._refs())
+
+    def __iter__(self):
+        return iter(self._base) if self._order is None else map(self._row, self._order)
+
+    def __getitem__(self, index):
+        if self._order is None:
+            return self._base[index]
+        if isinstance(index, slice):
+            return [self._row(ref) for ref in self._order[index]]
+        return self._row(self._order[index])
+
+    def edit(self, changes=None, insert_at=None, added=(), deleted=()):
+        """New list with rows edited ({position: {field: value}}), added at insert_at and deleted.
+
+        Positions refer to this list. Unchanged rows keep pointing at the shared base;
+        rows no longer referenced are dropped from the local store.
+        """
+        refs = list(self._refs())
+        local = list(self._local)
+        for position, change in (changes or {}).items():
+            local.append(self[position].edited(change))
+            refs[position] = -len(local)
+        insert_at = len(refs) if insert_at is None else insert_at
+        new_refs = []
+        for device in added:
+            local.append(device if isinstance(device, Device) else Device.from_dict(device))
+            new_refs.append(-len(local))
+        deleted = set(deleted)
+        refs = [ref for position, ref in enumerate(refs) if position not in deleted]
+        insert_at -= sum(1 for position in deleted if position < insert_at)
+        refs[insert_at:insert_at] = new_refs
+
+        # Keep only the local rows still referenced, renumbered in row order
+        kept, remap = [], {}
+        for ref in refs:
+            if ref < 0 and ref not in remap:
+                kept.append(local[-ref - 1])
+                remap[ref] = -len(kept)
+        refs = [remap.get(ref, ref) for ref in refs]
+        if refs == list(range(len(self._base))):
+            return DeviceList(self._base)
+        return DeviceList(self._base, array("l", refs), tuple(kept))
+
+    def extend(self, devices):
+        return self.edit(added=devices)
+
+    def overlay_size(self):
+        """Rows this list stores itself rather than sharing with its base."""
+        return len(self._local)
@@ -0,0 +1,272 @@
+# ALFRED Irradiance – memory-mapped hourly solar irradiance for UK grid points
+#
+#   python irradiance.py hourly/*.csv --postcodes outcodes.csv -o irradiance.bin
+#
+# Input CSVs hold hourly global horizontal irradiance in long format, any number of grid
+# points per file and any number of years per point:
+#   lat, lon, time (ISO timestamp, UTC), ghi (W/m²)
+# Years are averaged hour by hour into one 8760-hour typical year (29 February is
+# dropped). The optional postcode file maps postcodes or outward codes to coordinates:
+#   postcode, lat, lon
+#
+# The output is one flat binary file: a JSON header followed by 64-byte aligned columns.
+# Irradiance is stored point-major as uint16 W/m², so one point's year is a single
+# contiguous 17.5 KB run. Points are sorted into a regular lat/lon cell grid with a
+# CSR-style cell_start offset array as the spatial index. Readers map the file read-only
+# and every array is a view on the mapping – nothing is copied, and worker processes on
+# one server share the same page-cache pages.
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+import pandas as pd
+
+IRRADIANCE_PATH = os.environ.get(
+    "ALFRED_IRRADIANCE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "irradiance.bin")
+)
+MAGIC = b"ALFIRR01"
+ALIGN = 64
+HOURS = 8760
+POINTS_PER_CELL = 4         # target density of the spatial grid
+PERFORMANCE_RATIO = 0.8     # panel, controller and wiring losses from irradiance to stored Wh
+EARTH_RADIUS_KM = 6371.0
+MONTH_DAYS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+MONTH_START_DAY = np.concatenate([[0], np.cumsum(MONTH_DAYS)])
+
+
+def normalise_postcode(code):
+    return "".join(str(code).split()).upper()
+
+
+def _distance_km(lat, lon, lats, lons):
+    lat, lon, lats, lons = map(np.radians, (lat, lon, lats, lons))
+    a = np.sin((lats - lat) / 2) ** 2 + np.cos(lat) * np.cos(lats) * np.sin((lons - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+class IrradianceDataset:
+    """Read-only, memory-mapped view of an ingested irradiance file."""
+
+    def __init__(self, path=IRRADIANCE_PATH):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not an Alfred irradiance file")
+        (header_len,) = struct.unpack_from("<Q", self._map, len(MAGIC))
+        self.header = json.loads(self._map[len(MAGIC) + 8:len(MAGIC) + 8 + header_len])
+        for name, (offset, dtype, shape) in self.header["columns"].items():
+            count = int(np.prod(shape))
+            view = np.frombuffer(self._map, dtype=dtype, count=count, offset=offset).reshape(shape)
+            setattr(self, name, view)
+        self._grid = self.header["grid"]
+
+    def __len__(self):
+        return len(self.lat)
+
+    def _cell_points(self, row, col):
+        if not (0 <= row < self._grid["rows"] and 0 <= col < self._grid["cols"]):
+            return np.empty(0, dtype=np.int64)
+        cell = row * self._grid["cols"] + col
+        return np.arange(self.cell_start[cell], self.cell_start[cell + 1])
+
+    def _outside_km(self, lat, lon, row, col, ring):
+        # Lower bound on the distance from lat/lon to any point outside the square of
+        # cells out to ring around (row, col): the nearest of its four edges, north and
+        # south along the meridian and east and west to the edge's meridian, which is
+        # closer than the degrees suggest away from the equator
+        grid = self._grid
+        south = grid["lat0"] + (row - ring) * grid["cell_deg"]
+        north = grid["lat0"] + (row + ring + 1) * grid["cell_deg"]
+        west = grid["lon0"] + (col - ring) * grid["cell_deg"]
+        east = grid["lon0"] + (col + ring + 1) * grid["cell_deg"]
+        lat_gap = np.radians(min(lat - south, north - lat))
+        lon_gap = np.radians(min(lon - west, east - lon, 90.0))
+        cross = np.arcsin(np.cos(np.radians(lat)) * np.sin(lon_gap))
+        return EARTH_RADIUS_KM * float(min(lat_gap, cross))
+
+    def nearest(self, lat, lon):
+        """(point index, distance in km) of the grid point nearest to lat/lon.
+
+        Searches square rings of cells outwards from the query's cell, and stops once
+        every cell beyond the rings searched is further away than the best point found.
+        """
+        grid = self._grid
+        row = int(np.floor((lat - grid["lat0"]) / grid["cell_deg"]))
+        col = int(np.floor((lon - grid["lon0"]) / grid["cell_deg"]))
+        best, best_km, limit = None, np.inf, max(grid["rows"], grid["cols"]) + abs(row) + abs(col)
+        ring = 0
+        while ring <= limit:
+            cells = [(row + dr, col + dc) for dr in range(-ring, ring + 1) for dc in range(-ring, ring + 1)
+                     if max(abs(dr), abs(dc)) == ring]
+            points = np.concatenate([self._cell_points(r, c) for r, c in cells])
+            if len(points):
+                km = _distance_km(lat, lon, self.lat[points], self.lon[points])
+                i = int(km.argmin())
+                if km[i] < best_km:
+                    best, best_km = int(points[i]), float(km[i])
+            if best is not None and best_km <= self._outside_km(lat, lon, row, col, ring):
+                break
+            ring += 1
+        if best is None:
+            raise ValueError("The irradiance file has no grid points")
+        return best, best_km
+
+    def postcode(self, code):
+        """(lat, lon) for a postcode, falling back to its outward code (e.g. "EH1")."""
+        if "postcodes" not in self.header["columns"]:
+            raise KeyError("The irradiance file has no postcode table")
+        code = normalise_postcode(code)
+        for candidate in (code, code[:-3] if len(code) > 4 else None):
+            if not candidate:
+                continue
+            key = candidate.encode()[:self.postcodes.dtype.itemsize]
+            i = int(np.searchsorted(self.postcodes, key))
+            if i < len(self.postcodes) and self.postcodes[i] == key:
+                return float(self.postcode_lat[i]), float(self.postcode_lon[i])
+        raise KeyError(f"Postcode {code!r} not found")
+
+    def locate(self, query):
+        """Nearest grid point for "lat, lon" or a postcode: (point index, distance km, lat, lon)."""
+        parts = str(query).replace(",", " ").split()
+        try:
+            lat, lon = map(float, parts)
+        except ValueError:
+            lat, lon = self.postcode(query)
+        point, km = self.nearest(lat, lon)
+        return point, km, lat, lon
+
+    def hourly(self, point):
+        """One point's typical year of hourly irradiance in W/m², shape (8760,) – a view, not a copy."""
+        return self.ghi[point]
+
+    def month_sun_hours(self, point, month):
+        """Mean daily peak-sun hours (kWh/m² per day) for a month (1-12) at a point."""
+        hours = slice(MONTH_START_DAY[month - 1] * 24, MONTH_START_DAY[month] * 24)
+        return float(self.ghi[point, hours].sum(dtype=np.int64) / 1000 / MONTH_DAYS[month - 1])
+
+
+def solar_shape(hourly_ghi, sun_hours, start_day=0, days=365):
+    """Hourly solar yield per Wh of daily solar input, for soc_simulation's solar_shape.
+
+    The calculators size daily solar input as panel watts * sun_hours; scaling the
+    real irradiance by PERFORMANCE_RATIO / (1000 * sun_hours) makes that input land in
+    the hours the irradiance data says it does. The year wraps for longer simulations.
+    """
+    hours = (start_day * 24 + np.arange(days * 24)) % HOURS
+    return np.asarray(hourly_ghi, dtype=float)[hours] * PERFORMANCE_RATIO / 1000 / max(sun_hours, 1e-9)
+
+
+# --- Ingest ---
+def _hour_of_year(times):
+    times = pd.DatetimeIndex(pd.to_datetime(times, utc=True, format="ISO8601"))
+    day = times.dayofyear.to_numpy() - 1
+    leap = times.is_leap_year & (times.month > 2)
+    day = np.where(leap, day - 1, day)
+    keep = ~(times.is_leap_year & (times.month == 2) & (times.day == 29))
+    return day * 24 + times.hour.to_numpy(), np.asarray(keep)
+
+
+def read_points(paths, chunksize=500_000):
+    """Average every point's hourly irradiance into a typical year: {(lat, lon): (sum, count)}."""
+    points = {}
+    for path in paths:
+        for chunk in pd.read_csv(path, chunksize=chunksize):
+            hour, keep = _hour_of_year(chunk["time"])
+            chunk = chunk.assign(hour=hour)[keep]
+            for (lat, lon), group in chunk.groupby(["lat", "lon"], sort=False):
+                total, count = points.setdefault((float(lat), float(lon)),
+                                                 (np.zeros(HOURS), np.zeros(HOURS, dtype=np.int32)))
+                total += np.bincount(group["hour"], weights=group["ghi"].clip(lower=0), minlength=HOURS)
+                count += np.bincount(group["hour"], minlength=HOURS).astype(np.int32)
+    return points
+
+
+def _spatial_grid(lat, lon, cell_deg=None):
+    if cell_deg is None:
+        area = max(np.ptp(lat), 1e-6) * max(np.ptp(lon), 1e-6)
+        cell_deg = float(np.sqrt(area * POINTS_PER_CELL / len(lat))) if len(lat) > 1 else 1.0
+    lat0, lon0 = float(lat.min()), float(lon.min())
+    rows = int(np.floor(np.ptp(lat) / cell_deg)) + 1
+    cols = int(np.floor(np.ptp(lon) / cell_deg)) + 1
+    cell = (np.floor((lat - lat0) / cell_deg).astype(np.int64) * cols
+            + np.floor((lon - lon0) / cell_deg).astype(np.int64))
+    return {"lat0": lat0, "lon0": lon0, "cell_deg": cell_deg, "rows": rows, "cols": cols}, cell
+
+
+def write_dataset(path, points, postcodes=None, cell_deg=None):
+    """Write {(lat, lon): (sum, count)} irradiance (and optional postcode DataFrame) to path.
+
+    cell_deg sets the spatial grid's cell size; by default cells hold about
+    POINTS_PER_CELL points each.
+    """
+    coords = np.array(list(points), dtype=float).reshape(-1, 2)
+    grid, cell = _spatial_grid(coords[:, 0], coords[:, 1], cell_deg)
+    order = np.argsort(cell, kind="stable")
+    keys = list(points)
+
+    columns = {
+        "lat": coords[order, 0].astype(np.float32),
+        "lon": coords[order, 1].astype(np.float32),
+        "cell_start": np.searchsorted(cell[order], np.arange(grid["rows"] * grid["cols"] + 1)).astype(np.int64),
+    }
+    if postcodes is not None and len(postcodes):
+        codes = postcodes.assign(postcode=postcodes["postcode"].map(normalise_postcode)).sort_values("postcode")
+        columns["postcodes"] = codes["postcode"].to_numpy().astype("S8")
+        columns["postcode_lat"] = codes["lat"].to_numpy(np.float32)
+        columns["postcode_lon"] = codes["lon"].to_numpy(np.float32)
+
+    layout, offset = {}, 0
+    for name, array in list(columns.items()) + [("ghi", None)]:
+        shape = [len(order), HOURS] if name == "ghi" else list(array.shape)
+        dtype = "<u2" if name == "ghi" else array.dtype.str
+        layout[name] = [offset, dtype, shape]
+        offset += -(-int(np.prod(shape)) * np.dtype(dtype).itemsize // ALIGN) * ALIGN
+    header = {"version": 1, "points": len(order), "hours": HOURS, "grid": grid, "columns": layout}
+
+    # Offsets so far are relative to the first column; the extra room covers the longer
+    # absolute offsets written into the header
+    data_start = -(-(len(MAGIC) + 8 + len(json.dumps(header)) + 256) // ALIGN) * ALIGN
+    for spec in layout.values():
+        spec[0] += data_start
+    blob = json.dumps(header).encode()
+
+    missing = 0
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<Q", len(blob)) + blob)
+        for name, (start, dtype, shape) in layout.items():
+            f.seek(start)
+            if name != "ghi":
+                f.write(np.ascontiguousarray(columns[name]).tobytes())
+                continue
+            # One point at a time, so the whole irradiance block is never held in memory
+            for i in order:
+                total, count = points[keys[i]]
+                missing += int((count == 0).sum())
+                year = np.divide(total, count, out=np.zeros(HOURS), where=count > 0)
+                f.write(np.round(year).clip(0, 65535).astype("<u2").tobytes())
+        f.truncate(data_start + offset)
+    return {"points": len(order), "missing_hours": missing}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest hourly irradiance CSVs into an Alfred irradiance file.")
+    parser.add_argument("csvs", nargs="+", help="CSV files with lat, lon, time and ghi columns")
+    parser.add_argument("--postcodes", help="CSV with postcode, lat and lon columns")
+    parser.add_argument("-o", "--output", default=IRRADIANCE_PATH, help="irradiance file to write")
+    args = parser.parse_args(argv)
+
+    points = read_points(args.csvs)
+    postcodes = pd.read_csv(args.postcodes) if args.postcodes else None
+    summary = write_dataset(args.output, points, postcodes)
+    print(f"{summary['points']:,} grid points written to {args.output}", file=sys.stderr)
+    if summary["missing_hours"]:
+        print(f"warning: {summary['missing_hours']:,} point-hours had no data and were stored as 0 W/m²",
+              file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# ALFRED Monte Carlo – stochastic UK solar weather and days-of-autonomy confidence bands
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from cross_charge import best_policy, simulate_coupled
+
+WEATHER_PERSISTENCE = 0.6   # day-to-day correlation of cloud cover (UK weather comes in spells)
+WEATHER_SPREAD = 0.6        # log-scale spread of daily solar yield around the seasonal mean
+RUNS_PER_TASK = 250
+IN_PROCESS_MAX_RUNS = 1000  # fewer runs than this finish before a pool's workers would start
+
+
+def sample_solar_multipliers(rng, runs, days):
+    """Draw (runs, days) daily solar yield multipliers with mean 1.
+
+    An AR(1) process in log space gives runs of dull and bright days rather than
+    independent coin flips, and the lognormal keeps every day non-negative.
+    """
+    shocks = rng.standard_normal((runs, days))
+    z = np.empty_like(shocks)
+    z[:, 0] = shocks[:, 0]
+    scale = np.sqrt(1 - WEATHER_PERSISTENCE ** 2)
+    for day in range(1, days):
+        z[:, day] = WEATHER_PERSISTENCE * z[:, day - 1] + scale * shocks[:, day]
+    return np.exp(WEATHER_SPREAD * z - WEATHER_SPREAD ** 2 / 2)
+
+
+def autonomy_days(budget, drive_hours, multipliers, start_day=0, policy="off"):
+    """Days until the first enabled bank runs flat for each sampled weather sequence.
+
+    Both banks are simulated joined by the Orion under the given cross-charge policy.
+    Sequences that never run flat are reported as the full horizon (censored).
+    """
+    runs, days = multipliers.shape
+    budget = {key: np.repeat(np.atleast_1d(value), runs) for key, value in budget.items()}
+    renogy_solar_wh = (budget["renogy_input"] - budget["alternator_input"])[:, None] * multipliers
+    ecoflow_solar_wh = budget["ecoflow_input"][:, None] * multipliers
+    result = simulate_coupled(budget, drive_hours, days=days, start_day=start_day, policies=(policy,),
+                              renogy_solar_wh=renogy_solar_wh, ecoflow_solar_wh=ecoflow_solar_wh)
+    return np.minimum(result["days"][:, 0], days)
+
+
+def _run_task(budget, drive_hours, runs, days, start_day, seed, policy):
+    rng = np.random.default_rng(seed)
+    return autonomy_days(budget, drive_hours, sample_solar_multipliers(rng, runs, days), start_day, policy)
+
+
+def weather_pool(workers=None):
+    """Process pool to keep and pass to monte_carlo_endurance() across calls.
+
+    Workers start from a forkserver (spawn where there is none) rather than a fork of
+    the caller, so the pool is safe to create from a threaded server such as Streamlit.
+    """
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                               mp_context=multiprocessing.get_context(method))
+
+
+def monte_carlo_endurance(budget, drive_hours, runs=2000, days=90, start_day=0, seed=0, workers=None, policy=None,
+                          pool=None):
+    """P10/P50/P90 days of autonomy for one power_budget() configuration.
+
+    Every run uses the same Orion cross-charge policy; by default the one that lasts
+    longest in average weather over the horizon, as returned under "policy". Runs are
+    split into fixed-size tasks, each with its own child of one SeedSequence, so results
+    are identical whatever the worker count or scheduling order. Tasks run in this
+    process when there is only one of them, workers=1 or runs is below
+    IN_PROCESS_MAX_RUNS; otherwise they go to pool, as from weather_pool(), or to a pool
+    started and shut down for this call.
+    """
+    budget = {key: np.asarray(value) for key, value in budget.items()}
+    if policy is None:
+        policy = best_policy(budget, drive_hours, days=days, start_day=start_day)
+    sizes = [min(RUNS_PER_TASK, runs - lo) for lo in range(0, runs, RUNS_PER_TASK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(budget, drive_hours, size, days, start_day, child, policy) for size, child in zip(sizes, seeds)]
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1 or runs < IN_PROCESS_MAX_RUNS:
+        # Runs are independent, so one coupled simulation of every task's weather gives
+        # the same samples with far fewer, wider time steps
+        multipliers = np.concatenate([sample_solar_multipliers(np.random.default_rng(child), size, days)
+                                      for size, child in zip(sizes, seeds)])
+        samples = [autonomy_days(budget, drive_hours, multipliers, start_day, policy)]
+    elif pool is not None:
+        samples = list(pool.map(_run_task, *zip(*tasks)))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            samples = list(pool.map(_run_task, *zip(*tasks)))
+    samples = np.concatenate(samples)
+
+    p10, p50, p90 = np.percentile(samples, [10, 50, 90])
+    return {
+        "p10": float(p10),
+        "p50": float(p50),
+        "p90": float(p90),
+        "horizon_days": days,
+        "censored": float((samples >= days).mean()),
+        "policy": policy,
+        "samples": samples,
+    }
@@ -0,0 +1,101 @@
+# ALFRED Peak Load – per-minute load profiles from device schedules and limit checks
+#
+# A schedule is a comma-separated list of "HH:MM-HH:MM" windows, e.g. "07:30-07:40, 18:00-18:08";
+# a window ending before it starts runs past midnight. Peak figures assume a device draws its
+# full rating for the whole of each window. Devices without a schedule are counted at their
+# average draw (watts * hours / 24) across the day.
+import re
+from functools import lru_cache
+
+import numpy as np
+
+MINUTES_PER_DAY = 24 * 60
+_WINDOW = re.compile(r"^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$")
+SCHEDULE_PATTERN = r"^\s*$|^\s*\d{1,2}:\d{2}\s*-\s*\d{1,2}:\d{2}\s*(,\s*\d{1,2}:\d{2}\s*-\s*\d{1,2}:\d{2}\s*)*$"
+
+
+@lru_cache(maxsize=4096)
+def _windows(text):
+    windows = []
+    for part in filter(str.strip, text.split(",")):
+        match = _WINDOW.match(part)
+        if not match:
+            raise ValueError(f"Schedule window {part.strip()!r} is not HH:MM-HH:MM")
+        start_h, start_m, stop_h, stop_m = map(int, match.groups())
+        start, stop = start_h * 60 + start_m, stop_h * 60 + stop_m
+        if start > MINUTES_PER_DAY or stop > MINUTES_PER_DAY or start_m > 59 or stop_m > 59:
+            raise ValueError(f"Schedule window {part.strip()!r} is not a time of day")
+        if stop > start:
+            windows.append((start, stop))
+        elif stop < start:
+            windows.extend([(start, MINUTES_PER_DAY), (0, stop)])
+    return tuple(windows)
+
+
+def parse_schedule(text):
+    """(windows, 2) array of [start, stop) minutes of the day; windows over midnight are split."""
+    return np.array(_windows(text or ""), dtype=np.int64).reshape(-1, 2)
+
+
+def minute_load(starts, stops, watts):
+    """Total draw in each minute of the day, shape (1440,), from [start, stop) windows.
+
+    Interval sweep: each window adds its watts at its start minute and removes them at
+    its stop minute, and a prefix sum turns those steps into the load in every minute,
+    so the cost is one pass over the windows plus one over the day.
+    """
+    steps = (np.bincount(starts, weights=watts, minlength=MINUTES_PER_DAY + 1)
+             - np.bincount(stops, weights=watts, minlength=MINUTES_PER_DAY + 1))
+    return np.cumsum(steps[:MINUTES_PER_DAY])
+
+
+def schedule_windows(devices):
+    """Flatten the enabled devices' schedules to (starts, stops, watts, device index) arrays."""
+    windows, watts, owners = [], [], []
+    for i, device in enumerate(devices):
+        if not device.get("enabled", True):
+            continue
+        scheduled = _windows(device.get("schedule") or "")
+        if scheduled:
+            draw = float(device["watts"])
+        else:
+            scheduled = ((0, MINUTES_PER_DAY),)
+            draw = float(device["watts"]) * float(device["hours"]) / 24
+        windows.extend(scheduled)
+        watts.extend([draw] * len(scheduled))
+        owners.extend([i] * len(scheduled))
+    windows = np.array(windows, dtype=np.int64).reshape(-1, 2)
+    return windows[:, 0], windows[:, 1], np.array(watts, dtype=float), np.array(owners, dtype=np.int64)
+
+
+def _runs(mask):
+    # [start, stop) minute ranges where mask is True
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+
+def peak_load(devices, limit_w):
+    """Per-minute load profile of a device list and how it compares with a power limit.
+
+    Returns a dict with the profile (1440,) in W, peak_w, peak_minute, the devices
+    running at the peak, minutes_over_limit and over_limit windows as (start, stop)
+    minute pairs.
+    """
+    devices = list(devices)
+    starts, stops, watts, owners = schedule_windows(devices)
+    profile = minute_load(starts, stops, watts)
+    peak_minute = int(profile.argmax())
+    running = np.unique(owners[(starts <= peak_minute) & (stops > peak_minute)])
+    over = profile > limit_w + 1e-9
+    return {
+        "profile": profile,
+        "peak_w": float(profile[peak_minute]),
+        "peak_minute": peak_minute,
+        "at_peak": [devices[i]["name"] for i in running],
+        "minutes_over_limit": int(over.sum()),
+        "over_limit": _runs(over),
+    }
+
+
+def clock(minute):
+    return f"{minute // 60:02d}:{minute % 60:02d}"
@@ -0,0 +1,127 @@
+# ALFRED Power Engine – headless, vectorized power budget maths shared by every app version
+import numpy as np
+
+# --- System Constants ---
+BATTERY_WH = 200 * 12       # Renogy 200Ah Core battery at 12V
+ECOFLOW_WH = 3600           # EcoFlow Delta Pro
+ALTERNATOR_W = 480          # 40A DC-DC charger * 12V
+EV_CHARGER_W = 7000         # 7kW EV charger
+ECOFLOW_INVERTER_W = 3600   # Delta Pro continuous AC output
+DC_DC_LIMIT_W = 480         # 40A DC-DC output * 12V
+ORION_OUTPUT_W = 360        # Orion-Tr 12/24-15A cross-charger: 15A * 24V
+ORION_EFFICIENCY = 0.87
+NOMINAL_VOLTS = 12
+
+solar_efficiency_map = {"Low": 1.5, "Medium": 3.5, "High": 5.5}
+
+
+def parse_solar_level(level):
+    """Peak-sun hours for one solar level: a solar_efficiency_map name or a number, "4.5" included."""
+    if level in solar_efficiency_map:
+        return solar_efficiency_map[level]
+    try:
+        return float(level)
+    except ValueError:
+        raise ValueError(f"solar level {level!r} is neither Low/Medium/High nor a number of peak-sun hours") from None
+
+
+def solar_hours_for(levels):
+    """Map solar efficiency levels ("Low"/"Medium"/"High") or raw hours to peak-sun hours.
+
+    Levels may mix names and numbers, including numbers read as strings ("4.5").
+    """
+    levels = np.asarray(levels)
+    if levels.dtype.kind in "USO":
+        return np.vectorize(parse_solar_level, otypes=[float])(levels)
+    return levels.astype(float)
+
+
+def device_arrays(devices):
+    """Return (watts, hours) arrays for the enabled devices in a list of device dicts."""
+    enabled = [d for d in devices if d.get("enabled", True)]
+    watts = np.array([d["watts"] for d in enabled], dtype=float)
+    hours = np.array([d["hours"] for d in enabled], dtype=float)
+    return watts, hours
+
+
+def device_matrix(device_lists):
+    """Pad a list of device lists into (configs, devices) watts and hours matrices.
+
+    Disabled devices and padding both contribute zero hours, so ragged fleets can
+    be evaluated in a single call to power_budget.
+    """
+    width = max((len(devices) for devices in device_lists), default=0)
+    watts = np.zeros((len(device_lists), width))
+    hours = np.zeros((len(device_lists), width))
+    for i, devices in enumerate(device_lists):
+        for j, d in enumerate(devices):
+            if d.get("enabled", True):
+                watts[i, j] = d["watts"]
+                hours[i, j] = d["hours"]
+    return watts, hours
+
+
+def daily_usage(watts, hours):
+    """Daily Wh for a (..., devices) watts x hours matrix, summed over the device axis."""
+    watts = np.asarray(watts, dtype=float)
+    hours = np.asarray(hours, dtype=float)
+    return (watts * hours).sum(axis=-1)
+
+
+def endurance_days(capacity, usage, input_wh, min_deficit=0.0):
+    """Days of autonomy from a full bank.
+
+    With the default min_deficit a sustainable system (usage <= input) returns inf,
+    matching App.py. A positive min_deficit floors the daily deficit instead, which is
+    how App_v3.py has always reported runtime.
+    """
+    capacity = np.asarray(capacity, dtype=float)
+    deficit = np.asarray(usage, dtype=float) - np.asarray(input_wh, dtype=float)
+    if min_deficit > 0:
+        return capacity / np.maximum(deficit, min_deficit)
+    with np.errstate(divide="ignore"):
+        return np.where(deficit > 0, capacity / np.where(deficit > 0, deficit, 1), np.inf)
+
+
+def power_budget(batteries, renogy_solar, ecoflow_solar, solar_hours, drive_hours,
+                 renogy_watts, renogy_hours, ecoflow_watts=(), ecoflow_hours=(),
+                 renogy_enabled=True, ecoflow_enabled=True):
+    """Evaluate the daily power budget for one configuration or a whole fleet at once.
+
+    Scalar arguments broadcast against per-configuration arrays. Device watts/hours are
+    (configs, devices) matrices (or 1-D for a single van). solar_hours takes either
+    solar_efficiency_map levels or raw peak-sun hours. Returns a dict of arrays.
+    """
+    solar_hours = solar_hours_for(solar_hours)
+    renogy_enabled = np.asarray(renogy_enabled, dtype=bool)
+    ecoflow_enabled = np.asarray(ecoflow_enabled, dtype=bool)
+
+    renogy_wh = np.where(renogy_enabled, np.asarray(batteries) * BATTERY_WH, 0)
+    alternator_input = np.where(renogy_enabled, ALTERNATOR_W * np.asarray(drive_hours, dtype=float), 0)
+    renogy_input = np.where(renogy_enabled, np.asarray(renogy_solar) * solar_hours, 0) + alternator_input
+
+    ecoflow_wh = np.where(ecoflow_enabled, ECOFLOW_WH, 0)
+    ecoflow_input = np.where(ecoflow_enabled, np.asarray(ecoflow_solar) * solar_hours, 0)
+
+    renogy_usage = daily_usage(renogy_watts, renogy_hours)
+    ecoflow_usage = daily_usage(ecoflow_watts, ecoflow_hours)
+
+    total_capacity = renogy_wh + ecoflow_wh
+    total_input = renogy_input + ecoflow_input
+    total_usage = renogy_usage + ecoflow_usage
+
+    return {
+        "renogy_wh": renogy_wh,
+        "ecoflow_wh": ecoflow_wh,
+        "alternator_input": alternator_input,
+        "renogy_input": renogy_input,
+        "ecoflow_input": ecoflow_input,
+        "renogy_usage": renogy_usage,
+        "ecoflow_usage": ecoflow_usage,
+        "total_capacity": total_capacity,
+        "total_input": total_input,
+        "total_usage": total_usage,
+        "net_balance": total_input - total_usage,
+        "days": endurance_days(total_capacity, total_usage, total_input),
+        "ev_recharge_hours": np.maximum(0, ecoflow_wh - ecoflow_input) / EV_CHARGER_W,
+    }
@@ -0,0 +1,195 @@
+# ALFRED Profiling – per-section timings, widget and DataFrame counts for every app rerun
+#
+# Wrap part of the script in `with section("sidebar"):` to record its wall time, the
+# widgets it created and the DataFrames it constructed. Samples are kept in a rolling
+# window per section, shared by every session in the process, and summary() turns them
+# into percentiles for the Dev Mode panel. DataFrames are counted by wrapping
+# pandas.DataFrame.__init__ only while some thread is inside a section or run; the
+# original is put back when the last one ends, or when the last thread still inside
+# one turns out to have died.
+#
+# Set ALFRED_METRICS_FILE to also write the metrics out for monitoring to scrape, at most
+# every METRICS_EXPORT_SECONDS: JSON if the path ends in .json, otherwise Prometheus text.
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+METRICS_PATH = os.environ.get("ALFRED_METRICS_FILE", "")
+METRICS_EXPORT_SECONDS = 10.0
+WINDOW = 200                # samples kept per section for the rolling percentiles
+PERCENTILES = (50, 90, 99)
+
+_lock = threading.Lock()
+_samples = {}               # section -> deque of (ms, widgets, dataframes)
+_totals = {}                # section -> samples recorded since the process started
+_local = threading.local()  # DataFrame counter for the script thread of each session
+_active = {}                # thread ident -> (thread, sections and runs it has in progress)
+_dataframe_init = None      # pandas' own DataFrame.__init__ while ours is in its place
+_last_export = time.monotonic()   # first export once the app has run for a while
+
+
+# --- Counters ---
+def _counted_init(self, *args, **kwargs):
+    # Count DataFrame() constructions per thread, and only in threads inside a section,
+    # so that sessions rerunning at the same time don't add to each other's figures
+    if threading.get_ident() in _active:
+        _local.dataframes = getattr(_local, "dataframes", 0) + 1
+    else:
+        with _lock:
+            _update_patch()   # put pandas back if the threads being measured have died
+    _dataframe_init(self, *args, **kwargs)
+
+
+def _update_patch():
+    # With _lock held: forget threads that died inside a block, then wrap or restore
+    # DataFrame.__init__ to match whether any block is still in progress
+    global _dataframe_init
+    for ident in [ident for ident, (thread, _) in _active.items() if not thread.is_alive()]:
+        del _active[ident]
+    if _active and pd.DataFrame.__init__ is not _counted_init:
+        _dataframe_init = pd.DataFrame.__init__
+        pd.DataFrame.__init__ = _counted_init
+    elif not _active and pd.DataFrame.__init__ is _counted_init:
+        pd.DataFrame.__init__ = _dataframe_init
+
+
+def _enter():
+    thread = threading.current_thread()
+    with _lock:
+        owner, blocks = _active.get(thread.ident, (thread, 0))
+        _active[thread.ident] = (thread, blocks + 1 if owner is thread else 1)
+        _update_patch()
+
+
+def _exit():
+    thread = threading.current_thread()
+    with _lock:
+        owner, blocks = _active.get(thread.ident, (None, 0))
+        if owner is thread and blocks > 1:
+            _active[thread.ident] = (thread, blocks - 1)
+        elif owner is thread:
+            del _active[thread.ident]
+        _update_patch()
+
+
+def _widgets():
+    # Element ids registered so far in this run; 0 outside a Streamlit script run
+    ctx = get_script_run_ctx(suppress_warning=True)
+    ids = getattr(getattr(ctx, "shared", ctx), "widget_ids_this_run", None)
+    if ids is None:
+        return 0
+    return len(ids.snapshot() if hasattr(ids, "snapshot") else ids)
+
+
+def _counters():
+    return time.perf_counter(), _widgets(), getattr(_local, "dataframes", 0)
+
+
+# --- Recording ---
+def record(name, ms, widgets=0, dataframes=0):
+    with _lock:
+        _samples.setdefault(name, deque(maxlen=WINDOW)).append((ms, widgets, dataframes))
+        _totals[name] = _totals.get(name, 0) + 1
+    if METRICS_PATH:
+        export_due()
+
+
+@contextmanager
+def section(name):
+    """Record the wall time, widgets and DataFrames of the enclosed block under name.
+
+    Sections may nest; an outer section's figures include everything inside it.
+    """
+    _enter()
+    try:
+        start, widgets, dataframes = _counters()
+        try:
+            yield
+        finally:
+            end, widgets_end, dataframes_end = _counters()
+            record(name, (end - start) * 1000, widgets_end - widgets, dataframes_end - dataframes)
+    finally:
+        _exit()
+
+
+def start_run():
+    """Mark the top of a full script run; finish_run(), called in a finally, records it as the "run" section."""
+    if getattr(_local, "run", None) is not None:
+        _exit()       # a run on this thread that never reached finish_run()
+    _enter()
+    _local.run = _counters()
+
+
+def finish_run():
+    start = getattr(_local, "run", None)
+    if start is not None:
+        end = _counters()
+        record("run", (end[0] - start[0]) * 1000, end[1] - start[1], end[2] - start[2])
+        _local.run = None
+        _exit()
+
+
+# --- Reporting ---
+def summary():
+    """One dict per section: samples, last and percentile times in ms, last widget and DataFrame counts."""
+    with _lock:
+        snapshot = {name: (list(samples), _totals[name]) for name, samples in _samples.items()}
+    rows = []
+    for name, (samples, total) in snapshot.items():
+        ms = np.array([s[0] for s in samples])
+        row = {"section": name, "samples": total, "last_ms": float(ms[-1])}
+        row.update({f"p{q}_ms": float(v) for q, v in zip(PERCENTILES, np.percentile(ms, PERCENTILES))})
+        row["widgets"], row["dataframes"] = samples[-1][1], samples[-1][2]
+        rows.append(row)
+    return rows
+
+
+def metrics_json(rows=None):
+    return json.dumps({"generated": time.time(), "sections": summary() if rows is None else rows}, indent=2)
+
+
+def metrics_text(rows=None):
+    """Prometheus text exposition of the summary."""
+    rows = summary() if rows is None else rows
+    lines = ["# HELP alfred_section_ms Wall time of an App.py section over the rolling window.",
+             "# TYPE alfred_section_ms summary"]
+    for row in rows:
+        label = f'section="{row["section"]}"'
+        for q in PERCENTILES:
+            lines.append(f'alfred_section_ms{{{label},quantile="{q / 100:g}"}} {row[f"p{q}_ms"]:.3f}')
+        lines.append(f"alfred_section_ms_count{{{label}}} {row['samples']}")
+    for metric, field, text in [("alfred_section_widgets", "widgets", "Widgets created in the section's last run."),
+                                ("alfred_section_dataframes", "dataframes",
+                                 "DataFrames constructed in the section's last run.")]:
+        lines += [f"# HELP {metric} {text}", f"# TYPE {metric} gauge"]
+        lines += [f'{metric}{{section="{row["section"]}"}} {row[field]}' for row in rows]
+    return "\n".join(lines) + "\n"
+
+
+def export(path=METRICS_PATH):
+    """Write the metrics to path, replacing the previous file in one step."""
+    text = metrics_json() if path.endswith(".json") else metrics_text()
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def export_due(path=METRICS_PATH):
+    global _last_export
+    now = time.monotonic()
+    with _lock:
+        if now - _last_export < METRICS_EXPORT_SECONDS:
+            return
+        _last_export = now
+    try:
+        export(path)
+    except OSError:
+        pass    # monitoring must never break the app; the next export tries again
@@ -0,0 +1,364 @@
+# ALFRED Reports – downloadable build sheets generated on a bounded background pool
+#
+#   queue = ReportQueue(cache=ResultCache())
+#   job = queue.submit(key, build_report, "pdf", config, devices, results, components)
+#   job.progress, job.stage        # while it runs
+#   job.result()                   # the finished file as bytes
+#
+# A build sheet holds the configuration, both device tables, the power summary,
+# endurance, the daily power chart and the System Components list, as a self-contained
+# HTML page or an A4 PDF. Both are written by hand from one list of blocks, so neither
+# needs a rendering library. Jobs run on REPORT_WORKERS threads; at most
+# REPORT_MAX_PENDING wait behind them and further submissions are refused rather than
+# queued without limit. Finished reports are kept by key – in memory and, when given
+# one, in the shared result cache – so a repeat download is served without regenerating.
+import html
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from soc_simulation import HOURS_PER_DAY
+
+REPORT_WORKERS = int(os.environ.get("ALFRED_REPORT_WORKERS", "2"))
+REPORT_MAX_PENDING = 8      # jobs waiting for a worker before submit() refuses more
+REPORT_KEEP = 64            # finished jobs kept in memory, oldest dropped first
+REPORT_FORMATS = {          # format: (MIME type, file extension)
+    "html": ("text/html", "html"),
+    "pdf": ("application/pdf", "pdf"),
+}
+BAR_COLORS = ["#393b79", "#5254a3", "#ad494a", "#d6616b"]
+
+
+# --- Report Content ---
+def _days(d):
+    return "∞" if d == float("inf") else f"{d:.1f}"
+
+
+def report_blocks(config, devices, results, components, progress=lambda stage, share: None):
+    """The build sheet as (kind, ...) blocks: heading, text, table (header, rows) and bars."""
+    budget, endurance, weather = results["budget"], results["endurance"], results["weather"]
+    progress("Configuration", 0.1)
+    blocks = [
+        ("title", "Alfred Build Sheet"),
+        ("heading", "Configuration"),
+        ("table", ["Setting", "Value"], [
+            ["Renogy 12V system", f"{config['renogy_batteries']} × 200Ah, {config['renogy_solar']} W solar, "
+                                  f"{config['drive_hours']:g} h driving/day" if config["show_renogy"] else "Off"],
+            ["EcoFlow 240V system", f"{config['ecoflow_solar']} W solar" if config["show_ecoflow"] else "Off"],
+            ["Sun hours/day", f"{config['solar_hours']:.1f}"],
+            ["DC-DC / inverter limits", f"{config['dc_dc_limit']:.0f} W / {config['inverter_limit']:.0f} W"],
+        ]),
+    ]
+
+    progress("Device tables", 0.25)
+    for system, rows in devices.items():
+        blocks += [("heading", f"{system} Devices"), ("table", ["Device", "W", "Hrs", "Wh/day", "On", "Schedule"], [
+            [d.name, f"{d.watts}", f"{d.hours:g}", f"{d.watts * d.hours:.0f}", "yes" if d.enabled else "no",
+             d.schedule] for d in rows
+        ])]
+
+    progress("Summary", 0.45)
+    total_capacity = float(budget["total_capacity"])
+    blocks += [("heading", "Power Summary"), ("table", ["", "Wh", "Ah at 12V"], [
+        [label, f"{float(budget[k]):.0f}", f"{float(budget[k]) / 12:.1f}"]
+        for label, k in [("Total capacity", "total_capacity"), ("Daily usage", "total_usage"),
+                         ("Daily input", "total_input"), ("Net balance", "net_balance")]
+    ])]
+
+    lines = []
+    for name, capacity, hour in zip(["Renogy", "EcoFlow"], [budget["renogy_wh"], budget["ecoflow_wh"]],
+                                    endurance["first_empty"]):
+        if float(capacity) > 0:
+            lines.append(f"{name}: never runs flat" if hour < 0 else
+                         f"{name}: runs flat after {hour / HOURS_PER_DAY:.1f} days")
+    lines.append(f"Orion cross-charge policy: {endurance['policy']} (" +
+                 ", ".join(f"{name} {_days(d)} days" for name, d in endurance["days"].items()) + ")")
+    if weather is not None:
+        lines.append(f"Weather-adjusted autonomy: P10 {weather['p10']:.1f}, P50 {weather['p50']:.1f}, "
+                     f"P90 {weather['p90']:.1f} days")
+    blocks += [("heading", "Battery Endurance")] + [("text", line) for line in lines]
+
+    progress("Chart", 0.6)
+    blocks += [("heading", "Daily Power Distribution"), ("bars", "% of capacity", [
+        (label, float(budget[k]) * sign / max(total_capacity, 1) * 100)
+        for label, k, sign in [("Renogy Input", "renogy_input", 1), ("EcoFlow Input", "ecoflow_input", 1),
+                               ("Renogy Usage", "renogy_usage", -1), ("EcoFlow Usage", "ecoflow_usage", -1)]
+    ])]
+
+    progress("System Components", 0.75)
+    blocks += [("heading", "System Components"), ("table", ["Component", "Fuse", "Wire", "Placement"], [
+        [f"{c['name']} – {c['desc']}", c["fuse"], c["wire"], c["placement"]] for c in components
+    ])]
+    return blocks
+
+
+# --- HTML ---
+_CSS = """body{font-family:Helvetica,Arial,sans-serif;max-width:60em;margin:2em auto;color:#222}
+table{border-collapse:collapse;width:100%;margin:.5em 0 1em}th,td{border:1px solid #ccc;padding:.3em .5em;
+text-align:left;vertical-align:top}th{background:#f2f2f2}h2{border-bottom:2px solid #393b79;padding-bottom:.2em}"""
+
+
+def _svg_bars(unit, bars):
+    low, high = min(0, *(v for _, v in bars)), max(0, *(v for _, v in bars))
+    scale = 360 / max(high - low, 1e-9)
+    zero = 160 + -low * scale
+    parts = []
+    for i, (label, value) in enumerate(bars):
+        x, width = (zero, value * scale) if value >= 0 else (zero + value * scale, -value * scale)
+        y = 10 + i * 34
+        parts.append(f'<text x="150" y="{y + 17}" text-anchor="end">{html.escape(label)}</text>'
+                     f'<rect x="{x:.1f}" y="{y}" width="{width:.1f}" height="24" fill="{BAR_COLORS[i % 4]}"/>'
+                     f'<text x="{x + width + 4:.1f}" y="{y + 17}">{value:.1f}%</text>')
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="600" height="{20 + 34 * len(bars)}" '
+            f'font-size="13" aria-label="{html.escape(unit)}"><line x1="{zero:.1f}" x2="{zero:.1f}" y1="0" '
+            f'y2="{10 + 34 * len(bars)}" stroke="#888"/>{"".join(parts)}</svg>')
+
+
+def render_html(blocks):
+    title, out = "", []
+    for kind, *args in blocks:
+        if kind == "title":
+            title = html.escape(args[0])
+            out.append(f"<h1>{title}</h1>")
+        elif kind == "heading":
+            out.append(f"<h2>{html.escape(args[0])}</h2>")
+        elif kind == "text":
+            out.append(f"<p>{html.escape(args[0])}</p>")
+        elif kind == "table":
+            header, rows = args
+            out.append("<table><tr>" + "".join(f"<th>{html.escape(h)}</th>" for h in header) + "</tr>" +
+                       "".join("<tr>" + "".join(f"<td>{html.escape(str(c))}</td>" for c in row) + "</tr>"
+                               for row in rows) + "</table>")
+        elif kind == "bars":
+            out.append(_svg_bars(*args))
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title><style>{_CSS}</style></head>"
+            f"<body>{''.join(out)}</body></html>").encode()
+
+
+# --- PDF ---
+# A4 pages in points, set in the standard Helvetica fonts with WinAnsi encoding, so the
+# file needs no embedded fonts. Text widths are estimated at half the font size per
+# character, which is close enough to wrap paragraphs and clip table cells.
+PAGE_W, PAGE_H, MARGIN = 595, 842, 50
+
+
+def _pdf_text(text):
+    text = str(text).replace("→", "->").replace("∞", "inf").encode("cp1252", "replace")
+    return text.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+class _PdfPages:
+    def __init__(self):
+        self.pages = []
+        self.new_page()
+
+    def new_page(self):
+        self.ops = []
+        self.pages.append(self.ops)
+        self.y = PAGE_H - MARGIN
+
+    def need(self, height):
+        if self.y - height < MARGIN:
+            self.new_page()
+
+    def text(self, x, text, size=10, bold=False):
+        self.ops.append(b"BT /%s %d Tf %.1f %.1f Td (%s) Tj ET" % (b"F2" if bold else b"F1", size, x, self.y,
+                                                                 _pdf_text(text)))
+
+    def rect(self, x, y, w, h, color):
+        r, g, b = (int(color[i:i + 2], 16) / 255 for i in (1, 3, 5))
+        self.ops.append(b"q %.3f %.3f %.3f rg %.1f %.1f %.1f %.1f re f Q" % (r, g, b, x, y, w, h))
+
+
+def _clip(text, width, size):
+    chars = max(int(width / (size * 0.5)), 1)
+    text = str(text)
+    return text if len(text) <= chars else text[:chars - 1] + "…"
+
+
+def _wrap(text, width, size):
+    chars, lines, line = max(int(width / (size * 0.5)), 1), [], ""
+    for word in str(text).split():
+        if line and len(line) + 1 + len(word) > chars:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}".strip()
+    return lines + [line]
+
+
+def render_pdf(blocks):
+    pdf, width = _PdfPages(), PAGE_W - 2 * MARGIN
+    for kind, *args in blocks:
+        if kind in ("title", "heading"):
+            size = 18 if kind == "title" else 13
+            pdf.need(size * 2.5)
+            pdf.y -= size * 1.2
+            pdf.text(MARGIN, args[0], size, bold=True)
+            pdf.y -= size * 0.6
+        elif kind == "text":
+            for line in _wrap(args[0], width, 10):
+                pdf.need(14)
+                pdf.y -= 14
+                pdf.text(MARGIN, line)
+        elif kind == "table":
+            header, rows = args
+            # Columns share the width in proportion to their longest entry, within limits
+            longest = [min(max(len(str(c)) for c in col), 40) + 2 for col in zip(header, *rows)]
+            widths = [width * n / sum(longest) for n in longest]
+            for i, row in enumerate([header] + rows):
+                pdf.need(14)
+                pdf.y -= 14
+                if i == 0:
+                    pdf.rect(MARGIN, pdf.y - 4, width, 14, "#f2f2f2")
+                x = MARGIN
+                for cell, w in zip(row, widths):
+                    pdf.text(x + 2, _clip(cell, w - 4, 9), 9, bold=i == 0)
+                    x += w
+            pdf.y -= 6
+        elif kind == "bars":
+            unit, bars = args
+            low, high = min(0, *(v for _, v in bars)), max(0, *(v for _, v in bars))
+            scale = (width - 170) / max(high - low, 1e-9)
+            zero = MARGIN + 110 + -low * scale
+            pdf.need(24 * len(bars) + 10)
+            for i, (label, value) in enumerate(bars):
+                pdf.y -= 24
+                x, w = (zero, value * scale) if value >= 0 else (zero + value * scale, -value * scale)
+                pdf.text(MARGIN, label, 9)
+                pdf.rect(x, pdf.y - 4, w, 16, BAR_COLORS[i % 4])
+                pdf.text(x + w + 4, f"{value:.1f}%", 9)
+            pdf.y -= 10
+
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>",
+               b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+                   b" ".join(b"%d 0 R" % (5 + 2 * i) for i in range(len(pdf.pages))), len(pdf.pages)),
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>"]
+    for i, ops in enumerate(pdf.pages):
+        stream = zlib.compress(b"\n".join(ops))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+                       b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> >>" % (PAGE_W, PAGE_H, 6 + 2 * i))
+        objects.append(b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream))
+
+    out, offsets = bytearray(b"%PDF-1.4\n"), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def build_report(fmt, config, devices, results, components, progress=lambda stage, share: None):
+    """The build sheet as HTML or PDF bytes, reporting each stage to progress(stage, share)."""
+    blocks = report_blocks(config, devices, results, components, progress)
+    progress(f"Rendering {fmt.upper()}", 0.9)
+    return render_pdf(blocks) if fmt == "pdf" else render_html(blocks)
+
+
+# --- Job Queue ---
+class ReportJob:
+    """One report being generated: stage and progress while it runs, then its bytes."""
+
+    def __init__(self, key):
+        self.key = key
+        self.stage, self.progress = "Queued", 0.0
+        self.data = self.error = None
+        self._done = threading.Event()
+
+    def update(self, stage, share):
+        self.stage, self.progress = stage, share
+
+    def finish(self, data=None, error=None):
+        self.data, self.error = data, error
+        self.stage, self.progress = ("Failed", self.progress) if error else ("Ready", 1.0)
+        self._done.set()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """The report bytes, waiting up to timeout seconds; raises RuntimeError if it failed."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"report {self.key[:12]} is still {self.stage.lower()}")
+        if self.error:
+            raise RuntimeError(self.error)
+        return self.data
+
+
+class ReportQueue:
+    """Bounded pool of report workers, with finished reports kept by key.
+
+    Submitting a key already queued, running or finished returns that job, so many users
+    exporting the same setup share one generation. Submitting the key of a failed job
+    starts it again.
+    """
+
+    def __init__(self, workers=REPORT_WORKERS, max_pending=REPORT_MAX_PENDING, keep=REPORT_KEEP, cache=None):
+        self.max_pending = max_pending
+        self.keep = keep
+        self.cache = cache
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="alfred-report")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._workers = workers
+
+    def _pending(self):
+        return sum(1 for job in self._jobs.values() if not job.done())
+
+    def job(self, key):
+        """The job for key if it is queued, running or finished here or in the shared cache."""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None:
+                self._jobs.move_to_end(key)
+                return job
+        data = self.cache.get(key) if self.cache is not None else None
+        if data is None:
+            return None
+        job = ReportJob(key)
+        job.finish(data)
+        return self._store(job)
+
+    def _store(self, job):
+        with self._lock:
+            job = self._jobs.setdefault(job.key, job)
+            finished = [k for k, j in self._jobs.items() if j.done()]
+            for k in finished[:max(len(finished) - self.keep, 0)]:
+                del self._jobs[k]
+        return job
+
+    def submit(self, key, build, *args):
+        """Queue build(*args, progress=...) under key and return its job.
+
+        Raises RuntimeError when max_pending jobs are already waiting for a worker.
+        """
+        job = self.job(key)
+        if job is not None and not job.error:
+            return job
+        with self._lock:
+            # Another session may have submitted the same key since the lookup above
+            job = self._jobs.get(key)
+            if job is not None and not job.error:
+                return job
+            if self._pending() >= self._workers + self.max_pending:
+                raise RuntimeError("Too many reports are being generated – try again in a moment.")
+            job = self._jobs[key] = ReportJob(key)
+        self._pool.submit(self._run, job, build, args)
+        return job
+
+    def _run(self, job, build, args):
+        try:
+            data = build(*args, progress=job.update)
+        except Exception as e:
+            job.finish(error=f"{type(e).__name__}: {e}")
+            return
+        if self.cache is not None:
+            self.cache.put(job.key, data)
+        job.finish(data)
+        self._store(job)
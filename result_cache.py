@@ -0,0 +1,200 @@
+# ALFRED Result Cache – disk-backed results shared by every server process, keyed by content
+#
+# A result is stored under a SHA-256 of the canonical JSON of everything it was computed
+# from, so two sessions with the same devices and settings share one entry however they
+# got there. Entries live in one SQLite file (ALFRED_RESULT_CACHE; empty disables the
+# cache) that all Streamlit processes on the host open, and survive restarts. When the
+# stored results pass ALFRED_RESULT_CACHE_MB the least recently used are evicted.
+#
+# The default file sits in the user's own cache directory, created 0700, and the file
+# itself is 0600. Values are stored as JSON with their numpy arrays and bytes in an
+# .npz archive read with allow_pickle=False, so a planted entry can at worst be wrong
+# data, never code that runs on load.
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+import zipfile
+
+import numpy as np
+
+CACHE_PATH = os.environ.get("ALFRED_RESULT_CACHE", os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "alfred", "results.sqlite"))
+CACHE_MAX_BYTES = int(float(os.environ.get("ALFRED_RESULT_CACHE_MB", "64")) * 2 ** 20)
+CACHE_VERSION = 3           # bump when a cached result's contents change meaning
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,
+                                    used REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS entries_used ON entries (used);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+def _canonical(value):
+    # JSON-able form of configs, device records and numpy values; floats are kept
+    # exact, so 0.5 and np.float64(0.5) hash the same but 0.5 and 0.50001 do not
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return _canonical(value.tolist())
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def content_key(*parts):
+    """Hex SHA-256 of the canonical JSON of parts, stable across processes and restarts."""
+    text = json.dumps([CACHE_VERSION, _canonical(parts)], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def encode(value):
+    """Bytes of a result made of dicts with string keys, lists, tuples, numbers, strings,
+    bytes and numpy arrays; tuples come back as lists. Raises TypeError for anything else."""
+    arrays = {}
+
+    def walk(v):
+        if isinstance(v, np.ndarray):
+            if v.dtype.hasobject:
+                raise TypeError("object arrays can't be cached")
+            arrays[f"a{len(arrays)}"] = v
+            return {"__array__": f"a{len(arrays) - 1}"}
+        if isinstance(v, bytes):
+            arrays[f"a{len(arrays)}"] = np.frombuffer(v, dtype=np.uint8)
+            return {"__bytes__": f"a{len(arrays) - 1}"}
+        if isinstance(v, np.generic):
+            return v.item()
+        if isinstance(v, dict):
+            if not all(isinstance(k, str) for k in v):
+                raise TypeError("cached dicts need string keys")
+            return {k: walk(x) for k, x in v.items()}
+        if isinstance(v, (list, tuple)):
+            return [walk(x) for x in v]
+        if v is None or isinstance(v, (str, int, float)):
+            return v
+        raise TypeError(f"{type(v).__name__} can't be cached")
+
+    doc = json.dumps(walk(value)).encode()
+    buffer = io.BytesIO()
+    np.savez(buffer, doc=np.frombuffer(doc, dtype=np.uint8), **arrays)
+    return buffer.getvalue()
+
+
+def decode(blob):
+    """The value encode() stored in blob."""
+    with np.load(io.BytesIO(blob), allow_pickle=False) as archive:
+        def walk(v):
+            if isinstance(v, dict):
+                if v.keys() == {"__array__"}:
+                    return archive[v["__array__"]]
+                if v.keys() == {"__bytes__"}:
+                    return archive[v["__bytes__"]].tobytes()
+                return {k: walk(x) for k, x in v.items()}
+            if isinstance(v, list):
+                return [walk(x) for x in v]
+            return v
+
+        return walk(json.loads(archive["doc"].tobytes()))
+
+
+class ResultCache:
+    """Results in a SQLite file, evicted least recently used beyond max_bytes.
+
+    Each thread keeps its own connection. Any database error is treated as a miss (or a
+    skipped store), so a locked or unwritable cache slows the app down but never breaks it.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Private to this user from the start: SQLite gives the -wal and -shm files
+            # the database file's permissions
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), mode=0o700, exist_ok=True)
+            os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600))
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+            self._local.db = db
+        return db
+
+    def _count(self, db, name, n=1):
+        db.execute("INSERT INTO counters VALUES (?, ?) ON CONFLICT (name) DO UPDATE SET value = value + ?",
+                   (name, n, n))
+
+    def get(self, key, default=None):
+        try:
+            db = self._db()
+            row = db.execute("SELECT value FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count(db, "misses")
+                return default
+            db.execute("UPDATE entries SET used = ? WHERE key = ?", (time.time(), key))
+            self._count(db, "hits")
+            return decode(row[0])
+        except (sqlite3.Error, OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return default
+
+    def put(self, key, value):
+        """Store value under key; values encode() can't store are skipped."""
+        try:
+            blob = encode(value)
+        except TypeError:
+            return
+        if len(blob) > self.max_bytes:
+            return
+        try:
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)", (key, blob, len(blob), time.time()))
+                self._evict(db)
+                db.execute("COMMIT")
+            except sqlite3.Error:
+                db.execute("ROLLBACK")
+                raise
+        except (sqlite3.Error, OSError):
+            pass
+
+    def _evict(self, db):
+        excess = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        evicted = []
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY used"):
+            evicted.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        db.executemany("DELETE FROM entries WHERE key = ?", evicted)
+        self._count(db, "evictions", len(evicted))
+
+    def get_or_compute(self, key, compute):
+        """Cached result for key, calling compute() and storing its result on a miss."""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        """Hits, misses and evictions across all processes, plus current entries and bytes."""
+        stats = {"hits": 0, "misses": 0, "evictions": 0, "entries": 0, "bytes": 0}
+        try:
+            db = self._db()
+            stats.update(db.execute("SELECT name, value FROM counters").fetchall())
+            stats["entries"], stats["bytes"] = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        except (sqlite3.Error, OSError):
+            pass
+        return stats
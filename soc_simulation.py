@@ -0,0 +1,192 @@
+# ALFRED SoC Simulation – hourly state-of-charge simulator for the Renogy and EcoFlow banks
+import numpy as np
+
+HOURS_PER_DAY = 24
+DAYS_PER_YEAR = 365
+HOURS_PER_YEAR = HOURS_PER_DAY * DAYS_PER_YEAR
+DRIVE_START_HOUR = 10       # driving (and alternator charging) starts mid-morning
+SCAN_MAX_COLUMNS = 16       # above this many banks the plain time loop beats the prefix scan
+CHUNK_ELEMENTS = 4_000_000  # cap on hours * banks held in memory per chunk
+
+# Share of daily device usage drawn in each hour – quiet overnight, peaks at breakfast and evening
+DEFAULT_LOAD_SHAPE = np.array([
+    2, 2, 2, 2, 2, 2, 3, 5, 6, 5, 4, 4,
+    5, 4, 4, 4, 4, 5, 7, 7, 6, 5, 4, 3,
+], dtype=float)
+DEFAULT_LOAD_SHAPE /= DEFAULT_LOAD_SHAPE.sum()
+
+
+def _day_of_year(days, start_day):
+    return (start_day + np.arange(days)) % DAYS_PER_YEAR
+
+
+def solar_profile(days=DAYS_PER_YEAR, start_day=0, seasonal=True):
+    """Hourly share of a day's solar yield, shape (days * 24,).
+
+    Each day follows a sine arc between sunrise and sunset. With seasonal=True UK day
+    length and yield swing through the year (short, weak winters; long summers) while
+    keeping the annual mean at the solar_efficiency_map level.
+    """
+    doy = _day_of_year(days, start_day)
+    season = np.cos(2 * np.pi * (doy - 172) / DAYS_PER_YEAR) if seasonal else np.zeros(days)
+    day_length = 12 + 4.5 * season
+    sunrise = 12 - day_length / 2
+
+    hour = np.arange(HOURS_PER_DAY) + 0.5
+    arc = np.sin(np.pi * (hour[None, :] - sunrise[:, None]) / day_length[:, None])
+    arc = np.clip(arc, 0, None)
+    arc /= arc.sum(axis=1, keepdims=True)
+    return (arc * (1 + 0.55 * season)[:, None]).ravel()
+
+
+def load_profile(days=DAYS_PER_YEAR, shape=DEFAULT_LOAD_SHAPE):
+    """Hourly share of daily device usage, shape (days * 24,)."""
+    return np.tile(shape, days)
+
+
+def drive_profile(drive_hours, days=DAYS_PER_YEAR):
+    """Hours of alternator charging in each hour of the simulation, shape (days * 24, ...)."""
+    drive_hours = np.asarray(drive_hours, dtype=float)
+    hour = np.tile(np.arange(HOURS_PER_DAY), days) - DRIVE_START_HOUR
+    hour = hour.reshape((-1,) + (1,) * drive_hours.ndim)
+    return np.where(hour >= 0, np.clip(drive_hours - hour, 0, 1), 0)
+
+
+def _scan_kernel(capacity, net, soc0):
+    # Each hour is the map s -> clip(s + a, lo, hi). Those maps are closed under
+    # composition, so a doubling prefix scan gives every hour's SoC in log2(T) passes.
+    add = net.copy()
+    low = np.zeros_like(net)
+    high = np.broadcast_to(capacity, net.shape).copy()
+    step = 1
+    while step < len(net):
+        later_add, later_low, later_high = add[step:], low[step:], high[step:]
+        new_low = np.minimum(np.maximum(low[:-step] + later_add, later_low), later_high)
+        new_high = np.minimum(np.maximum(high[:-step] + later_add, later_low), later_high)
+        add[step:] = add[:-step] + later_add
+        low[step:] = new_low
+        high[step:] = new_high
+        step *= 2
+    return np.minimum(np.maximum(soc0 + add, low), high)
+
+
+def _loop_kernel(capacity, net, soc0):
+    soc = np.empty_like(net)
+    level = np.array(soc0, dtype=float)
+    for t in range(len(net)):
+        level += net[t]
+        np.maximum(level, 0, out=level)
+        np.minimum(level, capacity, out=level)
+        soc[t] = level
+    return soc
+
+
+def simulate_soc(capacity, net, soc0=None, keep_trajectory=True):
+    """Step bank state of charge through hourly net flows, clamped to [0, capacity].
+
+    capacity is (banks,) Wh and net is (hours, banks) Wh of input minus load. Input
+    that would push a full bank past capacity is curtailed; load that a flat bank
+    cannot supply is unmet. Returns a dict with the SoC trajectory (or None),
+    final_soc, first_empty_hour (-1 if the bank never runs dry), curtailed_wh and
+    unmet_wh.
+    """
+    capacity = np.asarray(capacity, dtype=float)
+    net = np.asarray(net, dtype=float)
+    soc0 = np.broadcast_to(capacity if soc0 is None else np.asarray(soc0, dtype=float), capacity.shape)
+
+    if capacity.size <= SCAN_MAX_COLUMNS:
+        soc = _scan_kernel(capacity, net, soc0)
+    else:
+        soc = _loop_kernel(capacity, net, soc0)
+
+    unclamped = np.concatenate([soc0[None], soc[:-1]]) + net
+    empty = unclamped < -1e-9
+    return {
+        "soc": soc if keep_trajectory else None,
+        "final_soc": soc[-1].copy(),
+        "first_empty_hour": np.where(empty.any(axis=0), empty.argmax(axis=0), -1),
+        "curtailed_wh": np.clip(unclamped - capacity, 0, None).sum(axis=0),
+        "unmet_wh": np.clip(-unclamped, 0, None).sum(axis=0),
+    }
+
+
+def days_until_flat(capacity, first_empty_hour):
+    """Days until the first bank with any capacity runs flat (inf if none ever does).
+
+    capacity and first_empty_hour are (..., banks); disabled (zero capacity) banks are ignored.
+    """
+    hours = np.where((np.asarray(capacity) > 0) & (first_empty_hour >= 0), first_empty_hour, np.inf)
+    return hours.min(axis=-1) / HOURS_PER_DAY
+
+
+def hourly_net(solar_wh, alternator_wh, usage_wh, drive_hours, days=DAYS_PER_YEAR, start_day=0, seasonal=True,
+               solar_shape=None):
+    """Hourly net Wh (hours, configs) for one bank from its daily solar, alternator and usage totals.
+
+    solar_wh may be (configs,) for a typical day or (configs, days) for a per-day sequence.
+    solar_shape (hours,) replaces the modelled solar_profile(), e.g. with measured irradiance.
+    """
+    solar_wh = np.atleast_1d(np.asarray(solar_wh, dtype=float))
+    if solar_shape is None:
+        solar_shape = solar_profile(days, start_day, seasonal)
+    solar_shape = np.asarray(solar_shape, dtype=float)[:, None]
+    if solar_wh.ndim == 2:
+        solar = solar_shape * np.repeat(solar_wh.T, HOURS_PER_DAY, axis=0)
+    else:
+        solar = solar_shape * solar_wh
+    drive_hours = np.atleast_1d(np.asarray(drive_hours, dtype=float))
+    alternator_share = drive_profile(drive_hours, days) / np.where(drive_hours > 0, drive_hours, 1)
+    alternator = alternator_share * np.atleast_1d(alternator_wh)
+    load = load_profile(days)[:, None] * np.atleast_1d(usage_wh)
+    return solar + alternator - load
+
+
+def simulate_year(budget, drive_hours, days=DAYS_PER_YEAR, start_day=0, soc0=None, seasonal=True,
+                  renogy_solar_wh=None, ecoflow_solar_wh=None, keep_trajectory=True, solar_shape=None):
+    """Hourly simulation of both banks for every configuration in a power_budget() result.
+
+    Returns simulate_soc() results with a trailing bank axis (0 = Renogy, 1 = EcoFlow);
+    SoC trajectories are (hours, configs, 2). soc0 is the starting charge in Wh and
+    defaults to full. Per-day solar sequences can be passed as renogy_solar_wh /
+    ecoflow_solar_wh of shape (configs, days), and solar_shape (hours,) replaces the
+    modelled hourly solar share. Configurations are simulated in chunks so fleet-sized
+    batches stay within a fixed memory budget.
+    """
+    capacity = np.stack(np.broadcast_arrays(
+        np.atleast_1d(budget["renogy_wh"]), np.atleast_1d(budget["ecoflow_wh"])), axis=-1).astype(float)
+    configs = len(capacity)
+    if renogy_solar_wh is None:
+        renogy_solar_wh = np.asarray(budget["renogy_input"]) - np.asarray(budget["alternator_input"])
+    if ecoflow_solar_wh is None:
+        ecoflow_solar_wh = budget["ecoflow_input"]
+
+    def per_config(values):
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        return np.broadcast_to(values, (configs,) + values.shape[1:])
+
+    renogy_solar_wh, ecoflow_solar_wh = per_config(renogy_solar_wh), per_config(ecoflow_solar_wh)
+    alternator_wh, drive_hours = per_config(budget["alternator_input"]), per_config(drive_hours)
+    renogy_usage, ecoflow_usage = per_config(budget["renogy_usage"]), per_config(budget["ecoflow_usage"])
+    soc0 = capacity if soc0 is None else np.broadcast_to(np.asarray(soc0, dtype=float), capacity.shape)
+
+    hours = days * HOURS_PER_DAY
+    chunk = max(1, CHUNK_ELEMENTS // (hours * 2))
+    results = []
+    for lo in range(0, configs, chunk):
+        part = slice(lo, lo + chunk)
+        net = np.stack([
+            hourly_net(renogy_solar_wh[part], alternator_wh[part], renogy_usage[part], drive_hours[part],
+                       days, start_day, seasonal, solar_shape),
+            hourly_net(ecoflow_solar_wh[part], 0, ecoflow_usage[part], 0, days, start_day, seasonal, solar_shape),
+        ], axis=-1)
+        result = simulate_soc(capacity[part].ravel(), net.reshape(hours, -1), soc0[part].ravel(), keep_trajectory)
+        results.append({
+            key: None if value is None else value.reshape(value.shape[:-1] + (-1, 2))
+            for key, value in result.items()
+        })
+
+    axis = {"soc": 1}
+    return {
+        key: None if results[0][key] is None else np.concatenate([r[key] for r in results], axis=axis.get(key, 0))
+        for key in results[0]
+    }
@@ -0,0 +1,299 @@
+# ALFRED Telemetry – replay shunt and EcoFlow logs to check and calibrate the power model
+#
+#   python telemetry.py logs.csv --configs vans.csv --devices devices.csv \
+#       -o comparison.csv --calibration calibration.json
+#
+# Log manifest: one row per log file (paths relative to the manifest).
+#   path, van_id, system (renogy/ecoflow)
+#
+# Log files: CSV or Parquet exports from a Renogy Smart Shunt / One Core or the EcoFlow
+# app, one sample per row. Columns are matched by name (case, spaces and units ignored):
+#   time (timestamp or epoch seconds), solar power in W, and either load power in W or
+#   the battery's net power (W, or voltage and current) with charging positive. With net
+#   power, a DC-DC / alternator or mains charger power column in W is added to the solar
+#   to work out the load; without one, samples charging faster than the panels can are
+#   left out of the load figures.
+#
+# Configuration and device files are the batch_cli.py ones, with a name column on the
+# devices so duty hours can be fitted per appliance.
+#
+# Every log is read in chunks and reduced to daily solar and load Wh as it goes, one log
+# per worker process, so memory stays flat however many rows a van has logged.
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from batch_cli import read_chunks, with_defaults
+from power_engine import solar_efficiency_map
+
+NS_PER_DAY = 86_400 * 10 ** 9
+MAX_GAP_S = 15 * 60         # a longer gap between samples is missing data, not a steady reading
+MIN_COVERAGE = 0.9          # share of a day the samples must cover for the day to be used
+SUN_QUANTILES = {"Low": 1 / 6, "Medium": 1 / 2, "High": 5 / 6}  # middle of each third of the days
+DUTY_PRIOR_WEIGHT = 0.25    # pull of the current duty hours, in vans' worth of evidence
+CHARGE_SLACK_W = 20         # net charging above the solar by more than this means another charger is on
+COLUMN_ALIASES = {
+    "time": ["time", "timestamp", "datetime", "date_time", "date"],
+    "solar_w": ["solar_w", "solar_power_w", "solar_power", "pv_power_w", "pv_power", "solar_input_w",
+                "solar_in_w", "pv_input_power_w", "pv_input_w"],
+    "load_w": ["load_w", "load_power_w", "load_power", "output_w", "total_output_w", "output_power_w",
+               "ac_output_w", "out_w"],
+    "net_w": ["net_w", "power_w", "power", "battery_power_w", "battery_power"],
+    "voltage": ["voltage_v", "voltage", "battery_voltage_v", "battery_voltage"],
+    "current": ["current_a", "current", "battery_current_a", "battery_current"],
+    "charger_w": ["charger_w", "charger_power_w", "charging_w", "alternator_w", "alternator_power_w",
+                  "dc_dc_w", "dcdc_w", "dc_dc_power_w", "dc_dc_output_w", "mains_charger_w"],
+}
+
+
+# --- Reading logs ---
+def _normalise(name):
+    return re.sub(r"[^a-z0-9]+", "_", str(name).lower()).strip("_")
+
+
+def log_columns(columns):
+    """Map the standard names in COLUMN_ALIASES to a log file's own column names."""
+    found = {_normalise(c): c for c in columns}
+    mapping = {}
+    for standard, aliases in COLUMN_ALIASES.items():
+        match = next((found[a] for a in aliases if a in found), None)
+        if match is not None:
+            mapping[standard] = match
+    has_load = "load_w" in mapping or "net_w" in mapping or {"voltage", "current"} <= set(mapping)
+    if "time" not in mapping or "solar_w" not in mapping or not has_load:
+        raise ValueError(f"needs time, solar power and load (or net battery) power columns; found {list(columns)}")
+    return mapping
+
+
+def _timestamps(values):
+    # Nanoseconds since the epoch from datetime strings, or from epoch seconds / milliseconds
+    if pd.api.types.is_numeric_dtype(values):
+        values = values.to_numpy(dtype=float)
+        return (values * (1e6 if np.nanmedian(values) > 1e11 else 1e9)).astype(np.int64)
+    times = pd.to_datetime(values, errors="coerce")
+    if times.dt.tz is not None:
+        times = times.dt.tz_localize(None)  # keep the van's local clock, so days split at its midnight
+    return times.to_numpy(dtype="datetime64[ns]").astype(np.int64)
+
+
+def _column(chunk, mapping, standard):
+    return pd.to_numeric(chunk[mapping[standard]], errors="coerce").to_numpy(dtype=float)
+
+
+def chunk_power(chunk, mapping):
+    """(times ns, solar W, load W) for one chunk of a log, rows with bad readings dropped.
+
+    In net-power mode the load is NaN where it can't be told apart from charging by an
+    alternator or mains charger the log doesn't record.
+    """
+    times = _timestamps(chunk[mapping["time"]])
+    solar = _column(chunk, mapping, "solar_w")
+    if "load_w" in mapping:
+        load = _column(chunk, mapping, "load_w")
+        valid = np.isfinite(load)
+    else:
+        if "net_w" in mapping:
+            net = _column(chunk, mapping, "net_w")
+        else:
+            net = _column(chunk, mapping, "voltage") * _column(chunk, mapping, "current")
+        valid = np.isfinite(net)
+        if "charger_w" in mapping:
+            charger = np.maximum(_column(chunk, mapping, "charger_w"), 0)
+            valid &= np.isfinite(charger)
+            load = np.maximum(solar + charger - net, 0)   # whatever came in that didn't reach the battery
+        else:
+            load = np.maximum(solar - net, 0)
+            load[net > np.maximum(solar, 0) + CHARGE_SLACK_W] = np.nan
+    keep = (times != np.iinfo(np.int64).min) & np.isfinite(solar) & valid
+    return times[keep], np.maximum(solar[keep], 0), load[keep]
+
+
+def daily_energy(path, chunksize=200_000):
+    """Daily solar and load Wh and hours covered for one log, as a DataFrame indexed by date.
+
+    Each sample's power is held until the next sample (gaps over MAX_GAP_S count as no
+    data) and the energy goes to the day the interval starts in. load_hours counts only
+    the time the load was known. The last sample of a chunk is carried into the next, so
+    chunk boundaries make no difference.
+    """
+    mapping, carry, parts = None, None, []
+    for chunk in read_chunks(path, chunksize):
+        mapping = mapping or log_columns(chunk.columns)
+        times, solar, load = chunk_power(chunk, mapping)
+        if carry is not None:
+            times, solar, load = (np.concatenate([[c], a]) for c, a in zip(carry, (times, solar, load)))
+        if len(times) < 2:
+            carry = (times[-1], solar[-1], load[-1]) if len(times) else carry
+            continue
+        order = np.argsort(times, kind="stable")
+        times, solar, load = times[order], solar[order], load[order]
+        seconds = np.diff(times) / 1e9
+        seconds[seconds > MAX_GAP_S] = 0
+        known = np.isfinite(load[:-1])
+        days, index = np.unique(times[:-1] // NS_PER_DAY, return_inverse=True)
+        parts.append(pd.DataFrame({
+            "day": days,
+            "solar_wh": np.bincount(index, solar[:-1] * seconds / 3600, len(days)),
+            "load_wh": np.bincount(index, np.where(known, load[:-1] * seconds, 0) / 3600, len(days)),
+            "hours": np.bincount(index, seconds / 3600, len(days)),
+            "load_hours": np.bincount(index, known * seconds / 3600, len(days)),
+        }))
+        carry = (times[-1], solar[-1], load[-1])
+    if not parts:
+        return pd.DataFrame(columns=["solar_wh", "load_wh", "hours", "load_hours"], index=pd.Index([], name="date"))
+    daily = pd.concat(parts).groupby("day").sum()
+    daily.index = pd.to_datetime(daily.index * NS_PER_DAY).date
+    daily.index.name = "date"
+    return daily
+
+
+# --- Model and calibration ---
+def model_predictions(configs, devices):
+    """Per (van_id, system): installed solar W, model solar Wh/day and model device usage Wh/day."""
+    configs = with_defaults(configs.copy()).set_index("van_id")
+    enabled = devices["enabled"].astype(bool) if "enabled" in devices else True
+    usage = (devices["watts"] * devices["hours"] * enabled).groupby(
+        [devices["van_id"], devices["system"].str.lower()]).sum()
+    rows = []
+    for van_id, config in configs.iterrows():
+        level = config["solar_level"]
+        sun_hours = solar_efficiency_map.get(level, level)
+        for system in ("renogy", "ecoflow"):
+            solar_w = float(config[f"{system}_solar"])
+            rows.append({"van_id": van_id, "system": system, "solar_w": solar_w,
+                         "model_solar_wh": solar_w * float(sun_hours),
+                         "model_load_wh": float(usage.get((van_id, system), 0.0))})
+    return pd.DataFrame(rows).set_index(["van_id", "system"])
+
+
+def fit_solar_levels(days):
+    """solar_efficiency_map fitted to measured peak-sun hours (solar Wh / installed W) per van-day.
+
+    Low, Medium and High become the typical day in the dullest, middle and brightest
+    third of all the logged days.
+    """
+    sun_hours = (days["solar_wh"] / days["solar_w"])[days["solar_w"] > 0]
+    if sun_hours.empty:
+        return dict(solar_efficiency_map)
+    return {level: round(float(np.quantile(sun_hours, q)), 2) for level, q in SUN_QUANTILES.items()}
+
+
+def fit_duty_hours(devices, actual_load):
+    """Per-appliance duty hours that best explain each van's measured daily load.
+
+    Least squares over vans (each van-system's mean daily Wh = sum of watts x hours of its
+    enabled devices, one shared duty figure per appliance name), pulled towards the
+    current hours by DUTY_PRIOR_WEIGHT so appliances seen in few vans stay near their
+    catalog figure. Van-systems with no measured load are left out. Results are clipped
+    to 0–24 h.
+    """
+    actual_load = actual_load.dropna()
+    devices = devices[devices["enabled"].astype(bool)] if "enabled" in devices else devices
+    rows = actual_load.index.get_indexer(pd.MultiIndex.from_arrays([devices["van_id"], devices["system"].str.lower()]))
+    devices, rows = devices[rows >= 0], rows[rows >= 0]
+    if devices.empty:
+        return {}
+    by_name = devices.groupby(devices["name"].astype(str))
+    names = list(by_name.groups)
+    A = np.zeros((len(actual_load), len(names)))
+    np.add.at(A, (rows, pd.Index(names).get_indexer(devices["name"].astype(str))), devices["watts"].to_numpy(dtype=float))
+    prior = by_name["hours"].mean().to_numpy(dtype=float)
+    scale = np.sqrt(DUTY_PRIOR_WEIGHT) * by_name["watts"].mean().to_numpy(dtype=float)
+    fitted, *_ = np.linalg.lstsq(np.vstack([A, np.diag(scale)]),
+                                 np.concatenate([actual_load.to_numpy(dtype=float), scale * prior]), rcond=None)
+    vans = by_name["van_id"].nunique()
+    return {name: {"model_hours": round(float(h0), 2), "fitted_hours": round(float(np.clip(h, 0, 24)), 2),
+                   "vans": int(vans[name])} for name, h0, h in zip(names, prior, fitted)}
+
+
+# --- Pipeline ---
+def replay(manifest_path, configs, devices, workers=None, chunksize=200_000, progress=sys.stderr):
+    """Reduce every log in the manifest to daily energy (one log per worker) and compare with the model.
+
+    Returns (per-day DataFrame of fully covered days, per van-system comparison DataFrame).
+    """
+    manifest = pd.read_csv(manifest_path)
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    manifest["path"] = [p if os.path.isabs(p) else os.path.join(base, p) for p in manifest["path"]]
+    manifest["system"] = manifest["system"].str.lower()
+
+    parts, started = [], time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(daily_energy, row.path, chunksize): row for row in manifest.itertuples()}
+        for done, future in enumerate(as_completed(futures), 1):
+            row = futures[future]
+            try:
+                daily = future.result()
+            except (OSError, ValueError) as e:
+                print(f"Skipping {row.path}: {e}", file=progress, flush=True)
+                continue
+            parts.append(daily.reset_index().assign(van_id=row.van_id, system=row.system))
+            print(f"{done}/{len(manifest)} logs replayed in {time.perf_counter() - started:.1f}s",
+                  file=progress, flush=True)
+
+    days = pd.concat(parts) if parts else pd.DataFrame(columns=["date", "solar_wh", "load_wh", "hours",
+                                                                 "load_hours", "van_id", "system"])
+    # Logs for the same van and system (e.g. consecutive exports) add up per day
+    days = days.groupby(["van_id", "system", "date"]).sum()
+    days = days[days["hours"] >= 24 * MIN_COVERAGE]
+    # Load known for only part of a day (the rest spent charging off the alternator or mains)
+    # is scaled up to the hours covered; days with too little of it have no load figure
+    load_hours = days["load_hours"].where(days["load_hours"] >= 24 * MIN_COVERAGE)
+    days["load_wh"] = days["load_wh"] * days["hours"] / load_hours
+
+    model = model_predictions(configs, devices)
+    actual = days.groupby(level=["van_id", "system"]).agg(
+        days=("hours", "size"), load_days=("load_wh", "count"),
+        actual_solar_wh=("solar_wh", "mean"), actual_load_wh=("load_wh", "mean"))
+    comparison = actual.join(model, how="left")
+    # No error percentage against a measured zero (a bank with nothing on it, or panels in the dark)
+    comparison["load_error_pct"] = 100 * (comparison["model_load_wh"] / comparison["actual_load_wh"].where(
+        comparison["actual_load_wh"] > 0) - 1)
+    comparison["solar_error_pct"] = 100 * (comparison["model_solar_wh"] / comparison["actual_solar_wh"].where(
+        comparison["actual_solar_wh"] > 0) - 1)
+    days = days.join(model["solar_w"])
+    return days, comparison
+
+
+def calibrate(days, comparison, devices):
+    return {
+        "solar_efficiency_map": fit_solar_levels(days),
+        "duty_hours": fit_duty_hours(devices, comparison["actual_load_wh"]),
+        "vans": int(comparison.index.get_level_values("van_id").nunique()),
+        "days": int(len(days)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay van telemetry logs and calibrate the Alfred power model.")
+    parser.add_argument("manifest", help="CSV of log files: path, van_id, system")
+    parser.add_argument("--configs", required=True, help="CSV or Parquet van configurations (batch_cli format)")
+    parser.add_argument("--devices", required=True, help="CSV or Parquet device lists with a name column")
+    parser.add_argument("-o", "--output", help="per-van comparison CSV (default: stdout)")
+    parser.add_argument("--calibration", help="write fitted solar levels and duty hours to this JSON file")
+    parser.add_argument("--workers", type=int, default=None, help="log files replayed at once (default: one per CPU)")
+    parser.add_argument("--chunksize", type=int, default=200_000, help="log rows read per chunk")
+    args = parser.parse_args(argv)
+
+    configs = pd.concat(read_chunks(args.configs, args.chunksize))
+    devices = pd.concat(read_chunks(args.devices, args.chunksize))
+    days, comparison = replay(args.manifest, configs, devices, args.workers, args.chunksize)
+    comparison.round(2).to_csv(args.output or sys.stdout)
+
+    calibration = calibrate(days, comparison, devices)
+    if args.calibration:
+        with open(args.calibration, "w") as f:
+            json.dump(calibration, f, indent=2)
+    print(f"{calibration['days']} van-days from {calibration['vans']} vans; "
+          f"fitted solar levels {calibration['solar_efficiency_map']}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
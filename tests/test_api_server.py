@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from api_server import HTTPError, config_row, evaluate_rows, read_request
+from device_catalog import load_catalog
+
+PRESETS = {system: load_catalog().presets(system) for system in ("renogy", "ecoflow")}
+
+
+@pytest.mark.parametrize("level, hours", [("Medium", 3.5), ("4.5", 4.5), (4.5, 4.5), (2, 2.0)])
+def test_solar_level_parsed_like_batch_cli(level, hours):
+    assert config_row({"solar_level": level}, PRESETS)["solar_level"] == hours
+
+
+def test_unknown_solar_level_is_rejected():
+    with pytest.raises(ValueError, match="'Sunny'"):
+        config_row({"solar_level": "Sunny"}, PRESETS)
+
+
+def test_numeric_string_solar_level_gives_the_numeric_result():
+    as_text, as_number = evaluate_rows([config_row({"solar_level": level}, PRESETS) for level in ("4.5", 4.5)], 0)
+    assert as_text == as_number
+
+
+def _request(raw):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(raw)
+        reader.feed_eof()
+        return await read_request(reader)
+    return asyncio.run(read())
+
+
+@pytest.mark.parametrize("length", ["abc", "-5", "1.5"])
+def test_bad_content_length_is_a_bad_request(length):
+    with pytest.raises(HTTPError) as error:
+        _request(f"POST /calculate HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode())
+    assert error.value.status == 400
+
+
+def test_request_body_read_to_its_length():
+    assert _request(b"POST /calculate HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}") == (
+        "POST", "/calculate", {"content-length": "2"}, b"{}")
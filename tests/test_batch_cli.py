@@ -0,0 +1,85 @@
+import io
+
+import pandas as pd
+import pytest
+
+import batch_cli
+
+
+def _write(path, rows):
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+
+def test_mixed_solar_levels(tmp_path):
+    configs = _write(tmp_path / "vans.csv", [
+        {"van_id": "A", "solar_level": "Medium"},
+        {"van_id": "B", "solar_level": "4.5"},
+        {"van_id": "C", "solar_level": "High"},
+    ])
+    out = io.StringIO()
+    assert batch_cli.run(configs, None, out, simulate=False, progress=io.StringIO()) == 3
+    result = pd.read_csv(io.StringIO(out.getvalue())).set_index("van_id")
+    # renogy 360 W and ecoflow 400 W of panels, plus half an hour of 480 W driving
+    assert result["total_input"].to_dict() == {"A": 760 * 3.5 + 240, "B": 760 * 4.5 + 240, "C": 760 * 5.5 + 240}
+
+
+def test_device_rows_follow_the_configuration_order(tmp_path):
+    configs = _write(tmp_path / "vans.csv", [{"van_id": "A"}, {"van_id": "B"}])
+    devices = _write(tmp_path / "devices.csv", [
+        {"van_id": "A", "system": "renogy", "watts": 45, "hours": 24},
+        {"van_id": "B", "system": "ecoflow", "watts": 800, "hours": 1},
+        {"van_id": "B", "system": "renogy", "watts": 60, "hours": 2},
+    ])
+    out = io.StringIO()
+    batch_cli.run(configs, devices, out, simulate=False, progress=io.StringIO())
+    result = pd.read_csv(io.StringIO(out.getvalue())).set_index("van_id")
+    assert result["renogy_usage"].to_dict() == {"A": 1080, "B": 120}
+    assert result["ecoflow_usage"].to_dict() == {"A": 0, "B": 800}
+
+
+@pytest.mark.parametrize("chunksize", [1, 50_000])
+def test_out_of_order_devices_leave_no_output(tmp_path, chunksize):
+    configs = _write(tmp_path / "vans.csv", [{"van_id": "A"}, {"van_id": "B"}, {"van_id": "C"}])
+    devices = _write(tmp_path / "devices.csv", [
+        {"van_id": "B", "system": "renogy", "watts": 45, "hours": 24},
+        {"van_id": "A", "system": "renogy", "watts": 60, "hours": 2},
+    ])
+    output = tmp_path / "results.csv"
+    output.write_text("previous results\n")
+    with pytest.raises(SystemExit, match="'A'"):
+        batch_cli.main([configs, "--devices", devices, "-o", str(output), "--quick",
+                        "--chunksize", str(chunksize)])
+    assert output.read_text() == "previous results\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["devices.csv", "results.csv", "vans.csv"]
+
+
+def test_output_is_written_on_success(tmp_path):
+    configs = _write(tmp_path / "vans.csv", [{"van_id": "A"}, {"van_id": "B"}])
+    output = tmp_path / "results.csv"
+    batch_cli.main([configs, "-o", str(output), "--quick"])
+    assert list(pd.read_csv(output)["van_id"]) == ["A", "B"]
+    assert not (tmp_path / "results.csv.partial").exists()
+
+
+@pytest.mark.parametrize("chunksize", [2, 50_000])
+def test_split_device_rows_are_rejected(tmp_path, chunksize):
+    configs = _write(tmp_path / "vans.csv", [{"van_id": "A"}, {"van_id": "B"}])
+    devices = _write(tmp_path / "devices.csv", [
+        {"van_id": "A", "system": "renogy", "watts": 45, "hours": 24},
+        {"van_id": "B", "system": "renogy", "watts": 60, "hours": 2},
+        {"van_id": "A", "system": "ecoflow", "watts": 800, "hours": 1},
+    ])
+    with pytest.raises(SystemExit, match="'A'"):
+        batch_cli.run(configs, devices, io.StringIO(), chunksize, simulate=False, progress=io.StringIO())
+
+
+def test_unmatched_devices_print_nothing(tmp_path, capsys):
+    configs = _write(tmp_path / "vans.csv", [{"van_id": "A"}, {"van_id": "B"}, {"van_id": "C"}])
+    devices = _write(tmp_path / "devices.csv", [
+        {"van_id": "A", "system": "renogy", "watts": 45, "hours": 24},
+        {"van_id": "X", "system": "renogy", "watts": 60, "hours": 2},
+    ])
+    with pytest.raises(SystemExit, match="'X'"):
+        batch_cli.main([configs, "--devices", devices, "--quick", "--chunksize", "1"])
+    assert capsys.readouterr().out == ""
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+import cross_charge
+from cross_charge import POLICIES, _coupled_kernel, _scalar_kernel, simulate_coupled
+from soc_simulation import days_until_flat, simulate_year
+
+
+def _fleet(configs=60):
+    rng = np.random.default_rng(3)
+    return {
+        "renogy_wh": rng.choice([0.0, 2560.0, 5120.0, 7680.0], configs),
+        "ecoflow_wh": rng.choice([0.0, 3600.0, 7200.0], configs),
+        "renogy_input": rng.uniform(0, 2500, configs),
+        "alternator_input": rng.uniform(0, 600, configs),
+        "ecoflow_input": rng.uniform(0, 2000, configs),
+        "renogy_usage": rng.uniform(200, 3000, configs),
+        "ecoflow_usage": rng.uniform(200, 3000, configs),
+    }, rng.uniform(0, 3, configs)
+
+
+def test_vector_and_scalar_kernels_agree(monkeypatch):
+    budget, drive_hours = _fleet()
+    monkeypatch.setattr(cross_charge, "SCALAR_MAX_COLUMNS", 0)
+    vector = simulate_coupled(budget, drive_hours, days=120)
+    monkeypatch.setattr(cross_charge, "SCALAR_MAX_COLUMNS", 10 ** 9)
+    scalar = simulate_coupled(budget, drive_hours, days=120)
+    np.testing.assert_array_equal(vector["first_empty_hour"], scalar["first_empty_hour"])
+    np.testing.assert_array_equal(vector["days"], scalar["days"])
+    np.testing.assert_allclose(vector["moved_wh_per_day"], scalar["moved_wh_per_day"], rtol=1e-9, atol=1e-6)
+    np.testing.assert_array_equal(vector["best"], scalar["best"])
+
+
+def test_off_policy_matches_independent_banks():
+    budget, drive_hours = _fleet(20)
+    coupled = simulate_coupled(budget, drive_hours, days=120, policies=("off",))
+    independent = simulate_year(budget, drive_hours, days=120, keep_trajectory=False)
+    capacity = np.stack([budget["renogy_wh"], budget["ecoflow_wh"]], axis=-1)
+    np.testing.assert_array_equal(coupled["days"][:, 0], days_until_flat(capacity, independent["first_empty_hour"]))
+    assert not coupled["moved_wh_per_day"].any()
+
+
+def test_priority_never_shortens_endurance():
+    budget, drive_hours = _fleet(20)
+    days = simulate_coupled(budget, drive_hours, days=120)["days"]
+    assert (days.max(axis=1) >= days[:, 0]).all()
+
+
+def test_kernels_agree_on_trajectories(monkeypatch):
+    budget, drive_hours = _fleet(8)
+    results = []
+    for columns in (0, 10 ** 9):
+        monkeypatch.setattr(cross_charge, "SCALAR_MAX_COLUMNS", columns)
+        results.append(simulate_coupled(budget, drive_hours, days=10, keep_trajectory=True))
+    vector, scalar = results
+    np.testing.assert_allclose(vector["soc"], scalar["soc"], atol=1e-6)
+    np.testing.assert_array_equal(vector["first_empty_hour"], scalar["first_empty_hour"])
+    np.testing.assert_allclose(vector["moved_wh_per_day"], scalar["moved_wh_per_day"], rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_kernels_agree_with_banks_switched_off(seed):
+    # Heavy loads run every enabled bank flat early, so the vector kernel stops before the
+    # horizon while pairs with no enabled bank are still in the fleet
+    rng = np.random.default_rng(seed)
+    configs = 6
+    capacity = rng.choice([0.0, 1200.0, 2400.0], (configs, 2))
+    capacity[0] = [2400.0, 2400.0]
+    capacity[1] = [0.0, 0.0]
+    net = rng.normal(-250, 300, (24 * 30, configs, 2))
+    soc0 = capacity * rng.uniform(0, 1, capacity.shape)
+    active, start, stop = (np.array(values) for values in zip(*POLICIES.values()))
+    args = capacity, net, soc0, active, start.astype(float), stop.astype(float), 360.0, 0.87
+    vector, scalar = _coupled_kernel(*args), _scalar_kernel(*args)
+    np.testing.assert_array_equal(vector[0], scalar[0])
+    np.testing.assert_allclose(vector[1] / vector[2], scalar[1] / scalar[2], rtol=1e-9, atol=1e-9)
+    assert not vector[1][1].any()
@@ -0,0 +1,19 @@
+import pytest
+
+from device_list import Device
+
+FRIDGE = Device("Fridge", 45, 24.0)
+
+
+def test_fields_read_like_a_dict():
+    assert FRIDGE["watts"] == 45
+    assert FRIDGE.get("schedule") == ""
+    assert FRIDGE[0] == "Fridge"
+
+
+@pytest.mark.parametrize("key", ["count", "index", "_asdict", "missing"])
+def test_only_fields_are_keys(key):
+    with pytest.raises(KeyError):
+        FRIDGE[key]
+    assert FRIDGE.get(key) is None
+    assert FRIDGE.get(key, 0) == 0
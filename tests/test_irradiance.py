@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from irradiance import HOURS, IrradianceDataset, _distance_km, write_dataset
+
+
+def _dataset(tmp_path, coords, cell_deg=None):
+    points = {(lat, lon): (np.zeros(HOURS), np.ones(HOURS)) for lat, lon in coords}
+    path = tmp_path / "irradiance.bin"
+    write_dataset(path, points, cell_deg=cell_deg)
+    return IrradianceDataset(path)
+
+
+def _brute_force(dataset, lat, lon):
+    km = _distance_km(lat, lon, dataset.lat, dataset.lon)
+    return int(km.argmin()), float(km.min())
+
+
+def test_nearest_sees_past_the_first_ring_hit(tmp_path):
+    # The point in the query's own cell is 251 km away; a closer one sits two rings east,
+    # where a longitude degree is only about 0.6 of a latitude degree
+    dataset = _dataset(tmp_path, [(50, -6), (58, 2), (55.98, -0.02), (54.02, -4.05)], cell_deg=2.0)
+    point, km = dataset.nearest(54.02, -1.98)
+    assert (point, km) == pytest.approx(_brute_force(dataset, 54.02, -1.98))
+    assert km < 140
+
+
+@pytest.mark.parametrize("cell_deg", [None, 0.5, 2.0])
+def test_nearest_matches_brute_force(tmp_path, cell_deg):
+    rng = np.random.default_rng(7)
+    coords = np.column_stack([rng.uniform(49.9, 58.7, 300), rng.uniform(-7.5, 1.8, 300)])
+    dataset = _dataset(tmp_path, [tuple(c) for c in coords], cell_deg)
+    for lat, lon in np.column_stack([rng.uniform(48, 60, 200), rng.uniform(-10, 4, 200)]):
+        assert dataset.nearest(lat, lon) == pytest.approx(_brute_force(dataset, lat, lon))
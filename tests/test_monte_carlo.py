@@ -0,0 +1,27 @@
+import numpy as np
+
+import monte_carlo
+from monte_carlo import monte_carlo_endurance, weather_pool
+from power_engine import power_budget
+
+BUDGET = power_budget(3, 360, 400, "Low", 0.5, np.array([45.0, 800.0]), np.array([24.0, 2.0]),
+                      np.array([1500.0]), np.array([0.3]))
+
+
+def test_shared_pool_gives_the_in_process_samples():
+    runs = monte_carlo.IN_PROCESS_MAX_RUNS
+    in_process = monte_carlo_endurance(BUDGET, 0.5, runs=runs, days=30, workers=1, policy="threshold")
+    pool = weather_pool(2)
+    try:
+        for _ in range(2):  # the pool outlives each call
+            pooled = monte_carlo_endurance(BUDGET, 0.5, runs=runs, days=30, workers=2, policy="threshold", pool=pool)
+            np.testing.assert_array_equal(pooled["samples"], in_process["samples"])
+    finally:
+        pool.shutdown()
+
+
+def test_small_runs_stay_in_process(monkeypatch):
+    monkeypatch.setattr(monte_carlo, "ProcessPoolExecutor", None)
+    result = monte_carlo_endurance(BUDGET, 0.5, runs=monte_carlo.IN_PROCESS_MAX_RUNS - 1, days=30, workers=4,
+                                   policy="off")
+    assert len(result["samples"]) == monte_carlo.IN_PROCESS_MAX_RUNS - 1
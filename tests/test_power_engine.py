@@ -0,0 +1,92 @@
+import math
+
+import numpy as np
+import pytest
+
+from power_engine import device_matrix, power_budget, solar_efficiency_map, solar_hours_for
+
+
+def _baseline(batteries, renogy_solar, ecoflow_solar, solar_level, drive_hours, renogy_devices, ecoflow_devices,
+              show_renogy, show_ecoflow):
+    # The daily budget as the original App.py worked it out, one van at a time
+    solar_hours = solar_efficiency_map.get(solar_level, solar_level)
+    if show_renogy:
+        renogy_wh = batteries * 200 * 12
+        renogy_input = renogy_solar * solar_hours + 480 * drive_hours
+    else:
+        renogy_wh, renogy_input = 0, 0
+    if show_ecoflow:
+        ecoflow_wh, ecoflow_input = 3600, ecoflow_solar * solar_hours
+    else:
+        ecoflow_wh, ecoflow_input = 0, 0
+    renogy_usage = sum(d["watts"] * d["hours"] for d in renogy_devices if d.get("enabled", True))
+    ecoflow_usage = sum(d["watts"] * d["hours"] for d in ecoflow_devices if d.get("enabled", True))
+    total_capacity = renogy_wh + ecoflow_wh
+    total_input = renogy_input + ecoflow_input
+    total_usage = renogy_usage + ecoflow_usage
+    days = math.inf if total_usage <= total_input else total_capacity / (total_usage - total_input)
+    return {
+        "total_capacity": total_capacity,
+        "total_input": total_input,
+        "total_usage": total_usage,
+        "net_balance": total_input - total_usage,
+        "days": days,
+        "ev_recharge_hours": max(0, ecoflow_wh - ecoflow_input) / 7000,
+    }
+
+
+def _devices(rng):
+    return [{"watts": float(rng.integers(5, 1500)), "hours": float(rng.integers(0, 48)) / 2,
+             "enabled": bool(rng.random() < 0.8)} for _ in range(rng.integers(0, 8))]
+
+
+def test_fleet_matches_scalar_baseline():
+    rng = np.random.default_rng(1)
+    levels = [*solar_efficiency_map, 0.0, 2.25, 6.0]
+    vans = [{
+        "batteries": int(rng.integers(1, 5)),
+        "renogy_solar": float(rng.integers(0, 80) * 10),
+        "ecoflow_solar": float(rng.integers(0, 80) * 10),
+        "solar_level": levels[rng.integers(len(levels))],
+        "drive_hours": float(rng.integers(0, 51)) / 10,
+        "renogy_devices": _devices(rng),
+        "ecoflow_devices": _devices(rng),
+        "show_renogy": bool(rng.random() < 0.85),
+        "show_ecoflow": bool(rng.random() < 0.85),
+    } for _ in range(300)]
+
+    column = lambda name: np.array([van[name] for van in vans])
+    renogy_watts, renogy_hours = device_matrix([van["renogy_devices"] for van in vans])
+    ecoflow_watts, ecoflow_hours = device_matrix([van["ecoflow_devices"] for van in vans])
+    budget = power_budget(
+        column("batteries"), column("renogy_solar"), column("ecoflow_solar"),
+        np.array([van["solar_level"] for van in vans], dtype=object), column("drive_hours"),
+        renogy_watts, renogy_hours, ecoflow_watts, ecoflow_hours,
+        renogy_enabled=column("show_renogy"), ecoflow_enabled=column("show_ecoflow"),
+    )
+
+    for i, van in enumerate(vans):
+        expected = _baseline(**van)
+        for name, value in expected.items():
+            assert budget[name][i] == pytest.approx(value), (i, name)
+
+
+def test_single_van_matches_scalar_baseline():
+    renogy = [{"watts": 45, "hours": 24}, {"watts": 60, "hours": 3, "enabled": False}]
+    ecoflow = [{"watts": 800, "hours": 1.5}]
+    budget = power_budget(3, 360, 400, "Low", 0.5, *device_matrix([renogy])[0:2], *device_matrix([ecoflow])[0:2])
+    expected = _baseline(3, 360, 400, "Low", 0.5, renogy, ecoflow, True, True)
+    for name, value in expected.items():
+        assert float(np.squeeze(budget[name])) == pytest.approx(value), name
+
+
+def test_solar_levels_mix_names_and_numbers():
+    levels = np.array(["Medium", "4.5", " 2 ", "High", "Low"], dtype=object)
+    np.testing.assert_array_equal(solar_hours_for(levels), [3.5, 4.5, 2.0, 5.5, 1.5])
+    np.testing.assert_array_equal(solar_hours_for(np.array(["Low", 3.0], dtype=object)), [1.5, 3.0])
+    np.testing.assert_array_equal(solar_hours_for([1, 2.5]), [1.0, 2.5])
+
+
+def test_unknown_solar_level_names_the_value():
+    with pytest.raises(ValueError, match="'Sunny'"):
+        solar_hours_for(["Medium", "Sunny"])
@@ -0,0 +1,79 @@
+import threading
+
+import pandas as pd
+
+import profiling
+
+
+def _pandas_init():
+    return pd.DataFrame.__init__.__module__ == "pandas.core.frame"
+
+
+def _last(name):
+    return next(row for row in profiling.summary() if row["section"] == name)
+
+
+def test_dataframes_counted_only_inside_sections():
+    assert _pandas_init()
+    pd.DataFrame({"x": [1]})
+    with profiling.section("test_outer"):
+        pd.DataFrame({"x": [1]})
+        with profiling.section("test_inner"):
+            pd.DataFrame({"x": [1]})
+            pd.DataFrame({"x": [2]})
+    assert _pandas_init()
+    assert _last("test_inner")["dataframes"] == 2
+    assert _last("test_outer")["dataframes"] == 3
+
+
+def test_other_threads_are_not_counted():
+    inside, done = threading.Event(), threading.Event()
+
+    def other_session():
+        inside.wait(5)
+        for _ in range(5):
+            pd.DataFrame({"x": [1]})
+        done.set()
+
+    thread = threading.Thread(target=other_session)
+    thread.start()
+    with profiling.section("test_threads"):
+        inside.set()
+        done.wait(5)
+        pd.DataFrame({"x": [1]})
+    thread.join(5)
+    assert _last("test_threads")["dataframes"] == 1
+    assert _pandas_init()
+
+
+def test_run_stopped_early_does_not_leave_pandas_patched():
+    profiling.start_run()
+    pd.DataFrame({"x": [1]})
+    profiling.start_run()   # the previous run stopped before reaching finish_run()
+    pd.DataFrame({"x": [1]})
+    pd.DataFrame({"x": [2]})
+    profiling.finish_run()
+    assert _last("run")["dataframes"] == 2
+    assert _pandas_init()
+
+
+def test_section_restores_pandas_after_an_error():
+    try:
+        with profiling.section("test_error"):
+            raise ValueError
+    except ValueError:
+        pass
+    assert _pandas_init()
+
+
+def test_thread_that_died_mid_run_does_not_leave_pandas_patched():
+    thread = threading.Thread(target=profiling.start_run)
+    thread.start()
+    thread.join()
+    pd.DataFrame({"x": [1]})
+    assert _pandas_init()
+    assert not profiling._active
+    with profiling.section("test_after_dead_thread"):
+        pd.DataFrame({"x": [1]})
+    assert _last("test_after_dead_thread")["dataframes"] == 1
+    assert _pandas_init()
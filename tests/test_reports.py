@@ -0,0 +1,96 @@
+import threading
+
+import numpy as np
+import pytest
+
+from device_list import Device
+from reports import ReportQueue, build_report
+from result_cache import ResultCache
+
+CONFIG = {"renogy_batteries": 3, "renogy_solar": 360, "drive_hours": 0.5, "show_renogy": True,
+          "ecoflow_solar": 400, "show_ecoflow": True, "solar_hours": 3.5, "dc_dc_limit": 480,
+          "inverter_limit": 3600}
+DEVICES = {"Renogy": [Device("Fridge", 45, 24.0)], "EcoFlow": [Device("Kettle", 1500, 0.2, True, "07:00")]}
+RESULTS = {
+    "budget": {k: np.array(float(v)) for k, v in {
+        "renogy_wh": 7200, "ecoflow_wh": 3600, "total_capacity": 10800, "total_usage": 1380, "total_input": 2900,
+        "net_balance": 1520, "renogy_input": 1500, "ecoflow_input": 1400, "renogy_usage": 1080,
+        "ecoflow_usage": 300}.items()},
+    "endurance": {"first_empty": [-1, -1], "policy": "off", "days": {"off": float("inf")}},
+    "weather": None,
+}
+COMPONENTS = [{"name": "Orion", "desc": "Cross-charger", "fuse": "30A", "wire": "6mm²", "placement": "Under seat"}]
+
+
+def test_finished_report_served_from_the_cache(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    data = ReportQueue(workers=1, cache=cache).submit("key", build_report, "html", CONFIG, DEVICES, RESULTS,
+                                                      COMPONENTS).result(5)
+
+    def build(progress):
+        raise AssertionError("a cached report was built again")
+
+    # A fresh queue, as after a restart or in another process, finds it in the shared cache
+    job = ReportQueue(workers=1, cache=cache).submit("key", build)
+    assert job.done()
+    assert job.result(0) == data
+
+
+def test_concurrent_submissions_share_one_job(monkeypatch):
+    queue = ReportQueue(workers=2)
+    sessions = 8
+    # Every session looks the key up before any of them queues it
+    looked_up = threading.Barrier(sessions)
+    lookup = queue.job
+    monkeypatch.setattr(queue, "job", lambda key: (lookup(key), looked_up.wait())[0])
+
+    calls, release = [], threading.Event()
+
+    def build(progress):
+        calls.append(1)
+        release.wait(5)
+        return b"report"
+
+    jobs = [None] * sessions
+
+    def session(i):
+        jobs[i] = queue.submit("key", build)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    release.set()
+    assert all(job is jobs[0] for job in jobs)
+    assert jobs[0].result(5) == b"report"
+    assert len(calls) == 1
+
+
+def test_failed_job_runs_again(tmp_path):
+    queue = ReportQueue(workers=1, cache=ResultCache(str(tmp_path / "results.sqlite")))
+    attempts = []
+
+    def build(progress):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError("no devices")
+        return b"report"
+
+    failed = queue.submit("key", build)
+    with pytest.raises(RuntimeError, match="no devices"):
+        failed.result(5)
+    assert queue.submit("key", build).result(5) == b"report"
+    assert queue.submit("key", build).result(5) == b"report"
+    assert len(attempts) == 2
+
+
+def test_submit_refuses_past_the_pending_limit():
+    queue = ReportQueue(workers=1, max_pending=1)
+    release = threading.Event()
+    build = lambda progress: release.wait(5) and b"report"
+    queue.submit("a", build)
+    queue.submit("b", build)
+    with pytest.raises(RuntimeError, match="Too many reports"):
+        queue.submit("c", build)
+    release.set()
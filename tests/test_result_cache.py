@@ -0,0 +1,89 @@
+import os
+import pickle
+import stat
+
+import numpy as np
+import pytest
+
+from result_cache import ResultCache, content_key, decode, encode
+
+
+def test_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache" / "results.sqlite"))
+    value = {
+        "budget": {"renogy_wh": np.array([7680.0]), "net_balance": np.float64(-120.5)},
+        "endurance": {"policy": "priority", "first_empty": np.array([93, -1]),
+                      "days": {"off": 1.5, "priority": float("inf")}},
+        "peaks": {"Renogy": {"over_limit": [(0, 30)], "at_peak": ["Fridge"]}, "EcoFlow": "bad schedule"},
+        "report": b"%PDF-1.4 ...",
+        "weather": None,
+    }
+    key = content_key("summary", {"batteries": 3})
+    assert cache.get(key) is None
+    cache.put(key, value)
+    got = cache.get(key)
+    np.testing.assert_array_equal(got["budget"]["renogy_wh"], [7680.0])
+    np.testing.assert_array_equal(got["endurance"]["first_empty"], [93, -1])
+    assert got["endurance"]["days"] == {"off": 1.5, "priority": float("inf")}
+    assert got["budget"]["net_balance"] == -120.5
+    assert got["peaks"] == {"Renogy": {"over_limit": [[0, 30]], "at_peak": ["Fridge"]}, "EcoFlow": "bad schedule"}
+    assert got["report"] == b"%PDF-1.4 ..."
+    assert got["weather"] is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_get_or_compute_only_computes_once(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    calls = []
+    for _ in range(3):
+        assert cache.get_or_compute("k", lambda: calls.append(1) or {"x": 1}) == {"x": 1}
+    assert len(calls) == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    blob = np.zeros(20_000, dtype=np.uint8)
+    cache = ResultCache(str(tmp_path / "results.sqlite"), max_bytes=3 * len(encode(blob)) + 100)
+    for key in "abc":
+        cache.put(key, blob)
+    cache.get("a")
+    cache.put("d", blob)
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in "acd")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_file_is_private(tmp_path):
+    path = tmp_path / "alfred" / "results.sqlite"
+    ResultCache(str(path)).put("k", 1)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(path.parent).st_mode) == 0o700
+
+
+def test_planted_pickle_is_not_loaded(tmp_path):
+    class Boom:
+        def __reduce__(self):
+            return (os.system, ("touch " + str(tmp_path / "pwned"),))
+
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    cache.put("k", 1)
+    blob = pickle.dumps(Boom())
+    cache._db().execute("UPDATE entries SET value = ?, size = ? WHERE key = 'k'", (blob, len(blob)))
+    assert cache.get("k") is None
+    assert not (tmp_path / "pwned").exists()
+
+
+@pytest.mark.parametrize("value", [object(), {1: "int key"}, np.array([None, 1], dtype=object)])
+def test_unsupported_values_are_not_stored(tmp_path, value):
+    with pytest.raises(TypeError):
+        encode(value)
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    cache.put("k", value)
+    assert cache.get("k") is None
+
+
+def test_decode_inverts_encode():
+    value = {"a": [1, 2.5, "x", None, True], "b": np.arange(6).reshape(2, 3)}
+    got = decode(encode(value))
+    assert got["a"] == [1, 2.5, "x", None, True]
+    np.testing.assert_array_equal(got["b"], value["b"])
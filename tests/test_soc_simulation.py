@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+import soc_simulation
+from power_engine import power_budget
+from soc_simulation import _loop_kernel, _scan_kernel, simulate_soc, simulate_year
+
+
+def _flows(rng, hours, banks):
+    capacity = rng.choice([0.0, 1200.0, 3600.0, 7200.0], banks)
+    net = rng.normal(-40, 400, (hours, banks))
+    soc0 = capacity * rng.uniform(0, 1, banks)
+    return capacity, net, soc0
+
+
+def _reference(capacity, net, soc0):
+    # One bank, one hour at a time, in plain Python
+    level, soc, first_empty, curtailed, unmet = soc0, [], -1, 0.0, 0.0
+    for t, flow in enumerate(net):
+        level += flow
+        if level < -1e-9 and first_empty < 0:
+            first_empty = t
+        curtailed += max(level - capacity, 0)
+        unmet += max(-level, 0)
+        level = min(max(level, 0), capacity)
+        soc.append(level)
+    return np.array(soc), first_empty, curtailed, unmet
+
+
+@pytest.mark.parametrize("hours", [1, 2, 3, 24, 100, 8760])
+def test_scan_kernel_matches_loop_kernel(hours):
+    rng = np.random.default_rng(hours)
+    capacity, net, soc0 = _flows(rng, hours, 12)
+    np.testing.assert_allclose(_scan_kernel(capacity, net, soc0), _loop_kernel(capacity, net, soc0), atol=1e-6)
+
+
+@pytest.mark.parametrize("scan_max_columns", [0, 10 ** 9])
+def test_simulate_soc_matches_hour_by_hour_reference(monkeypatch, scan_max_columns):
+    monkeypatch.setattr(soc_simulation, "SCAN_MAX_COLUMNS", scan_max_columns)
+    rng = np.random.default_rng(7)
+    capacity, net, soc0 = _flows(rng, 24 * 30, 20)
+    result = simulate_soc(capacity, net, soc0)
+    for bank in range(len(capacity)):
+        soc, first_empty, curtailed, unmet = _reference(capacity[bank], net[:, bank], soc0[bank])
+        np.testing.assert_allclose(result["soc"][:, bank], soc, atol=1e-6)
+        assert result["first_empty_hour"][bank] == first_empty
+        assert result["curtailed_wh"][bank] == pytest.approx(curtailed, abs=1e-6)
+        assert result["unmet_wh"][bank] == pytest.approx(unmet, abs=1e-6)
+    np.testing.assert_array_equal(result["final_soc"], result["soc"][-1])
+
+
+def test_simulate_year_chunks_make_no_difference(monkeypatch):
+    rng = np.random.default_rng(11)
+    n = 40
+    budget = power_budget(rng.integers(1, 5, n), 360, 400, rng.choice(["Low", "Medium", "High"], n), 0.5,
+                          rng.uniform(1, 100, (n, 12)), rng.uniform(0, 10, (n, 12)),
+                          rng.uniform(100, 1800, (n, 6)), rng.uniform(0, 1, (n, 6)))
+    whole = simulate_year(budget, 0.5, days=30, start_day=300)
+    monkeypatch.setattr(soc_simulation, "CHUNK_ELEMENTS", 30 * 24 * 2 * 7)
+    chunked = simulate_year(budget, 0.5, days=30, start_day=300)
+    for key, value in whole.items():
+        np.testing.assert_allclose(chunked[key], value, err_msg=key)
@@ -0,0 +1,123 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import telemetry
+
+DAYS = 3
+FRIDGE_W = 50               # on all day
+HEATER_W = 800              # 19:00–21:00
+ALTERNATOR_W = 480          # 10:00–11:00, driving
+
+
+def _log(charger_column=True, load_scale=1.0):
+    # One sample a minute over DAYS whole days, plus the midnight closing the last one
+    times = pd.date_range("2026-03-01", periods=DAYS * 1440 + 1, freq="min")
+    hour = (times.hour + times.minute / 60).to_numpy()
+    solar = np.round(300 * np.clip(np.sin(np.pi * (hour - 6) / 12), 0, None), 3)
+    load = load_scale * (FRIDGE_W + HEATER_W * ((hour >= 19) & (hour < 21)))
+    alternator = ALTERNATOR_W * ((hour >= 10) & (hour < 11))
+    log = pd.DataFrame({"Time": times.strftime("%Y-%m-%d %H:%M:%S"), "Solar Power (W)": solar,
+                        "Battery Power (W)": solar + alternator - load})
+    if charger_column:
+        log["DC-DC Power (W)"] = alternator
+    return log
+
+
+def _daily(log, tmp_path, chunksize=1000):
+    path = tmp_path / "log.csv"
+    log.to_csv(path, index=False)
+    return telemetry.daily_energy(str(path), chunksize)
+
+
+def test_charger_column_is_added_back_to_the_load(tmp_path):
+    daily = _daily(_log(charger_column=True), tmp_path)
+    assert len(daily) == DAYS
+    np.testing.assert_allclose(daily["load_wh"], FRIDGE_W * 24 + HEATER_W * 2)
+    np.testing.assert_allclose(daily["hours"], 24)
+    np.testing.assert_allclose(daily["load_hours"], 24)
+
+
+def test_drive_periods_without_a_charger_column_are_left_out(tmp_path):
+    daily = _daily(_log(charger_column=False), tmp_path)
+    # The hour on the alternator has no load figure rather than a load of zero
+    np.testing.assert_allclose(daily["load_hours"], 23)
+    np.testing.assert_allclose(daily["hours"], 24)
+    np.testing.assert_allclose(daily["load_wh"], FRIDGE_W * 23 + HEATER_W * 2)
+
+
+def test_chunk_boundaries_make_no_difference(tmp_path):
+    whole = _daily(_log(charger_column=False), tmp_path, chunksize=10 ** 6)
+    pd.testing.assert_frame_equal(_daily(_log(charger_column=False), tmp_path, chunksize=997), whole)
+
+
+def _fleet(tmp_path, charger_column):
+    logs, configs, devices = [], [], []
+    for i, scale in enumerate([0.5, 1.0, 1.5, 2.0]):
+        van_id = f"V{i}"
+        path = tmp_path / f"{van_id}.csv"
+        _log(charger_column, scale).to_csv(path, index=False)
+        logs.append({"path": path.name, "van_id": van_id, "system": "renogy"})
+        configs.append({"van_id": van_id, "renogy_solar": 300, "ecoflow_solar": 0, "solar_level": "Medium"})
+        devices += [{"van_id": van_id, "system": "renogy", "name": "Fridge", "watts": FRIDGE_W * scale, "hours": 20},
+                    {"van_id": van_id, "system": "renogy", "name": "Heater", "watts": HEATER_W * scale, "hours": 4}]
+    pd.DataFrame(logs).to_csv(tmp_path / "logs.csv", index=False)
+    return str(tmp_path / "logs.csv"), pd.DataFrame(configs), pd.DataFrame(devices)
+
+
+def test_duty_hours_fitted_from_net_power_logs(tmp_path):
+    manifest, configs, devices = _fleet(tmp_path, charger_column=True)
+    days, comparison = telemetry.replay(manifest, configs, devices, workers=1, progress=io.StringIO())
+    scale = pd.Series([0.5, 1.0, 1.5, 2.0], index=[f"V{i}" for i in range(4)])
+    actual = comparison["actual_load_wh"].droplevel("system")
+    np.testing.assert_allclose(actual, scale * (FRIDGE_W * 24 + HEATER_W * 2))
+    assert (comparison["load_days"] == DAYS).all()
+
+    duty = telemetry.calibrate(days, comparison, devices)["duty_hours"]
+    assert duty["Fridge"]["model_hours"] == 20 and duty["Heater"]["model_hours"] == 4
+    # Fridge and heater always appear together, so only their combined Wh is pinned down;
+    # the fit moves both towards it, from their catalog hours
+    fitted = FRIDGE_W * duty["Fridge"]["fitted_hours"] + HEATER_W * duty["Heater"]["fitted_hours"]
+    assert fitted == pytest.approx(FRIDGE_W * 24 + HEATER_W * 2, rel=0.02)
+
+
+def test_load_scaled_to_the_hours_covered(tmp_path):
+    manifest, configs, devices = _fleet(tmp_path, charger_column=False)
+    days, comparison = telemetry.replay(manifest, configs, devices, workers=1, progress=io.StringIO())
+    known_wh = FRIDGE_W * 23 + HEATER_W * 2
+    np.testing.assert_allclose(days["load_wh"], np.repeat([0.5, 1.0, 1.5, 2.0], DAYS) * known_wh * 24 / 23)
+
+
+def test_zero_measured_load_has_no_error_percentage(tmp_path):
+    manifest, configs, devices = _fleet(tmp_path, charger_column=True)
+    _log(True, load_scale=0).to_csv(tmp_path / "V0.csv", index=False)
+    days, comparison = telemetry.replay(manifest, configs, devices, workers=1, progress=io.StringIO())
+    assert comparison.loc[("V0", "renogy"), "actual_load_wh"] == 0
+    assert np.isnan(comparison.loc[("V0", "renogy"), "load_error_pct"])
+    assert np.isfinite(comparison["load_error_pct"].drop(("V0", "renogy"))).all()
+
+
+def test_fit_duty_hours_recovers_hours_across_a_fleet():
+    rng = np.random.default_rng(3)
+    catalog = {"Fridge": (45, 24.0), "Lights": (20, 5.0), "Laptop": (65, 3.0), "Heater": (800, 1.5),
+               "Kettle": (1500, 0.2)}
+    guessed = {"Fridge": 18.0, "Lights": 3.0, "Laptop": 5.0, "Heater": 2.5, "Kettle": 0.5}
+    rows, loads = [], {}
+    for i in range(40):
+        names = [name for name in catalog if rng.random() < 0.7] or ["Fridge"]
+        for name in names:
+            rows.append({"van_id": i, "system": "renogy", "name": name, "watts": catalog[name][0],
+                         "hours": guessed[name]})
+        loads[(i, "renogy")] = sum(catalog[name][0] * catalog[name][1] for name in names)
+    devices = pd.DataFrame(rows)
+    actual = pd.Series(loads)
+    actual.index.names = ["van_id", "system"]
+    actual[(40, "renogy")] = np.nan  # a van-system with no measured load is left out
+
+    fitted = telemetry.fit_duty_hours(devices, actual)
+    for name, (_, hours) in catalog.items():
+        assert fitted[name]["model_hours"] == guessed[name]
+        # Most of the way from the catalog figure to the true one; the prior holds back the rest
+        assert abs(fitted[name]["fitted_hours"] - hours) < 0.25 * abs(guessed[name] - hours), name
@@ -0,0 +1,36 @@
+import numpy as np
+
+from irradiance import HOURS, PERFORMANCE_RATIO, IrradianceDataset, write_dataset
+from trip_planner import simulate_trip
+
+SYSTEM = {"renogy_batteries": 3, "renogy_solar": 360, "ecoflow_solar": 400, "show_renogy": True,
+          "show_ecoflow": True}
+DEVICES = [{"name": "Fridge", "watts": 45, "hours": 24}]
+
+
+def _sunny_north(tmp_path):
+    # 6 peak-sun hours a day at the northern point, 1.2 at the southern one
+    daily = np.tile(np.r_[np.zeros(9), np.full(6, 1000), np.zeros(9)], HOURS // 24)
+    points = {(58.0, -4.0): (daily, np.ones(HOURS)), (50.5, -4.0): (daily / 5, np.ones(HOURS))}
+    write_dataset(tmp_path / "irradiance.bin", points)
+    return IrradianceDataset(tmp_path / "irradiance.bin")
+
+
+def test_location_sets_the_days_solar(tmp_path):
+    irradiance = _sunny_north(tmp_path)
+    days = [{"location": "58, -4", "solar_level": "Low"}, {"location": "50.5, -4", "solar_level": "High"},
+            {"location": "", "solar_level": "High"}]
+    results = simulate_trip(days, SYSTEM, DEVICES, [], start_day=100, policy="off", irradiance=irradiance)
+    panels = SYSTEM["renogy_solar"] + SYSTEM["ecoflow_solar"]
+    solar = [r["budget"]["total_input"] - r["budget"]["alternator_input"] for r in results]
+    np.testing.assert_allclose(solar, [panels * 6 * PERFORMANCE_RATIO, panels * 1.2 * PERFORMANCE_RATIO, panels * 5.5])
+    assert all(r["location_error"] is None for r in results)
+
+
+def test_unknown_location_falls_back_to_the_solar_level(tmp_path):
+    days = [{"location": "ZZ99", "solar_level": "High"}]
+    with_data = simulate_trip(days, SYSTEM, DEVICES, [], policy="off", irradiance=_sunny_north(tmp_path))
+    without = simulate_trip(days, SYSTEM, DEVICES, [], policy="off")
+    assert with_data[0]["location_error"]
+    assert with_data[0]["budget"] == without[0]["budget"]
+    assert without[0]["location_error"] is None
@@ -0,0 +1,105 @@
+# ALFRED Trip Planner – day-by-day itinerary simulation carrying battery charge between days
+import numpy as np
+
+from power_engine import device_arrays, power_budget
+from cross_charge import best_policy, simulate_coupled
+from irradiance import MONTH_START_DAY, PERFORMANCE_RATIO
+from soc_simulation import DAYS_PER_YEAR
+
+TRIP_DAY_DEFAULTS = {"location": "", "drive_hours": 0.5, "solar_level": "Medium", "devices_off": []}
+
+
+def device_label(system, device):
+    """Name a device uniquely across both systems, as used in a day's devices_off list."""
+    return f"{system}: {device['name']}"
+
+
+def day_sun_hours(day, day_of_year, irradiance=None):
+    """(peak-sun hours, error) for one trip day.
+
+    A day with a location takes the month's mean sun hours at its nearest grid point
+    when an IrradianceDataset is given; otherwise, or when the location is not found
+    (error then says why), it takes its solar level.
+    """
+    day = {**TRIP_DAY_DEFAULTS, **{k: v for k, v in day.items() if v is not None}}
+    if irradiance is not None and str(day["location"]).strip():
+        try:
+            point = irradiance.locate(day["location"])[0]
+        except (KeyError, ValueError) as e:
+            return day["solar_level"], str(e).strip("'\"")
+        month = int(np.searchsorted(MONTH_START_DAY, day_of_year, side="right"))
+        return irradiance.month_sun_hours(point, month) * PERFORMANCE_RATIO, None
+    return day["solar_level"], None
+
+
+def day_budget(day, system, renogy_devices, ecoflow_devices, sun_hours=None):
+    """power_budget() for one trip day: its own solar, drive time and devices.
+
+    sun_hours overrides the day's solar level, as from day_sun_hours().
+    """
+    day = {**TRIP_DAY_DEFAULTS, **{k: v for k, v in day.items() if v is not None}}
+    off = set(day["devices_off"] or ())
+    renogy_watts, renogy_hours = device_arrays(d for d in renogy_devices if device_label("Renogy", d) not in off)
+    ecoflow_watts, ecoflow_hours = device_arrays(d for d in ecoflow_devices if device_label("EcoFlow", d) not in off)
+    drive_hours = float(day["drive_hours"]) if system["show_renogy"] else 0.0
+    budget = power_budget(
+        system["renogy_batteries"], system["renogy_solar"], system["ecoflow_solar"],
+        day["solar_level"] if sun_hours is None else sun_hours, drive_hours,
+        renogy_watts, renogy_hours, ecoflow_watts, ecoflow_hours,
+        renogy_enabled=system["show_renogy"], ecoflow_enabled=system["show_ecoflow"],
+    )
+    return budget, drive_hours
+
+
+def simulate_trip(days, system, renogy_devices, ecoflow_devices, start_day=0, soc0=None, previous=(), policy=None,
+                  irradiance=None):
+    """Simulate a trip one day at a time, each day starting from the previous day's charge.
+
+    Both banks are joined by the Orion under one cross-charge policy for the whole trip,
+    by default the one that keeps the first day's setup going longest over the trip.
+    Each day starts with the Orion idle, so the threshold policy's hysteresis does not
+    carry over midnight.
+
+    days is a list of dicts (location, drive_hours, solar_level, devices_off) and system
+    holds the sidebar settings. With an IrradianceDataset, a day's location sets its
+    solar as in day_sun_hours(); without one the solar level does. Each day's result is keyed on its energy totals, day of
+    year and starting charge, so passing the results of an earlier call as previous
+    reuses every day whose key is unchanged: editing one day re-simulates that day and
+    only those after it whose starting charge actually moved.
+
+    Returns a list of per-day dicts with key, budget, start_soc, soc (24, 2) hourly
+    trajectory, final_soc (2,), first_empty_hour (2,), banks ordered Renogy, EcoFlow, and
+    location_error, None unless the day's location was not found.
+    """
+    results = []
+    soc = None if soc0 is None else np.asarray(soc0, dtype=float)
+    if policy is None and days:
+        sun_hours, _ = day_sun_hours(days[0], start_day % DAYS_PER_YEAR, irradiance)
+        budget, drive_hours = day_budget(days[0], system, renogy_devices, ecoflow_devices, sun_hours)
+        policy = best_policy(budget, drive_hours, days=len(days), start_day=start_day, soc0=soc0)
+    for i, day in enumerate(days):
+        day_of_year = (start_day + i) % DAYS_PER_YEAR
+        sun_hours, location_error = day_sun_hours(day, day_of_year, irradiance)
+        budget, drive_hours = day_budget(day, system, renogy_devices, ecoflow_devices, sun_hours)
+        capacity = np.array([float(budget["renogy_wh"]), float(budget["ecoflow_wh"])])
+        start_soc = capacity if soc is None else np.minimum(soc, capacity)
+        key = (day_of_year, drive_hours, policy, tuple(float(v) for v in budget.values()), tuple(start_soc),
+               location_error)
+
+        if i < len(previous) and previous[i]["key"] == key:
+            result = previous[i]
+        else:
+            sim = simulate_coupled(budget, drive_hours, days=1, start_day=day_of_year, soc0=start_soc,
+                                   policies=(policy,), keep_trajectory=True)
+            result = {
+                "key": key,
+                "budget": {name: float(value) for name, value in budget.items()},
+                "start_soc": start_soc,
+                "soc": sim["soc"][:, 0, 0],
+                "final_soc": sim["final_soc"][0, 0],
+                "first_empty_hour": sim["first_empty_hour"][0, 0],
+                "location_error": location_error,
+            }
+        results.append(result)
+        soc = result["final_soc"]
+    return results